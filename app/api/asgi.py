@@ -0,0 +1,132 @@
+import asyncio
+import json
+import time
+import traceback
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Load environment variables from .env file
+load_dotenv()
+
+from app.core.admission import AdmissionRejected
+from app.core.ai_assistant import AIAssistant
+from app.models.schemas import QueryRequest, QueryResponse
+from app.utils.logger import logger, log_response, RequestIdMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the AI Assistant once for the lifetime of the event loop"""
+    try:
+        logger.info("Initializing AI Assistant...")
+        # Initialization does blocking I/O; keep the loop free while it runs
+        app.state.assistant = await asyncio.to_thread(AIAssistant)
+        logger.info("AI Assistant initialized successfully")
+        await app.state.assistant.start()
+    except Exception as e:
+        logger.error(f"Error initializing AI Assistant: {str(e)}")
+        raise
+    yield
+    await app.state.assistant.close()
+
+
+app = FastAPI(
+    title='AI Assistant API Documentation',
+    description='AI Assistant API Documentation',
+    version='1.0',
+    lifespan=lifespan
+)
+app.add_middleware(RequestIdMiddleware)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    """Tell clients the server is saturated and when to try again"""
+    logger.warning(f"Request {getattr(request.state, 'request_id', '-')} rejected with {exc.status_code}: {str(exc)}")
+    return JSONResponse(
+        {"detail": str(exc), "retry_after": exc.retry_after},
+        status_code=exc.status_code,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.post('/query', response_model=QueryResponse)
+async def query(body: QueryRequest, request: Request):
+    """Process a user query and return a response with sources."""
+    start_time = time.time()
+    request_id = request.state.request_id
+    try:
+        logger.info(f"Processing request {request_id}:")
+        logger.info(f"Query: {body.query}")
+
+        response = await request.app.state.assistant.process_query(body.query)
+        log_response(request_id, response, time.time() - start_time)
+        return response
+
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        error_detail = f"Error: {str(e)}\nTraceback: {traceback.format_exc()}"
+        logger.error(error_detail)
+        return QueryResponse(
+            answer=f"An error occurred: {str(e)}. Please try again.",
+            sources=[],
+            confidence_score=0.0,
+            used_internet_search=False
+        )
+
+
+@app.post('/query/stream')
+async def query_stream(body: QueryRequest, request: Request):
+    """Stream the answer to a user query as server-sent events."""
+    request_id = request.state.request_id
+    logger.info(f"Streaming request {request_id}:")
+    logger.info(f"Query: {body.query}")
+
+    async def event_stream():
+        start_time = time.time()
+        first_token_time = None
+        try:
+            async for event in request.app.state.assistant.stream_query(body.query):
+                if event['event'] == 'token' and first_token_time is None:
+                    first_token_time = time.time() - start_time
+                    logger.info(f"Request {request_id}: first token after {first_token_time:.2f} seconds")
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming request {request_id}: {str(e)}\nTraceback: {traceback.format_exc()}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        logger.info(f"Request {request_id}: stream finished in {time.time() - start_time:.2f} seconds")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get('/metrics')
+async def metrics(request: Request):
+    """Runtime statistics such as Ollama connection pool reuse"""
+    return request.app.state.assistant.metrics()
+
+
+@app.get('/health')
+async def health():
+    """Health check endpoint"""
+    try:
+        response = {
+            "status": "healthy",
+        }
+        logger.info(f"Health Check Response: {json.dumps(response, indent=2)}")
+        return response
+    except Exception as e:
+        logger.error(f"Health check error: {str(e)}")
+        response = {
+            "status": "unhealthy",
+            "error": str(e)
+        }
+        logger.error(f"Health Check Error Response: {json.dumps(response, indent=2)}")
+        return JSONResponse(response, status_code=500)
@@ -10,9 +10,10 @@ from flask_restx import Api, fields, Resource, Namespace, reqparse
 # Load environment variables from .env file
 load_dotenv()
 
+from app.core.admission import AdmissionRejected
 from app.core.ai_assistant import AIAssistant
 from app.models.schemas import QueryRequest, QueryResponse, Source
-from app.utils.logger import logger, log_execution_time
+from app.utils.logger import logger, log_execution_time, log_response
 from app.config.model_config import MODEL_PRIORITY, MODEL_PARAMS, OLLAMA_CONFIG
 
 
@@ -36,36 +37,6 @@ def init_assistant():
 # Initialize assistant at startup
 init_assistant()
 
-def log_response(request_id: str, response: QueryResponse, processing_time: float):
-    """Log API response with details"""
-    try:
-
-        log_entry = {
-            "request_id": request_id,
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "processing_time": f"{processing_time:.2f}s",
-            "response": {
-                "answer": response.answer,
-                "confidence_score": response.confidence_score,
-                "used_internet_search": response.used_internet_search,
-                "sources_count": len(response.sources)
-            }
-        }
-        
-
-        logger.info(f"API Response: {json.dumps(log_entry, indent=2)}")
-
-        if response.sources:
-            logger.info("Response Sources:")
-            for idx, source in enumerate(response.sources, 1):
-                logger.info(f"Source {idx}:")
-                logger.info(f"  Title: {source.title}")
-                logger.info(f"  URL: {source.url}")
-                logger.info(f"  Relevance Score: {source.relevance_score}")
-                logger.info(f"  Content Preview: {source.content[:200]}...")
-    except Exception as e:
-        logger.error(f"Error logging response: {str(e)}")
-
 query_parser = reqparse.RequestParser()
 query_parser.add_argument('query', type=str, required=True, help='Query string')
 
@@ -97,6 +68,9 @@ class QueryResource(Resource):
             log_response(request_id, response, processing_time)
             return jsonify(response.dict())
 
+        except AdmissionRejected as e:
+            logger.warning(f"Request rejected with {e.status_code}: {str(e)}")
+            return jsonify({"detail": str(e), "retry_after": e.retry_after}), e.status_code, {"Retry-After": str(e.retry_after)}
         except Exception as e:
             error_detail = f"Error: {str(e)}\nTraceback: {traceback.format_exc()}"
             logger.error(error_detail)
@@ -107,6 +81,9 @@ class QueryResource(Resource):
                 used_internet_search=False
             )
             return jsonify(response.dict())
+        finally:
+            # asyncio.run() gives every request its own loop, which the Ollama pool cannot outlive
+            await assistant.ollama.close_session()
 
 
 @my_namespace.route('/health')
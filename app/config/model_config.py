@@ -1,5 +1,7 @@
 """Model configuration settings"""
 
+import os
+
 # Model priority for different types of queries
 MODEL_PRIORITY = [
     "phi"#,          # Fastest model first
@@ -50,6 +52,21 @@ OLLAMA_CONFIG = {
     "timeout": 15,  # Shorter overall timeout
     "max_retries": 1,  # Only retry once
     "retry_delay": 0.5,  # Shorter delay between retries
+    "connection_pool": {  # Shared keep-alive pool used for all Ollama calls
+        "limit": 10,              # Open connections in total
+        "limit_per_host": 4,      # Open connections to the Ollama server
+        "keepalive_timeout": 60   # Seconds an idle connection is kept for reuse
+    },
+    "timeouts": {
+        "connect": 5,   # Establishing a connection
+        "tags": 5,      # Listing models
+        "pull": 30      # Pulling a model
+    },
+    "health_check": {  # Background model availability probe, kept off the request path
+        "interval": 30,          # Seconds between probes
+        "timeout": 2,            # Probe timeout
+        "failure_cooldown": 15   # Seconds a model is skipped after a failed generation
+    },
     "error_handling": {
         "retry_on_timeout": False,  # Don't retry on timeout
         "retry_on_error": True,     # Retry on other errors
@@ -66,10 +83,30 @@ OLLAMA_CONFIG = {
     }
 }
 
+# Documentation text kept in one memory-mapped file shared by all workers instead of per-process strings
+CORPUS_CONFIG = {
+    "enabled": os.getenv("CORPUS_STORE", "true").lower() == "true",
+    "path": os.getenv("CORPUS_STORE_PATH", "corpus_store")  # One subdirectory per corpus version
+}
+
+# Documentation loading at startup
+DOCS_CONFIG = {
+    "extensions": [".md", ".txt"],
+    "read_workers": int(os.getenv("DOCS_READ_WORKERS", "8"))  # Files read concurrently
+}
+
 # Vector database configuration
 VECTOR_DB_CONFIG = {
     "path": "vector_db",
     "collection_name": "documentation",
+    "manifest_file": "ingestion_manifest.json",  # Content hashes of indexed documents, kept inside "path"
+    "sync_on_startup": True,  # Embed added/changed docs and drop removed ones at startup (writable mode only)
+    # Serve the snapshot published by scripts/ingest_docs.py and never embed the corpus at boot
+    "read_only": os.getenv("VECTOR_DB_READ_ONLY", "false").lower() == "true",  # The Docker image sets true
+    "ingestion": {
+        "batch_size": 256,        # Chunks embedded and written per bulk add
+        "embedding_workers": 2    # Batches encoded concurrently
+    },
     "similarity_threshold": 0.45,  # Much lower threshold for better recall
     "duplo_similarity_threshold": 0.35,  # Much lower threshold for Duplo-specific content
     "hnsw_config": {  # HNSW index configuration for small datasets
@@ -85,6 +122,53 @@ VECTOR_DB_CONFIG = {
     }
 }
 
+# Thread pools for blocking work, kept apart so slow generation never delays retrieval
+EXECUTOR_CONFIG = {
+    "retrieval": {"max_workers": 4},   # Query embedding, routing, vector and keyword search
+    "generation": {"max_workers": 2}   # Blocking answer generation such as the direct-response fallback
+}
+
+# In-memory caches (LRU with expiry); limits apply per cache
+CACHE_CONFIG = {
+    "min_confidence": 0.8,            # Answers below this (offline fallbacks, errors) are never cached
+    "retrieval": {                    # Ranked chunks per query
+        "max_entries": 1024,
+        "max_bytes": 32 * 1024 * 1024,
+        "ttl": 3600                   # Seconds; also cleared when documents are re-indexed
+    },
+    "responses": {                    # Final answers per query
+        "max_entries": 512,
+        "max_bytes": 16 * 1024 * 1024,
+        "ttl": 900
+    },
+    "semantic": {                     # Documentation answers matched by query embedding
+        "enabled": True,
+        "max_entries": 1000,
+        "ttl": 3600,
+        "max_distance": 0.08          # Cosine distance under which a paraphrase reuses an answer
+    },
+    "persistent": {                   # Optional SQLite cache shared by worker processes and kept across restarts
+        "path": os.getenv("PERSISTENT_CACHE_PATH", ""),  # Empty keeps every cache in memory only
+        "caches": ["responses", "internet_search"]       # Caches written through to disk
+    }
+}
+
+# Hybrid retrieval configuration (BM25 + vector search fused with reciprocal rank fusion)
+RETRIEVAL_CONFIG = {
+    "top_k": 3,              # Chunks returned after fusion
+    "candidates": 10,        # Candidates taken from each ranking before fusion
+    "rrf_k": 60,             # Reciprocal rank fusion damping constant
+    "bm25": {
+        "k1": 1.5,           # Term frequency saturation
+        "b": 0.75,           # Length normalisation
+        "stopwords": [       # Query words that carry no retrieval signal
+            "a", "an", "and", "are", "can", "do", "does", "for", "how", "i",
+            "in", "is", "it", "of", "on", "or", "the", "to", "what", "when",
+            "where", "which", "who", "why", "with"
+        ]
+    }
+}
+
 # DuploCloud keywords for fallback matching
 DUPLO_KEYWORDS = [
     "duplo", "duplocloud", "infrastructure", "deployment", "cloud",
@@ -250,6 +334,7 @@ CHUNKING_CONFIG = {
         "preserve_headers": False,  # Don't include headers in response
         "include_metadata": False,  # Don't include metadata
         "context_window": 4,       # Even larger context window
+        "max_tokens": 600,         # Token budget for the context sent to the model
         "include_siblings": True,  # Include sibling chunks
         "include_parents": True,   # Include parent chunks
         "error_handling": {
@@ -17,6 +17,8 @@ SEARCH_PROVIDERS: Dict[str, Dict[str, Any]] = {
     "duckduckgo": {
         "enabled": True,
         "fallback": True,
+        "base_url": os.getenv("DUCKDUCKGO_URL", "https://html.duckduckgo.com/html/"),
+        "user_agent": "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0",
         "region": "wt-wt",
         "safesearch": "off",
         "max_results": 3
@@ -30,6 +32,33 @@ SEARCH_PROVIDER_PRIORITY = ["serpapi", "duckduckgo"]
 SEARCH_CONFIG = {
     "max_retries": 3,
     "retry_delay": 2,
-    "timeout": 10,
-    "cache_ttl": 3600  # Cache time-to-live in seconds
+    "timeout": 10,  # Seconds per search request, connect included
+    "cache_ttl": 3600,  # Cache time-to-live in seconds
+    "cache_max_entries": 256,  # Cached answers kept before the least recently used is evicted
+    "cache_max_bytes": 8 * 1024 * 1024,
+    "fan_out": {
+        # "sequential": providers in priority order; "race": all at once, first results win;
+        # "merge": all at once, results combined; "hedged": the next provider starts when
+        # the current one fails or runs past its latency percentile
+        "mode": os.getenv("SEARCH_FAN_OUT", "hedged"),
+        "hedge_percentile": 90,
+        "hedge_delay": 1.5,     # Seconds, used until min_samples latencies have been observed
+        "min_samples": 10,
+        "latency_window": 200   # Latencies kept per provider
+    },
+    "page_fetch": {             # Fetch the top result pages and add their most relevant passages
+        "enabled": os.getenv("SEARCH_FETCH_PAGES", "false").lower() == "true",
+        "max_pages": 3,
+        "concurrency": 4,       # Connections open at once
+        "timeout": 5,           # Seconds per page
+        "max_bytes": 2 * 1024 * 1024,
+        "cache_dir": os.getenv("PAGE_CACHE_DIR", "page_cache"),
+        "max_age": 3600,        # Seconds before a cached page is revalidated with ETag / Last-Modified
+        "cache_max_entries": 1000,          # Least recently used pages are deleted beyond these limits
+        "cache_max_bytes": 64 * 1024 * 1024,
+        "cache_ttl": 7 * 24 * 3600,         # Seconds since a page was last used before it is deleted
+        "sentences_per_passage": 3,
+        "passages_per_page": 3,
+        "user_agent": "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"
+    }
 } 
\ No newline at end of file
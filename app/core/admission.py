@@ -0,0 +1,135 @@
+"""Per-model admission control for Ollama generation with a bounded wait queue and fast rejection"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+from app.config.model_config import MODEL_PARAMS, OLLAMA_CONFIG, RESPONSE_CONFIG
+from app.utils.logger import logger
+
+
+class AdmissionRejected(Exception):
+    """A request was turned away; ``status_code`` and ``retry_after`` are sent to the client"""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, config: Dict = None, model_params: Dict = None):
+        config = config or OLLAMA_CONFIG["error_handling"]["concurrent_handling"]
+        self.enabled = config["enabled"]
+        self.max_concurrent = config["max_concurrent"]
+        self.queue_size = config["queue_size"]
+        self.queue_timeout = config["queue_timeout"]
+        self.reject_on_full = config["reject_on_full"]
+        self.reject_message = RESPONSE_CONFIG["error_handling"]["timeout_handling"]["concurrent_handling"]["reject_message"]
+        self.model_params = model_params or MODEL_PARAMS
+        self.waiting = 0
+        self.models: Dict[str, Dict] = {}
+        self._loop = None
+        self._global = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _limit(self, model: str) -> int:
+        return max(1, min(self.model_params.get(model, {}).get("concurrent_requests", self.max_concurrent),
+                          self.max_concurrent))
+
+    def _bind_loop(self):
+        """Semaphores belong to one event loop; start fresh if called from another"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._global = asyncio.Semaphore(self.max_concurrent)
+            self._semaphores = {}
+            self.waiting = 0
+
+    def _state(self, model: str) -> Dict:
+        return self.models.setdefault(model, {
+            'in_flight': 0, 'waiting': 0, 'admitted': 0, 'rejected_full': 0,
+            'rejected_timeout': 0, 'service_time': None
+        })
+
+    def retry_after(self, model: str) -> int:
+        """Seconds until a slot is likely free, from the average time a request holds one"""
+        service_time = self._state(model)['service_time'] or self.queue_timeout
+        return max(1, math.ceil(service_time * (self.waiting + 1) / self._limit(model)))
+
+    async def _acquire(self, semaphore: asyncio.Semaphore, deadline: float):
+        if not semaphore.locked():
+            # A free slot is taken without suspending
+            await semaphore.acquire()
+            return
+        await asyncio.wait_for(semaphore.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+
+    @asynccontextmanager
+    async def slot(self, model: str):
+        """Hold a generation slot for ``model``; raises AdmissionRejected when none can be had"""
+        if not self.enabled:
+            yield
+            return
+
+        self._bind_loop()
+        state = self._state(model)
+        model_semaphore = self._semaphores.setdefault(model, asyncio.Semaphore(self._limit(model)))
+        must_wait = model_semaphore.locked() or self._global.locked()
+        if must_wait and self.reject_on_full and self.waiting >= self.queue_size:
+            state['rejected_full'] += 1
+            retry_after = self.retry_after(model)
+            logger.warning(f"Rejecting request for {model}: {self.waiting} requests already queued "
+                           f"(retry after {retry_after}s)")
+            raise AdmissionRejected(self.reject_message, 429, retry_after)
+
+        if must_wait:
+            self.waiting += 1
+            state['waiting'] += 1
+        deadline = time.monotonic() + self.queue_timeout
+        queued_at = time.time()
+        acquired_model = False
+        try:
+            await self._acquire(model_semaphore, deadline)
+            acquired_model = True
+            await self._acquire(self._global, deadline)
+        except asyncio.TimeoutError:
+            if acquired_model:
+                model_semaphore.release()
+            state['rejected_timeout'] += 1
+            retry_after = self.retry_after(model)
+            logger.warning(f"Request for {model} waited {self.queue_timeout}s without a slot "
+                           f"(retry after {retry_after}s)")
+            raise AdmissionRejected(self.reject_message, 503, retry_after)
+        except BaseException:
+            if acquired_model:
+                model_semaphore.release()
+            raise
+        finally:
+            if must_wait:
+                self.waiting -= 1
+                state['waiting'] -= 1
+
+        if must_wait:
+            logger.info(f"Admitted request for {model} after queueing {time.time() - queued_at:.2f} seconds")
+        state['admitted'] += 1
+        state['in_flight'] += 1
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            held = time.time() - start_time
+            state['service_time'] = held if state['service_time'] is None else 0.8 * state['service_time'] + 0.2 * held
+            state['in_flight'] -= 1
+            self._global.release()
+            model_semaphore.release()
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'max_concurrent': self.max_concurrent,
+            'queue_size': self.queue_size,
+            'waiting': self.waiting,
+            'models': {model: dict(state, limit=self._limit(model)) for model, state in self.models.items()}
+        }
@@ -1,28 +1,43 @@
 import os
-from typing import List, Dict
+from contextlib import contextmanager
+from typing import List, Dict, AsyncIterator, Optional, Set, Tuple
 import requests
 
 import time
 from pathlib import Path
 import chromadb
 from chromadb.config import Settings
+from chromadb.utils import embedding_functions
 from app.models.schemas import QueryResponse, Source
 from app.utils.logger import logger, log_execution_time
 import numpy as np
 from numpy.linalg import norm
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import random
-import aiohttp
 from app.config.search_config import SEARCH_PROVIDERS, SEARCH_PROVIDER_PRIORITY, SEARCH_CONFIG
 from app.config.model_config import (
     MODEL_PRIORITY, MODEL_PARAMS, OLLAMA_CONFIG,
-    VECTOR_DB_CONFIG, 
+    VECTOR_DB_CONFIG, EXECUTOR_CONFIG, CACHE_CONFIG, CORPUS_CONFIG
 )
 from app.config.prompt import PROMPTS
 from app.core.duplo_related import DuploRelated
 from app.core.internet_search import InternetSearch
 from app.core.rag import RAG
+from app.core.ingestion import (
+    DocumentIndexer, IngestionManifest, chunking_fingerprint, content_hash, corpus_fingerprint,
+    load_documentation, preload_documents, scan_signature
+)
+from app.core import snapshots
+from app.core.query_context import QueryContext
+from app.core.streaming import response_events
+from app.core.ollama_client import OllamaClient, OllamaError
+from app.core.model_health import ModelHealthMonitor, model_listed
+from app.core.admission import AdmissionController, AdmissionRejected
+from app.core.executors import InstrumentedExecutor
+from app.core.cache import TTLCache
+from app.core.semantic_cache import SemanticCache
+from app.core.persistent_cache import open_backend
+from app.core.corpus_store import CorpusStore
 
 class AIAssistant:
     def __init__(self):
@@ -30,12 +45,17 @@ class AIAssistant:
         logger.info("Initializing AI Assistant components")
         self.model_name = None
         # Initialize Ollama client
-        self.ollama_base_url = OLLAMA_CONFIG["base_url"]
+        self.ollama = OllamaClient()
+        self.health = ModelHealthMonitor(self.ollama)
+        self.admission = AdmissionController()
         self.docs_path = "docs/"
         self.model_priority = MODEL_PRIORITY
         self.vector_db_path = VECTOR_DB_CONFIG["path"]
-        self.executor = ThreadPoolExecutor(max_workers=2)
-        self.cache = {}
+        self.retrieval_executor = InstrumentedExecutor("retrieval", EXECUTOR_CONFIG["retrieval"]["max_workers"])
+        self.generation_executor = InstrumentedExecutor("generation", EXECUTOR_CONFIG["generation"]["max_workers"])
+        self.cache = TTLCache("responses", **CACHE_CONFIG["responses"])
+        self.semantic_cache = SemanticCache()
+        self.startup_phases: Dict[str, float] = {}
         
         # Initialize search providers from config
         self.search_providers = SEARCH_PROVIDERS
@@ -45,21 +65,28 @@ class AIAssistant:
 
     def _initialize_components(self):
         """Initialize all components with proper error handling"""
+        start = time.perf_counter()
         try:
             # First check Ollama availability
-            self._check_ollama_availability()
+            with self._phase("ollama"):
+                self._check_ollama_availability()
             
             # Then select and pull model
-            self.model_name = self._select_best_model()
-            if not self._is_model_available(self.model_name):
-                logger.info(f"Model {self.model_name} not found, pulling it...")
-                self._pull_model()
+            with self._phase("model"):
+                self.model_name = self._select_best_model()
+                if not self._is_model_available(self.model_name):
+                    logger.info(f"Model {self.model_name} not found, pulling it...")
+                    self._pull_model()
             
             # Load documentation
             self.documentation = self._load_documentation()
+            self.documentation, fingerprint = self._open_corpus(self.documentation)
+            # Answers persisted on disk are only reused for the same documentation
+            self.cache.backend = open_backend("responses", fingerprint[:16], CACHE_CONFIG["responses"])
             
             # Initialize vector database
-            self._initialize_vector_db()
+            with self._phase("vector_db"):
+                self._initialize_vector_db()
             
         except Exception as e:
             logger.error(f"Error during initialization: {str(e)}")
@@ -71,66 +98,36 @@ class AIAssistant:
         self.internet_search = InternetSearch(SEARCH_PROVIDERS)
 
         # Initialize RAG
-        self.rag = RAG(self.collection, self.documentation, self.executor)
+        with self._phase("retrieval_index"):
+            self.rag = RAG(self.collection, self.documentation, self.retrieval_executor, self.ollama, self.health,
+                           self.admission, self.generation_executor, self.corpus, self.aligned_paths)
 
-    def _initialize_vector_db(self):
-        """Initialize the vector database and store document embeddings"""
+        phases = ', '.join(f"{name} {seconds:.3f}s" for name, seconds in self.startup_phases.items())
+        logger.info(f"Startup took {time.perf_counter() - start:.3f}s ({phases})")
+
+    @contextmanager
+    def _phase(self, name: str):
+        """Record how long a startup phase takes in ``startup_phases``"""
+        start = time.perf_counter()
         try:
-            logger.info("Initializing vector database...")
-            # Create vector DB directory if it doesn't exist
-            os.makedirs(self.vector_db_path, exist_ok=True)
-            
-            # Initialize Chroma client
-            self.chroma_client = chromadb.PersistentClient(
-                path=self.vector_db_path,
-                settings=Settings(allow_reset=True)
-            )
-            
-            # Create or get collection
-            self.collection = self.chroma_client.get_or_create_collection(
-                name=VECTOR_DB_CONFIG["collection_name"],
-                metadata={"hnsw:space": "cosine"}
-            )
-            
-            # Check if collection is empty
-            if self.collection.count() == 0:
-                logger.info("Vector database is empty, storing document embeddings...")
-                self._store_document_embeddings()
-            else:
-                logger.info("Vector database already contains document embeddings")
-                
-        except Exception as e:
-            logger.error(f"Error initializing vector database: {str(e)}")
-            raise    
+            yield
+        finally:
+            self.startup_phases[name] = round(time.perf_counter() - start, 3)
+
     def _is_model_available(self, model_name: str) -> bool:
         """Check if a specific model is available"""
-        try:
-            response = requests.get(f"{self.ollama_base_url}/api/tags")
-            if response.status_code == 200:
-                available_models = [model['name'] for model in response.json().get('models', [])]
-                return model_name in available_models
-            return False
-        except Exception as e:
-            logger.error(f"Error checking model availability: {str(e)}")
-            return False
+        return model_listed(model_name, self.health.listed_models)
 
     def _check_ollama_availability(self):
         """Check if Ollama is running and accessible"""
-        try:
-            # Check if Ollama server is running
-            response = requests.get(f"{self.ollama_base_url}/api/tags", timeout=5)
-            if response.status_code != 200:
-                raise ConnectionError("Ollama server is not running")
-        except requests.exceptions.ConnectionError:
+        # The first probe fills the health monitor's view that model selection reads
+        if not self.health.refresh_sync():
             error_msg = (
-                "Ollama server is not running. Please start it with: "
+                f"Ollama server is not running ({self.health.last_error}). Please start it with: "
                 "ollama serve"
             )
             logger.error(error_msg)
             raise ConnectionError(error_msg)
-        except Exception as e:
-            logger.error(f"Error checking Ollama availability: {str(e)}")
-            raise
 
     def _pull_model(self):
         """Pull the model from Ollama with retry logic"""
@@ -138,29 +135,24 @@ class AIAssistant:
         for attempt in range(max_retries):
             try:
                 logger.info(f"Pulling model {self.model_name} (attempt {attempt + 1}/{max_retries})...")
-                response = requests.post(
-                    f"{self.ollama_base_url}/api/pull",
-                    json={"name": self.model_name},
-                    timeout=30  # Increased timeout for model pulling
-                )
-                if response.status_code == 200:
+                try:
+                    self.ollama.pull_model_sync(self.model_name)
                     logger.info(f"Successfully pulled model {self.model_name}")
+                    self.health.refresh_sync()
                     return
-                
+                except OllamaError as e:
+                    logger.warning(f"Pulling model {self.model_name} failed: {str(e)}")
+
                 # If pulling the preferred model fails, try the next one
                 for model in self.model_priority:
                     if model != self.model_name:
                         try:
                             logger.info(f"Trying to pull alternative model: {model}")
-                            response = requests.post(
-                                f"{self.ollama_base_url}/api/pull",
-                                json={"name": model},
-                                timeout=30
-                            )
-                            if response.status_code == 200:
-                                self.model_name = model
-                                logger.info(f"Successfully pulled alternative model {model}")
-                                return
+                            self.ollama.pull_model_sync(model)
+                            self.model_name = model
+                            logger.info(f"Successfully pulled alternative model {model}")
+                            self.health.refresh_sync()
+                            return
                         except Exception:
                             continue
                             
@@ -174,122 +166,214 @@ class AIAssistant:
 
     def _select_best_model(self) -> str:
         """Select the best available model based on priority"""
-        try:
-            response = requests.get(f"{self.ollama_base_url}/api/tags")
-            if response.status_code == 200:
-                available_models = [model['name'] for model in response.json().get('models', [])]
-                for model in self.model_priority:
-                    if model in available_models:
-                        logger.info(f"Selected model: {model}")
-                        return model
-
-            return self.model_priority[0]
-        except Exception as e:
-            logger.error(f"Error selecting model: {str(e)}")
-            return self.model_priority[0]
+        for model in self.model_priority:
+            if model_listed(model, self.health.listed_models):
+                logger.info(f"Selected model: {model}")
+                return model
+        return self.model_priority[0]
 
 
     def _initialize_vector_db(self):
         """Initialize the vector database and store document embeddings"""
         try:
             logger.info("Initializing vector database...")
-            # Create vector DB directory if it doesn't exist
-            os.makedirs(self.vector_db_path, exist_ok=True)
+            start_time = time.time()
+            self.read_only = VECTOR_DB_CONFIG["read_only"]
+            db_path = self._resolve_vector_db_path()
+            if self.read_only and not self._index_matches_chunking(db_path):
+                # Serving a stale index would pair search hits with the wrong chunks
+                raise RuntimeError(
+                    f"Vector database {db_path} was not built with the current chunking settings. "
+                    "Rebuild it with: python scripts/ingest_docs.py"
+                )
             
             # Initialize Chroma client
             self.chroma_client = chromadb.PersistentClient(
-                path=self.vector_db_path,
-                settings=Settings(allow_reset=True)
+                path=db_path,
+                settings=Settings(allow_reset=not self.read_only)
             )
             
+            # Keep a handle on the embedding function so queries can be embedded once per request
+            self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+            if self.read_only:
+                self.collection = self.chroma_client.get_collection(
+                    name=VECTOR_DB_CONFIG["collection_name"],
+                    embedding_function=self.embedding_function
+                )
+                self.indexer = None
+                # docs/ may have been edited since the snapshot was built
+                self.aligned_paths = self._aligned_paths(
+                    IngestionManifest(os.path.join(db_path, VECTOR_DB_CONFIG["manifest_file"]))
+                )
+                logger.info(
+                    f"Opened vector database snapshot {snapshots.read_snapshot_info(db_path).get('version', db_path)} "
+                    f"read-only ({self.collection.count()} chunks) in {time.time() - start_time:.2f} seconds"
+                )
+                return
+
             self.collection = self.chroma_client.get_or_create_collection(
                 name=VECTOR_DB_CONFIG["collection_name"],
-                metadata={"hnsw:space": "cosine"}
+                metadata={"hnsw:space": "cosine"},
+                embedding_function=self.embedding_function
             )
             
-            if self.collection.count() == 0:
-                logger.info("Vector database is empty, storing document embeddings...")
+            self.indexer = DocumentIndexer(
+                self.collection,
+                os.path.join(db_path, VECTOR_DB_CONFIG["manifest_file"]),
+                embedding_function=self.embedding_function
+            )
+            if VECTOR_DB_CONFIG["sync_on_startup"]:
+                logger.info("Syncing document embeddings with the documentation...")
                 self._store_document_embeddings()
             else:
-                logger.info("Vector database already contains document embeddings")
+                logger.info("Skipping document embedding sync at startup")
+            self.aligned_paths = self._aligned_paths(self.indexer.manifest)
                 
         except Exception as e:
             logger.error(f"Error initializing vector database: {str(e)}")
             raise
 
-    def _store_document_embeddings(self):
-        """Store document embeddings in the vector database"""
-        try:
-            for doc in self.documentation:
-                # Create document chunks (simple splitting by paragraphs)
-                chunks = doc['content'].split('\n\n')
-                chunk_ids = [f"{doc['title']}_{i}" for i in range(len(chunks))]
-                
-                # Store chunks in vector database
-                self.collection.add(
-                    ids=chunk_ids,
-                    documents=chunks,
-                    metadatas=[{
-                        'title': doc['title'],
-                        'path': doc['path'],
-                        'chunk_index': i
-                    } for i in range(len(chunks))]
+    @staticmethod
+    def _index_matches_chunking(db_path: str) -> bool:
+        """Whether the vector database was built with the current chunking settings"""
+        manifest = IngestionManifest(os.path.join(db_path, VECTOR_DB_CONFIG["manifest_file"]))
+        return manifest.fingerprint == chunking_fingerprint()
+
+    def _aligned_paths(self, manifest: IngestionManifest) -> Set[str]:
+        """Documents indexed with the current chunking settings and unchanged since"""
+        if manifest.fingerprint != chunking_fingerprint():
+            return set()
+        return {
+            doc['path'] for doc in self.documentation
+            if manifest.documents.get(doc['path'], {}).get('hash') == content_hash(doc['content'])
+        }
+
+    def _resolve_vector_db_path(self) -> str:
+        """Pick the published snapshot, falling back to a plain database directory"""
+        snapshot = snapshots.current_snapshot_path(self.vector_db_path)
+        if snapshot:
+            return snapshot
+        if self.read_only:
+            if not os.path.exists(os.path.join(self.vector_db_path, "chroma.sqlite3")):
+                raise RuntimeError(
+                    f"No vector database snapshot found under {self.vector_db_path}. "
+                    "Build one with: python scripts/ingest_docs.py"
                 )
-                logger.info(f"Stored embeddings for document: {doc['title']}")
-                
+            logger.warning(f"No published snapshot, serving {self.vector_db_path} read-only")
+        else:
+            os.makedirs(self.vector_db_path, exist_ok=True)
+        return self.vector_db_path
+
+    def _store_document_embeddings(self) -> Dict:
+        """Embed added and changed documents and delete removed ones from the vector database"""
+        try:
+            return self.indexer.sync(self.documentation)
         except Exception as e:
             logger.error(f"Error storing document embeddings: {str(e)}")
             raise
 
+    def reindex_documentation(self) -> Dict:
+        """Reload the documentation and re-embed only what changed since the last sync"""
+        if self.read_only:
+            raise RuntimeError("Vector database is read-only; rebuild it with scripts/ingest_docs.py")
+        self.documentation, _ = self._open_corpus(self._load_documentation())
+        stats = self._store_document_embeddings()
+        # A sync re-embeds everything that changed, including everything when the chunking settings did
+        self.rag.retriever.aligned_paths = self._aligned_paths(self.indexer.manifest)
+
+        docs_by_path = {doc['path']: doc for doc in self.documentation}
+        for path in stats['added'] + stats['changed']:
+            self.rag.update_document(docs_by_path[path])
+        for path in stats['removed']:
+            self.rag.remove_document(path)
+        if stats['added'] or stats['changed'] or stats['removed']:
+            self.cache.clear()
+            self.semantic_cache.clear()
+        return stats
+
+    def _open_corpus(self, documents: List[Dict]) -> Tuple[List[Dict], str]:
+        """Documentation served from the corpus store, reusing it without reading files when they are unchanged"""
+        self.corpus = None
+        signature = scan_signature(documents)
+        if CORPUS_CONFIG["enabled"]:
+            with self._phase("corpus_store"):
+                try:
+                    self.corpus = CorpusStore.open_matching(CORPUS_CONFIG["path"], signature)
+                except Exception as e:
+                    logger.error(f"Could not open the corpus store: {str(e)}")
+            if self.corpus is not None:
+                logger.info(f"Using corpus store {self.corpus.directory} ({self.corpus.size} bytes), "
+                            f"documentation unchanged")
+                return self.corpus.documents(), self.corpus.fingerprint
+
+        with self._phase("docs_read"):
+            documents = preload_documents(documents)
+            fingerprint = corpus_fingerprint(documents)
+        if not CORPUS_CONFIG["enabled"]:
+            return documents, fingerprint
+        with self._phase("corpus_build"):
+            try:
+                self.corpus = CorpusStore.open_or_build(CORPUS_CONFIG["path"], documents, fingerprint, signature)
+            except Exception as e:
+                logger.error(f"Could not open the corpus store, keeping documentation in memory: {str(e)}")
+                return documents, fingerprint
+        logger.info(f"Using corpus store {self.corpus.directory} ({self.corpus.size} bytes)")
+        return self.corpus.documents(), fingerprint
+
     def _load_documentation(self) -> List[Dict]:
-        """Load and process documentation files"""
-        logger.info(f"Loading documentation from {self.docs_path}")
-        docs = []
-        
-        try:
-            docs_dir = Path(self.docs_path)
-            if not docs_dir.exists():
-                logger.warning(f"Documentation directory {self.docs_path} does not exist")
-                return docs
-
-            logger.info(f"Scanning directory: {docs_dir.absolute()}")
-            for file_path in docs_dir.rglob("*"):
-                logger.debug(f"Found file: {file_path}")
-                if file_path.is_file() and file_path.suffix in ['.md', '.txt']:
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            doc_info = {
-                                'title': file_path.stem,
-                                'path': str(file_path.relative_to(docs_dir)),
-                                'content': content
-                            }
-                            docs.append(doc_info)
-                            logger.info(f"Loaded documentation from {file_path} (size: {len(content)} bytes)")
-                    except Exception as e:
-                        logger.error(f"Error reading file {file_path}: {str(e)}")
-                        continue
-
-            logger.info(f"Successfully loaded {len(docs)} documentation files")
-            for doc in docs:
-                logger.debug(f"Loaded doc: {doc['title']} from {doc['path']}")
-            return docs
-        except Exception as e:
-            logger.error(f"Error loading documentation: {str(e)}")
-            return docs
+        """Scan the documentation files; their content is read later, only if the corpus store needs it"""
+        with self._phase("docs_scan"):
+            return load_documentation(self.docs_path, lazy=True)
+
 
+    async def _is_duplo_related(self, query_ctx: QueryContext) -> bool:
+        """Route the query in the retrieval pool; this also embeds it once for the search that follows"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.retrieval_executor, self.duplo_related.is_duplo_related, query_ctx)
+
+    async def _semantic_lookup(self, query_ctx: QueryContext) -> Optional[QueryResponse]:
+        """A cached documentation answer for a paraphrase of this query, if there is one"""
+        if not self.semantic_cache.enabled or query_ctx.embedding_function is None:
+            return None
+        # Embedding is blocking model inference; the result is kept on the context for retrieval
+        loop = asyncio.get_running_loop()
+        embedding = await loop.run_in_executor(self.retrieval_executor, lambda: query_ctx.embedding)
+        return self.semantic_cache.lookup(embedding)
+
+    @staticmethod
+    def _cacheable(response) -> bool:
+        """Only model and search answers are cached; a fallback answer is retried once the models recover"""
+        return isinstance(response, QueryResponse) and response.confidence_score >= CACHE_CONFIG["min_confidence"]
+
+    def _remember_answer(self, query_ctx: QueryContext, response: QueryResponse):
+        if self._cacheable(response) and query_ctx.embedding_function is not None:
+            self.semantic_cache.add(query_ctx.cache_key, query_ctx.embedding, response)
+
+    async def _answer(self, query_ctx: QueryContext) -> QueryResponse:
+        """Route the query to the documentation or to internet search"""
+        cached = await self._semantic_lookup(query_ctx)
+        if cached is not None:
+            return cached
+        if await self._is_duplo_related(query_ctx):
+            logger.info("Query appears to be DuploCloud related, using documentation")
+            response = await self.rag.process_documentation_query(query_ctx.query, query_ctx)
+            self._remember_answer(query_ctx, response)
+            return response
+        logger.info("Query appears to be general knowledge, using internet search")
+        return await self.internet_search.process_internet_query(query_ctx.query)
 
     @log_execution_time
     async def process_query(self, query: str) -> QueryResponse:
         """Process a user query and return a response with sources"""
         try:
             logger.info(f"Processing query: {query}")
-            if self.duplo_related.is_duplo_related(query):
-                logger.info("Query appears to be DuploCloud related, using documentation")
-                response = await self.rag.process_documentation_query(query)
-            else:
-                logger.info("Query appears to be general knowledge, using internet search")
-                response = await self.internet_search.process_internet_query(query)
+            query_ctx = QueryContext(query, self.embedding_function)
+            # Identical concurrent queries share one answer; only genuine answers are kept
+            response = await self.cache.get_or_load(
+                query_ctx.cache_key,
+                lambda: self._answer(query_ctx),
+                cache_if=self._cacheable
+            )
 
             # Ensure the response is a QueryResponse object
             if not isinstance(response, QueryResponse):
@@ -302,6 +386,8 @@ class AIAssistant:
                 )
 
             return response
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}")
             return QueryResponse(
@@ -311,33 +397,93 @@ class AIAssistant:
                 used_internet_search=False
             )  
 
+    async def stream_query(self, query: str) -> AsyncIterator[Dict]:
+        """Process a user query as a stream of sources, answer tokens and a final done event"""
+        try:
+            logger.info(f"Streaming query: {query}")
+            query_ctx = QueryContext(query, self.embedding_function)
+            response = await self.cache.get_async(query_ctx.cache_key) or await self._semantic_lookup(query_ctx)
+            if response is not None:
+                logger.info("Using cached response")
+                for event in response_events(response):
+                    yield event
+                return
+            if await self._is_duplo_related(query_ctx):
+                logger.info("Query appears to be DuploCloud related, streaming from documentation")
+                sources, tokens = [], []
+                async for event in self.rag.stream_documentation_query(query, query_ctx):
+                    if event['event'] == 'sources':
+                        sources = [Source(**source) for source in event['data']['sources']]
+                    elif event['event'] == 'token':
+                        tokens.append(event['data']['token'])
+                    elif event['event'] == 'done':
+                        # Keep the streamed answer so paraphrases of this query are answered instantly
+                        self._remember_answer(query_ctx, QueryResponse(
+                            answer="".join(tokens),
+                            sources=sources,
+                            confidence_score=event['data']['confidence_score'],
+                            used_internet_search=False
+                        ))
+                    yield event
+                return
+            logger.info("Query appears to be general knowledge, using internet search")
+            response = await self.internet_search.process_internet_query(query)
+        except Exception as e:
+            logger.error(f"Error streaming query: {str(e)}")
+            response = QueryResponse(
+                answer="An error occurred while processing your query.",
+                sources=[],
+                confidence_score=0.0,
+                used_internet_search=False
+            )
+        for event in response_events(response):
+            yield event
+
+    def metrics(self) -> Dict:
+        """Runtime statistics for monitoring"""
+        return {
+            'ollama_pool': self.ollama.pool_stats(),
+            'model_health': self.health.snapshot(),
+            'admission': self.admission.stats(),
+            'caches': {
+                'responses': self.cache.stats(),
+                'semantic': self.semantic_cache.stats(),
+                'retrieval': self.rag.cache.stats(),
+                'internet_search': self.internet_search.cache.stats()
+            },
+            'executors': {
+                'retrieval': self.retrieval_executor.stats(),
+                'generation': self.generation_executor.stats()
+            },
+            'search_providers': self.internet_search.provider_stats(),
+            'corpus': self.corpus.stats() if self.corpus is not None else None,
+            'startup': self.startup_phases
+        }
+
+    async def start(self):
+        """Start background tasks on the serving event loop"""
+        self.health.start()
+
+    async def close(self):
+        """Stop background tasks and release pooled connections"""
+        await self.health.stop()
+        await self.ollama.close()
+        self.retrieval_executor.shutdown(wait=False)
+        self.generation_executor.shutdown(wait=False)
+
     async def _query_ollama(self, model: str, prompt: str) -> str:
         """Query Ollama model"""
         try:
             logger.info(f"Sending prompt to Ollama model '{model}':")
             logger.info(f"Prompt: {prompt}")
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{OLLAMA_CONFIG['base_url']}/api/generate",
-                    json={
-                        "model": model,
-                        "prompt": prompt,
-                        "stream": False,
-                        **MODEL_PARAMS[model]
-                    },
-                    timeout=OLLAMA_CONFIG["timeout"]
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        response_text = result.get("response", "")
-                        logger.info(f"Received response from Ollama model '{model}':")
-                        logger.info(f"Response: {response_text[:500]}...") 
-                        return response_text
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Error from Ollama API: {error_text}")
-                        return ""
+            async with self.admission.slot(model):
+                result = await self.ollama.generate(model, prompt, options=MODEL_PARAMS[model],
+                                                    timeout=OLLAMA_CONFIG["timeout"])
+            response_text = result.get("response", "")
+            logger.info(f"Received response from Ollama model '{model}':")
+            logger.info(f"Response: {response_text[:500]}...")
+            return response_text
         except Exception as e:
             logger.error(f"Error querying Ollama model {model}: {str(e)}")
             return ""
@@ -0,0 +1,237 @@
+"""Bounded LRU+TTL cache with single-flight loads and an optional persistent second level"""
+
+import asyncio
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.utils.logger import logger
+
+_MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory held by a value, measured by its pickled size"""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class TTLCache:
+    def __init__(self, name: str, max_entries: int = None, max_bytes: int = None, ttl: float = None,
+                 sizeof: Callable[[Any], int] = estimate_size, backend=None):
+        self.name = name
+        self.backend = backend
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        # Bumped by clear() so loads that started before it do not store stale values
+        self._generation = 0
+        self._lock = threading.RLock()
+        self._loading: Dict[Hashable, Future] = {}
+        self._loading_async: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+        self.backend_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key, count=False) is not _MISSING
+
+    def _lookup_memory(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                return _MISSING
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _lookup(self, key: Hashable, count: bool = True):
+        value = self._lookup_memory(key)
+        if value is _MISSING and self.backend is not None:
+            # Disk is read outside the lock so lookups of other keys never wait on it
+            value = self._promote(key, self.backend.get(key))
+        if count:
+            self._count(value)
+        return value
+
+    async def _lookup_async(self, key: Hashable):
+        """``_lookup`` that reads the backend in the loop's executor instead of on the event loop"""
+        value = self._lookup_memory(key)
+        if value is _MISSING and self.backend is not None:
+            result = await asyncio.get_running_loop().run_in_executor(None, self.backend.get, key)
+            value = self._promote(key, result)
+        self._count(value)
+        return value
+
+    def _count(self, value):
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    def _promote(self, key: Hashable, result: tuple):
+        """Move an entry stored by another process (or before a restart) into memory"""
+        found, value, expires_at = result
+        if not found:
+            return _MISSING
+        remaining = expires_at - time.time() if expires_at is not None else None
+        with self._lock:
+            self.backend_hits += 1
+            self._store(key, value, time.monotonic() + remaining if remaining is not None else None)
+        return value
+
+    def _store(self, key: Hashable, value: Any, expires_at):
+        size = self.sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            logger.debug(f"{self.name} cache: value of {size} bytes exceeds the cache size, not stored")
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+        while self._entries and (
+            (self.max_entries and len(self._entries) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    async def get_async(self, key: Hashable, default: Any = None) -> Any:
+        value = await self._lookup_async(key)
+        return default if value is _MISSING else value
+
+    def _set_memory(self, key: Hashable, value: Any, generation: int = None) -> bool:
+        """Store in memory; False when a clear() happened since the load began"""
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._store(key, value, expires_at)
+            return True
+
+    def set(self, key: Hashable, value: Any, generation: int = None):
+        if self._set_memory(key, value, generation) and self.backend is not None:
+            self.backend.set(key, value)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._generation += 1
+        if self.backend is not None:
+            self.backend.clear()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                       cache_if: Callable[[Any], bool] = None) -> Any:
+        """Return the cached value or compute it once, even when called from several threads"""
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            generation = self._generation
+            future = self._loading.get(key)
+            leader = future is None
+            if leader:
+                future = self._loading[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+            if cache_if is None or cache_if(value):
+                self.set(key, value, generation)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]],
+                          cache_if: Callable[[Any], bool] = None) -> Any:
+        """Async ``get_or_compute``: concurrent misses for a key share one ``load()``"""
+        value = await self._lookup_async(key)
+        if value is not _MISSING:
+            return value
+        future = self._loading_async.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield() so a cancelled waiter does not cancel the shared load
+            return await asyncio.shield(future)
+
+        future = self._loading_async[key] = asyncio.get_running_loop().create_future()
+        generation = self._generation
+        try:
+            value = await load()
+            stored = (cache_if is None or cache_if(value)) and self._set_memory(key, value, generation)
+            future.set_result(value)
+            if stored and self.backend is not None:
+                # Waiters already have the value; only this caller waits for the disk write
+                await asyncio.get_running_loop().run_in_executor(None, self.backend.set, key, value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters receive the error; mark it retrieved so an unawaited future does not warn
+            future.exception()
+            raise
+        finally:
+            self._loading_async.pop(key, None)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'coalesced': self.coalesced,
+            'backend_hits': self.backend_hits,
+            'backend': self.backend.stats() if self.backend is not None else None
+        }
@@ -0,0 +1,282 @@
+import html
+import re
+from pathlib import PurePath
+from typing import Dict, FrozenSet, List, Tuple
+
+from app.config.model_config import CHUNKING_CONFIG
+from app.utils.logger import logger
+
+HEADER_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+FENCE_PATTERN = re.compile(r"^\s*(```|~~~)")
+LIST_ITEM_PATTERN = re.compile(r"^\s*([-*+]|\d+[.)])\s+")
+TABLE_ROW_PATTERN = re.compile(r"^\s*\|")
+FRONT_MATTER_PATTERN = re.compile(r"\A---\n.*?\n---\n", re.DOTALL)
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+
+HEADER_PATH_SEPARATOR = " > "
+# Part of the chunking fingerprint, so changing the id format re-indexes everything
+CHUNK_ID_SCHEME = "path#index"
+# Also fingerprinted: bump when the chunker's output changes for the same settings
+CHUNKER_VERSION = 2
+
+
+def document_id(path: str) -> str:
+    """Stable document id: the path relative to the documentation root, with forward slashes"""
+    return PurePath(path).as_posix()
+
+
+def chunk_id(doc_id: str, index: int) -> str:
+    return f"{doc_id}#{index}"
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+
+class MarkdownChunker:
+    """Split markdown into retrieval chunks following CHUNKING_CONFIG"""
+
+    def __init__(self, config: Dict = None):
+        config = config or CHUNKING_CONFIG
+        self.semantic = config["semantic"]
+        self.structural = config["structural"]
+
+    def split(self, text: str) -> List[Tuple[str, str]]:
+        """Split text into ``(header_path, content)`` chunks, each starting with its section heading"""
+        if self.semantic.get("remove_metadata") or not self.structural.get("preserve_metadata", True):
+            text = FRONT_MATTER_PATTERN.sub("", text)
+
+        chunks = []
+        for header_path, heading, blocks in self._sections(text):
+            # Chunks never span sections, so every chunk is labelled by the heading it sits under
+            for content in self._merge_small(self._pack(blocks)):
+                chunks.append((header_path, f"{heading}\n\n{content}" if heading else content))
+        return chunks
+
+    def _sections(self, text: str) -> List[Tuple[str, str, List[Tuple[str, str]]]]:
+        """Parse text into ``(header_path, heading, blocks)`` sections of ``(kind, text)`` blocks"""
+        structural = self.structural["enabled"]
+        split_headers = structural and self.structural["markdown_headers"]
+        keep_code = structural and self.structural["code_blocks"]
+        keep_lists = structural and self.structural["lists"]
+        keep_tables = structural and self.structural["tables"]
+
+        sections: List[Tuple[str, str, List[Tuple[str, str]]]] = []
+        headers: List[Tuple[int, str]] = []
+        blocks: List[Tuple[str, str]] = []
+        lines: List[str] = []
+        kind = None
+        in_fence = False
+        after_blank = False
+
+        def flush_block():
+            nonlocal lines, kind
+            content = "\n".join(lines).strip("\n")
+            if content.strip():
+                blocks.append((kind or "paragraph", content))
+            lines, kind = [], None
+
+        def flush_section():
+            nonlocal blocks
+            flush_block()
+            if blocks:
+                path = HEADER_PATH_SEPARATOR.join(title for _, title in headers)
+                heading = f"{'#' * headers[-1][0]} {path}" if headers else ""
+                sections.append((path, heading, blocks))
+            blocks = []
+
+        for line in text.splitlines():
+            if in_fence:
+                lines.append(line)
+                if FENCE_PATTERN.match(line):
+                    in_fence = False
+                    flush_block()
+                continue
+
+            if keep_code and FENCE_PATTERN.match(line):
+                flush_block()
+                kind, lines, in_fence = "code", [line], True
+                continue
+
+            header = HEADER_PATTERN.match(line) if split_headers else None
+            if header:
+                flush_section()
+                level = len(header.group(1))
+                headers = [(lvl, title) for lvl, title in headers if lvl < level]
+                headers.append((level, header.group(2)))
+                after_blank = False
+                continue
+
+            if not line.strip():
+                if kind != "list":
+                    flush_block()
+                after_blank = True
+                continue
+
+            if keep_tables and TABLE_ROW_PATTERN.match(line):
+                if kind != "table":
+                    flush_block()
+                kind = "table"
+            elif keep_lists and LIST_ITEM_PATTERN.match(line):
+                if kind != "list":
+                    flush_block()
+                kind = "list"
+            elif kind == "list" and after_blank and not line.startswith((" ", "\t")):
+                # A non-indented line after a blank ends the list
+                flush_block()
+                kind = "paragraph"
+            elif kind not in ("paragraph", "list"):
+                flush_block()
+                kind = "paragraph"
+
+            lines.append(line)
+            after_blank = False
+
+        flush_section()
+        return sections
+
+    def _clean(self, text: str) -> str:
+        if not self.semantic.get("clean_chunks"):
+            return text.strip()
+        text = html.unescape(HTML_TAG_PATTERN.sub("", text))
+        text = "\n".join(line.rstrip() for line in text.splitlines())
+        return BLANK_LINES_PATTERN.sub("\n\n", text).strip()
+
+    def _pack(self, blocks: List[Tuple[str, str]]) -> List[str]:
+        """Pack a section's blocks into chunks no larger than the maximum size"""
+        max_words = self.semantic["max_chunk_size"] if self.semantic["enabled"] else None
+        pieces: List[str] = []
+        for kind, text in blocks:
+            if kind != "code":
+                text = self._clean(text)
+            if not text:
+                continue
+            if max_words is None or word_count(text) <= max_words or kind in ("code", "table"):
+                pieces.append(text)
+            elif kind == "list":
+                pieces.extend(self._pack_parts(text.split("\n"), "\n", max_words))
+            else:
+                pieces.extend(self._split_semantic(text, self.semantic["split_on"], max_words))
+
+        if max_words is None:
+            return ["\n\n".join(pieces)] if pieces else []
+        return self._pack_parts(pieces, "\n\n", max_words)
+
+    @staticmethod
+    def _pack_parts(parts: List[str], joiner: str, max_words: int) -> List[str]:
+        """Greedily join consecutive parts while staying under ``max_words``"""
+        chunks, current, current_words = [], [], 0
+        for part in parts:
+            words = word_count(part)
+            if current and current_words + words > max_words:
+                chunks.append(joiner.join(current))
+                current, current_words = [], 0
+            current.append(part)
+            current_words += words
+        if current:
+            chunks.append(joiner.join(current))
+        return chunks
+
+    def _split_semantic(self, text: str, separators: List[str], max_words: int) -> List[str]:
+        """Recursively split text on natural breaks, then overlap consecutive pieces"""
+        pieces = self._split_recursive(text, separators, max_words)
+        overlap = self.semantic["overlap"]
+        if overlap <= 0 or len(pieces) < 2:
+            return pieces
+        overlapped = [pieces[0]]
+        for previous, piece in zip(pieces, pieces[1:]):
+            tail = " ".join(previous.split()[-overlap:])
+            overlapped.append(f"{tail} {piece}")
+        return overlapped
+
+    def _split_recursive(self, text: str, separators: List[str], max_words: int) -> List[str]:
+        if word_count(text) <= max_words:
+            return [text]
+        for position, separator in enumerate(separators):
+            if separator not in text:
+                continue
+            # Keep punctuation such as "." with the piece it ends
+            kept = separator.strip()
+            parts = text.split(separator)
+            parts = [part + kept for part in parts[:-1]] + [parts[-1]]
+            parts = [part.strip() for part in parts if part.strip()]
+            pieces = []
+            for part in self._pack_parts(parts, " ", max_words):
+                pieces.extend(self._split_recursive(part, separators[position + 1:], max_words))
+            return pieces
+        # No separator left: hard split on word boundaries
+        words = text.split()
+        return [" ".join(words[i:i + max_words]) for i in range(0, len(words), max_words)]
+
+    def _merge_small(self, chunks: List[str]) -> List[str]:
+        """Fold a section's chunks under the minimum size into the previous chunk, or the next one at the start"""
+        min_words = self.semantic["min_chunk_size"] if self.semantic["enabled"] else 0
+        max_words = self.semantic["max_chunk_size"] if self.semantic["enabled"] else None
+        merged: List[str] = []
+        pending = None
+        for content in chunks:
+            if pending:
+                content, pending = f"{pending}\n\n{content}", None
+            words = word_count(content)
+            if words >= min_words:
+                merged.append(content)
+            elif merged and (max_words is None or word_count(merged[-1]) + words <= max_words):
+                merged[-1] = f"{merged[-1]}\n\n{content}"
+            else:
+                pending = content
+        if pending:
+            # A trailing fragment that does not fit the previous chunk stays on its own
+            if merged and (max_words is None or word_count(merged[-1]) + word_count(pending) <= max_words):
+                merged[-1] = f"{merged[-1]}\n\n{pending}"
+            else:
+                merged.append(pending)
+        return merged
+
+
+def sentence_index(content: str) -> List[Tuple[str, FrozenSet[str]]]:
+    """Answerable sentences of a chunk with their lowercase word sets, for the offline answer fallback"""
+    lines = [line.strip() for line in content.split('\n') if line.strip()]
+    # Skip metadata lines (lines starting with ---) and the section heading each chunk starts with
+    text = ' '.join(line for line in lines if not line.startswith(('---', '#')))
+    index = []
+    for sentence in text.split('.'):
+        sentence = sentence.strip()
+        # Headings, bold labels and links make poor standalone answers
+        if not sentence or sentence.startswith('#') or '**' in sentence or '[' in sentence:
+            continue
+        index.append((sentence.replace('\\', '').strip() + '.', frozenset(sentence.lower().split())))
+    return index
+
+
+def _split_simple(text: str) -> List[Tuple[str, str]]:
+    return [("", part) for part in text.split("\n\n") if part.strip()]
+
+
+def chunk_document(doc: Dict, chunker: MarkdownChunker = None) -> List[Dict]:
+    """Split a document into chunks with ids and metadata for indexing"""
+    chunker = chunker or MarkdownChunker()
+    try:
+        pieces = chunker.split(doc['content'])
+    except Exception as e:
+        if not CHUNKING_CONFIG["structural"]["error_handling"]["fallback_to_simple"]:
+            raise
+        logger.warning(f"Structured chunking failed for {doc['path']}, using paragraph split: {str(e)}")
+        pieces = _split_simple(doc['content'])
+
+    doc_id = doc.get('id') or document_id(doc['path'])
+    return [
+        {
+            'id': chunk_id(doc_id, i),
+            'content': content,
+            'sentences': sentence_index(content),
+            'metadata': {
+                'doc_id': doc_id,
+                'title': doc['title'],
+                'path': doc['path'],
+                'chunk_index': i,
+                'header_path': header_path
+            }
+        }
+        for i, (header_path, content) in enumerate(pieces)
+    ]
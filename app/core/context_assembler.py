@@ -0,0 +1,88 @@
+from typing import Callable, Dict, List, Optional
+
+from app.config.model_config import CHUNKING_CONFIG
+from app.utils.logger import logger
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting prompts (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+
+class ContextAssembler:
+    """Build the LLM context from ranked chunks within a token budget"""
+
+    def __init__(self, get_chunk: Callable[[str, int], Optional[Dict]], config: Dict = None):
+        config = config or CHUNKING_CONFIG
+        self.get_chunk = get_chunk
+        self.max_chunks = config["query_aware"]["max_chunks"]
+        self.max_tokens = config["context"]["max_tokens"]
+        self.context_window = config["context"]["context_window"]
+        self.include_siblings = config["context"]["enabled"] and config["context"]["include_siblings"]
+
+    def assemble(self, ranked_chunks: List[Dict]) -> List[Dict]:
+        """Select chunks for the prompt and merge them into per-document passages"""
+        selected: Dict[str, Dict] = {}
+        budget = self.max_tokens
+
+        for chunk in ranked_chunks[:self.max_chunks]:
+            tokens = estimate_tokens(chunk['content'])
+            if tokens > budget:
+                if selected:
+                    break
+                # Always keep the best chunk, trimmed to the budget
+                chunk = dict(chunk, content=chunk['content'][:budget * 4])
+                tokens = budget
+            selected[chunk['id']] = chunk
+            budget -= tokens
+
+        if self.include_siblings and budget > 0:
+            budget = self._add_siblings(selected, budget)
+
+        passages = self._merge(list(selected.values()), ranked_chunks)
+        logger.info(
+            f"Assembled {len(selected)} chunks into {len(passages)} passages "
+            f"({self.max_tokens - budget}/{self.max_tokens} tokens)"
+        )
+        return passages
+
+    def _add_siblings(self, selected: Dict[str, Dict], budget: int) -> int:
+        """Add neighbouring chunks of the selected ones, nearest first, while budget remains"""
+        anchors = list(selected.values())
+        for distance in range(1, self.context_window // 2 + 1):
+            for anchor in anchors:
+                path = anchor['metadata']['path']
+                position = anchor['metadata']['chunk_index']
+                for neighbour_position in (position - distance, position + distance):
+                    neighbour = self.get_chunk(path, neighbour_position)
+                    if neighbour is None or neighbour['id'] in selected:
+                        continue
+                    tokens = estimate_tokens(neighbour['content'])
+                    if tokens > budget:
+                        continue
+                    selected[neighbour['id']] = dict(neighbour, score=anchor.get('score', 0.0))
+                    budget -= tokens
+        return budget
+
+    @staticmethod
+    def _merge(chunks: List[Dict], ranked_chunks: List[Dict]) -> List[Dict]:
+        """Group chunks by document in rank order and join each group in reading order"""
+        doc_rank = {}
+        for chunk in ranked_chunks:
+            doc_rank.setdefault(chunk['metadata']['path'], len(doc_rank))
+
+        by_path: Dict[str, List[Dict]] = {}
+        for chunk in chunks:
+            by_path.setdefault(chunk['metadata']['path'], []).append(chunk)
+
+        passages = []
+        for path in sorted(by_path, key=lambda p: doc_rank.get(p, len(doc_rank))):
+            group = sorted(by_path[path], key=lambda c: c['metadata']['chunk_index'])
+            passages.append({
+                'title': group[0]['metadata']['title'],
+                'path': path,
+                'content': '\n\n'.join(chunk['content'] for chunk in group),
+                'score': max(chunk.get('score', 0.0) for chunk in group),
+                'chunk_ids': [chunk['id'] for chunk in group]
+            })
+        return passages
@@ -0,0 +1,223 @@
+"""Documentation corpus in one memory-mapped file shared by every worker, one directory per version"""
+
+import json
+import mmap
+import os
+import shutil
+import tempfile
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.chunking import chunk_document, document_id
+from app.core.inverted_index import InvertedIndex, StoredPostings
+from app.utils.logger import logger
+
+BLOB_FILE = "corpus.bin"
+TABLE_FILE = "corpus.json"
+INDEX_FILE = "postings.bin"
+SIGNATURE_FILE = "scan_signature"
+# Part of each version's directory name, so versions written in an older layout are rebuilt
+STORE_FORMAT = 2
+
+Span = Tuple[int, int]
+
+
+class StoredDocument(Mapping):
+    """Read-only document dict whose ``content`` is decoded from the corpus on access"""
+
+    def __init__(self, store: "CorpusStore", fields: Dict, content: Span):
+        self._store = store
+        self._fields = fields
+        self._content = content
+
+    def __getitem__(self, key):
+        if key == 'content':
+            return self._store.text(self._content)
+        return self._fields[key]
+
+    def __contains__(self, key) -> bool:
+        return key == 'content' or key in self._fields
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._fields
+        yield 'content'
+
+    def __len__(self) -> int:
+        return len(self._fields) + 1
+
+
+class StoredChunk(Mapping):
+    """Read-only chunk dict whose ``content`` and ``sentences`` are read from the corpus on access"""
+
+    def __init__(self, store: "CorpusStore", chunk_id: str, metadata: Dict, content: Span,
+                 sentences: Span, sentence_words: Span):
+        self._store = store
+        self._fields = {'id': chunk_id, 'metadata': metadata}
+        self._content = content
+        self._sentences = sentences
+        self._sentence_words = sentence_words
+
+    def __getitem__(self, key):
+        if key == 'content':
+            return self._store.text(self._content)
+        if key == 'sentences':
+            sentences = self._store.text(self._sentences)
+            if not sentences:
+                return []
+            words = self._store.text(self._sentence_words)
+            return [(sentence, frozenset(line.split()))
+                    for sentence, line in zip(sentences.split('\n'), words.split('\n'))]
+        return self._fields[key]
+
+    def __contains__(self, key) -> bool:
+        return key in ('content', 'sentences') or key in self._fields
+
+    def __iter__(self) -> Iterator[str]:
+        yield from ('id', 'content', 'sentences', 'metadata')
+
+    def __len__(self) -> int:
+        return 4
+
+
+class CorpusStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, TABLE_FILE), 'r', encoding='utf-8') as f:
+            self._table = json.load(f)
+        self._file = open(os.path.join(directory, BLOB_FILE), 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap cannot map an empty file
+        self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.size = size
+        self.postings = StoredPostings(os.path.join(directory, INDEX_FILE))
+
+    @property
+    def fingerprint(self) -> str:
+        return self._table['fingerprint']
+
+    def text(self, span: Span) -> str:
+        offset, length = span
+        return self._blob[offset:offset + length].decode('utf-8')
+
+    def documents(self) -> List[StoredDocument]:
+        return [StoredDocument(self, entry['fields'], tuple(entry['content'])) for entry in self._table['documents']]
+
+    def chunks(self) -> List[StoredChunk]:
+        return [
+            StoredChunk(self, entry['id'], entry['metadata'], tuple(entry['content']),
+                        tuple(entry['sentences']), tuple(entry['sentence_words']))
+            for entry in self._table['chunks']
+        ]
+
+    def keyword_index(self) -> InvertedIndex:
+        """Keyword index over the stored chunks; documents re-indexed at runtime are added in memory"""
+        return InvertedIndex(self.postings)
+
+    def stats(self) -> Dict:
+        return {
+            'path': self.directory,
+            'bytes': self.size,
+            'postings_bytes': os.path.getsize(os.path.join(self.directory, INDEX_FILE)),
+            'documents': len(self._table['documents']),
+            'chunks': len(self._table['chunks'])
+        }
+
+    def close(self):
+        self.postings.close()
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._file.close()
+
+    @staticmethod
+    def write(directory: str, documents: List[Dict], fingerprint: str):
+        """Write the blob and offsets table for the documents and their chunks, and the chunks' postings"""
+        offset = 0
+        table = {'fingerprint': fingerprint, 'documents': [], 'chunks': []}
+        index = InvertedIndex()
+
+        with open(os.path.join(directory, BLOB_FILE), 'wb') as blob:
+            def append(text: str) -> List[int]:
+                nonlocal offset
+                data = text.encode('utf-8')
+                blob.write(data)
+                span = [offset, len(data)]
+                offset += len(data)
+                return span
+
+            for doc in documents:
+                fields = {key: doc[key] for key in doc if key != 'content'}
+                fields.setdefault('id', document_id(doc['path']))
+                table['documents'].append({'fields': fields, 'content': append(doc['content'])})
+                for chunk in chunk_document(dict(doc)):
+                    index.add(chunk['id'], chunk['content'])
+                    table['chunks'].append({
+                        'id': chunk['id'],
+                        'metadata': chunk['metadata'],
+                        'content': append(chunk['content']),
+                        # Sentences never contain newlines: the index joins lines before splitting
+                        'sentences': append('\n'.join(sentence for sentence, _ in chunk['sentences'])),
+                        'sentence_words': append('\n'.join(' '.join(words) for _, words in chunk['sentences']))
+                    })
+
+        index.write(os.path.join(directory, INDEX_FILE))
+        with open(os.path.join(directory, TABLE_FILE), 'w', encoding='utf-8') as f:
+            json.dump(table, f)
+
+    @classmethod
+    def open_matching(cls, root: str, signature: str) -> Optional["CorpusStore"]:
+        """The corpus version built from files with this scan signature, if there is one"""
+        if not os.path.isdir(root):
+            return None
+        for name in os.listdir(root):
+            directory = os.path.join(root, name)
+            try:
+                with open(os.path.join(directory, SIGNATURE_FILE), 'r', encoding='utf-8') as f:
+                    if f.read().strip() != signature:
+                        continue
+                return cls(directory)
+            except (OSError, ValueError):
+                continue
+        return None
+
+    @staticmethod
+    def record_signature(directory: str, signature: str):
+        """Remember which files the version was built from; replaced atomically"""
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(signature)
+            os.replace(tmp_path, os.path.join(directory, SIGNATURE_FILE))
+        except OSError as e:
+            logger.warning(f"Could not record the scan signature of {directory}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def open_or_build(cls, root: str, documents: List[Dict], fingerprint: str,
+                      signature: str = None) -> "CorpusStore":
+        """Open the corpus version for this fingerprint, building it first if no worker has yet"""
+        directory = os.path.join(root, f"{fingerprint[:16]}-v{STORE_FORMAT}")
+        if not os.path.exists(os.path.join(directory, TABLE_FILE)):
+            os.makedirs(root, exist_ok=True)
+            tmp_directory = tempfile.mkdtemp(dir=root, prefix='.building-')
+            try:
+                cls.write(tmp_directory, documents, fingerprint)
+                os.rename(tmp_directory, directory)
+                logger.info(f"Built corpus store {directory} ({len(documents)} documents)")
+            except OSError:
+                # Another worker published the same version first
+                shutil.rmtree(tmp_directory, ignore_errors=True)
+                if not os.path.exists(os.path.join(directory, TABLE_FILE)):
+                    raise
+            cls._prune(root, keep=os.path.basename(directory))
+        if signature:
+            # Refreshed when an existing version is reused for files with new modification times
+            cls.record_signature(directory, signature)
+        return cls(directory)
+
+    @staticmethod
+    def _prune(root: str, keep: str):
+        """Remove older corpus versions; workers that still map them keep their open files"""
+        for name in os.listdir(root):
+            if name != keep and not name.startswith('.'):
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
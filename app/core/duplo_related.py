@@ -1,4 +1,5 @@
 from app.config.model_config import VECTOR_DB_CONFIG, DUPLO_KEYWORDS
+from app.core.query_context import QueryContext
 
 import logging
 
@@ -8,12 +9,13 @@ class DuploRelated:
     def __init__(self, collection):
         self.collection = collection
 
-    def is_duplo_related(self, query: str) -> bool:
+    def is_duplo_related(self, query_ctx: QueryContext) -> bool:
         """Check if the query is related to DuploCloud using vector similarity"""
+        query = query_ctx.query
         try:
-            # Search vector database for similar content
+            # Search vector database for similar content using the shared query embedding
             results = self.collection.query(
-                query_texts=[query],
+                **query_ctx.query_args(),
                 n_results=1
             )
             
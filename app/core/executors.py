@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict
+
+from app.utils.logger import logger
+
+
+class InstrumentedExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that reports its queue depth and how long work waits for a worker"""
+
+    def __init__(self, name: str, max_workers: int):
+        super().__init__(max_workers=max_workers, thread_name_prefix=name)
+        self.name = name
+        self.max_workers = max_workers
+        self._stats_lock = threading.Lock()
+        self.queued = 0
+        self.started = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+        self.recent_waits = deque(maxlen=256)
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        submitted_at = time.perf_counter()
+        with self._stats_lock:
+            self.queued += 1
+
+        def run():
+            started_at = time.perf_counter()
+            wait = started_at - submitted_at
+            with self._stats_lock:
+                self.queued -= 1
+                self.started += 1
+                self.running += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                self.recent_waits.append(wait)
+            if wait > 1.0:
+                logger.warning(f"{self.name} executor: work waited {wait:.2f} seconds for a worker")
+            failed = False
+            try:
+                return fn(*args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                with self._stats_lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self.failed += failed
+                    self.total_run += time.perf_counter() - started_at
+
+        return super().submit(run)
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            waits = sorted(self.recent_waits)
+            completed = self.completed
+            return {
+                'max_workers': self.max_workers,
+                'queued': self.queued,
+                'running': self.running,
+                'completed': completed,
+                'failed': self.failed,
+                'avg_wait': round(self.total_wait / self.started, 4) if self.started else 0.0,
+                'p95_wait': round(waits[int(0.95 * (len(waits) - 1))], 4) if waits else 0.0,
+                'max_wait': round(self.max_wait, 4),
+                'avg_run': round(self.total_run / completed, 4) if completed else 0.0
+            }
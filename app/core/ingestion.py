@@ -0,0 +1,305 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Iterator, List, Optional
+
+from app.config.model_config import CHUNKING_CONFIG, DOCS_CONFIG, VECTOR_DB_CONFIG
+from app.core.chunking import CHUNK_ID_SCHEME, CHUNKER_VERSION, chunk_document, document_id
+from app.utils.logger import logger
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def chunking_fingerprint() -> str:
+    """Hash of the chunking settings, chunker version and chunk id format; a change invalidates every index"""
+    return content_hash(json.dumps(
+        {'chunking': CHUNKING_CONFIG, 'ids': CHUNK_ID_SCHEME, 'chunker': CHUNKER_VERSION}, sort_keys=True
+    ))
+
+
+def corpus_fingerprint(documents: List[Dict]) -> str:
+    """Hash of every document's path and content plus the chunking settings"""
+    digest = hashlib.sha256(chunking_fingerprint().encode('utf-8'))
+    for doc in sorted(documents, key=lambda d: d['path']):
+        digest.update(f"{doc['path']}\0{content_hash(doc['content'])}\0".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class LazyDocument(Mapping):
+    """Document dict whose ``content`` is read from disk the first time it is accessed"""
+
+    def __init__(self, source_path: str, fields: Dict, size: int, mtime_ns: int):
+        self.source_path = source_path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self._fields = fields
+        self._content = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._content is not None
+
+    def load(self) -> str:
+        """Read the file once; concurrent first accesses share the read"""
+        if self._content is None:
+            with self._lock:
+                if self._content is None:
+                    with open(self.source_path, 'r', encoding='utf-8') as f:
+                        self._content = f.read()
+        return self._content
+
+    def __getitem__(self, key):
+        if key == 'content':
+            return self.load()
+        return self._fields[key]
+
+    def __contains__(self, key) -> bool:
+        return key == 'content' or key in self._fields
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._fields
+        yield 'content'
+
+    def __len__(self) -> int:
+        return len(self._fields) + 1
+
+
+def scan_documentation(docs_path: str, extensions: List[str] = None) -> List[str]:
+    """Paths of the documentation files under ``docs_path``, in a stable order"""
+    extensions = set(extensions or DOCS_CONFIG["extensions"])
+    paths = []
+    pending = [docs_path]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    # Directory entries carry their type, so files are filtered without a stat call
+                    if entry.is_dir() and not entry.is_symlink():
+                        pending.append(entry.path)
+                    elif os.path.splitext(entry.name)[1] in extensions and entry.is_file():
+                        paths.append(entry.path)
+        except OSError as e:
+            logger.error(f"Error scanning {directory}: {str(e)}")
+    return sorted(paths)
+
+
+def _describe(docs_path: str, file_path: str) -> Optional[LazyDocument]:
+    try:
+        stat = os.stat(file_path)
+    except OSError as e:
+        logger.error(f"Error reading file {file_path}: {str(e)}")
+        return None
+    relative_path = os.path.relpath(file_path, docs_path)
+    fields = {
+        'id': document_id(relative_path),
+        'title': os.path.splitext(os.path.basename(file_path))[0],
+        'path': relative_path
+    }
+    return LazyDocument(file_path, fields, stat.st_size, stat.st_mtime_ns)
+
+
+def _read(doc: LazyDocument) -> Optional[LazyDocument]:
+    try:
+        content = doc.load()
+    except Exception as e:
+        logger.error(f"Error reading file {doc.source_path}: {str(e)}")
+        return None
+    logger.debug(f"Loaded documentation from {doc.source_path} (size: {len(content)} bytes)")
+    return doc
+
+
+def preload_documents(documents: List[LazyDocument], workers: int = None) -> List[LazyDocument]:
+    """Read the content of every document in a thread pool, dropping files that cannot be read"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers or DOCS_CONFIG["read_workers"]) as pool:
+        loaded = [doc for doc in pool.map(_read, documents) if doc is not None]
+    logger.info(
+        f"Read {len(loaded)} documentation files ({sum(doc.size for doc in loaded)} bytes) "
+        f"in {time.perf_counter() - start:.3f}s"
+    )
+    return loaded
+
+
+def scan_signature(documents: List[LazyDocument]) -> str:
+    """Hash of every file's path, size and modification time plus the chunking settings"""
+    digest = hashlib.sha256(chunking_fingerprint().encode('utf-8'))
+    for doc in sorted(documents, key=lambda d: d['path']):
+        digest.update(f"{doc['path']}\0{doc.size}\0{doc.mtime_ns}\0".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_documentation(docs_path: str, lazy: bool = False, workers: int = None) -> List[Dict]:
+    """Load the documentation files; with ``lazy`` only their metadata, content is read on first access"""
+    if not os.path.isdir(docs_path):
+        logger.warning(f"Documentation directory {docs_path} does not exist")
+        return []
+
+    start = time.perf_counter()
+    paths = scan_documentation(docs_path)
+    scanned = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers or DOCS_CONFIG["read_workers"]) as pool:
+        docs = [doc for doc in pool.map(partial(_describe, docs_path), paths) if doc is not None]
+    logger.info(
+        f"Found {len(docs)} documentation files in {os.path.abspath(docs_path)} "
+        f"(scan {scanned - start:.3f}s, stat {time.perf_counter() - scanned:.3f}s)"
+    )
+    if lazy:
+        return docs
+    return [dict(doc) for doc in preload_documents(docs, workers)]
+
+
+class IngestionManifest:
+    """Record of what is in the vector database: document path -> content hash and chunk ids"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fingerprint = None
+        self.documents: Dict[str, Dict] = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.fingerprint = data.get('fingerprint')
+            self.documents = data.get('documents', {})
+        except Exception as e:
+            logger.error(f"Error reading ingestion manifest {self.path}, starting fresh: {str(e)}")
+            self.fingerprint = None
+            self.documents = {}
+
+    def save(self):
+        """Write the manifest atomically so a crash never leaves it half written"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'documents': self.documents}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class DocumentIndexer:
+    """Keep the vector database in step with the documentation by embedding only what changed"""
+
+    def __init__(self, collection, manifest_path: str, embedding_function=None,
+                 batch_size: int = None, embedding_workers: int = None):
+        ingestion_config = VECTOR_DB_CONFIG["ingestion"]
+        self.collection = collection
+        self.manifest = IngestionManifest(manifest_path)
+        self.embedding_function = embedding_function
+        self.batch_size = batch_size or ingestion_config["batch_size"]
+        self.embedding_workers = embedding_workers or ingestion_config["embedding_workers"]
+
+    def _reset_if_untracked(self, fingerprint: str):
+        """Drop everything when the index predates the manifest or the chunking settings changed"""
+        if self.manifest.fingerprint == fingerprint and (self.manifest.documents or self.collection.count() == 0):
+            return
+        existing_ids = self.collection.get(include=[])['ids']
+        if existing_ids:
+            logger.info(f"Vector database is not tracked by the current manifest, removing {len(existing_ids)} chunks")
+            self.collection.delete(ids=existing_ids)
+        self.manifest.documents = {}
+        self.manifest.fingerprint = fingerprint
+
+    def _write_batch(self, batch: List[Dict], embeddings: Optional[list]):
+        self.collection.add(
+            ids=[chunk['id'] for chunk in batch],
+            documents=[chunk['content'] for chunk in batch],
+            metadatas=[chunk['metadata'] for chunk in batch],
+            embeddings=embeddings
+        )
+
+    def _embed_and_store(self, chunks: List[Dict]) -> float:
+        """Embed chunks in batches and write each batch in bulk; returns chunks per second"""
+        if not chunks:
+            return 0.0
+        start_time = time.time()
+        batches = [chunks[i:i + self.batch_size] for i in range(0, len(chunks), self.batch_size)]
+
+        if self.embedding_function is None:
+            for batch in batches:
+                self._write_batch(batch, None)
+        else:
+            # Keep a bounded number of batches in flight so memory does not grow with the corpus
+            with ThreadPoolExecutor(max_workers=self.embedding_workers) as pool:
+                pending = deque()
+                for batch in batches:
+                    pending.append((batch, pool.submit(self.embedding_function, [c['content'] for c in batch])))
+                    if len(pending) > self.embedding_workers:
+                        done_batch, future = pending.popleft()
+                        self._write_batch(done_batch, future.result())
+                while pending:
+                    done_batch, future = pending.popleft()
+                    self._write_batch(done_batch, future.result())
+
+        elapsed = max(time.time() - start_time, 1e-6)
+        throughput = len(chunks) / elapsed
+        logger.info(
+            f"Embedded and stored {len(chunks)} chunks in {len(batches)} batches "
+            f"in {elapsed:.2f} seconds ({throughput:.1f} chunks/s)"
+        )
+        return throughput
+
+    def sync(self, documents: List[Dict]) -> Dict:
+        """Embed added and changed documents and delete removed ones"""
+        start_time = time.time()
+        self._reset_if_untracked(chunking_fingerprint())
+
+        current = {doc['path']: doc for doc in documents}
+        indexed = self.manifest.documents
+        stats = {'added': [], 'changed': [], 'removed': [], 'unchanged': 0,
+                 'chunks_added': 0, 'chunks_deleted': 0, 'chunks_per_second': 0.0}
+        stale_ids: List[str] = []
+        new_chunks: List[Dict] = []
+        seen_ids = set()
+
+        for path in [path for path in indexed if path not in current]:
+            stale_ids.extend(indexed.pop(path)['chunk_ids'])
+            stats['removed'].append(path)
+
+        for path, doc in current.items():
+            digest = content_hash(doc['content'])
+            entry = indexed.get(path)
+            if entry and entry['hash'] == digest:
+                stats['unchanged'] += 1
+                continue
+            if entry:
+                stale_ids.extend(entry['chunk_ids'])
+                stats['changed'].append(path)
+            else:
+                stats['added'].append(path)
+
+            chunk_ids = []
+            for chunk in chunk_document(doc):
+                if chunk['id'] in seen_ids:
+                    logger.warning(f"Skipping duplicate chunk id {chunk['id']} from {path}")
+                    continue
+                seen_ids.add(chunk['id'])
+                chunk_ids.append(chunk['id'])
+                new_chunks.append(chunk)
+            indexed[path] = {'hash': digest, 'chunk_ids': chunk_ids}
+
+        if stale_ids:
+            self.collection.delete(ids=stale_ids)
+        stats['chunks_deleted'] = len(stale_ids)
+        stats['chunks_per_second'] = self._embed_and_store(new_chunks)
+        stats['chunks_added'] = len(new_chunks)
+
+        self.manifest.save()
+        logger.info(
+            f"Index sync: {len(stats['added'])} added, {len(stats['changed'])} changed, "
+            f"{len(stats['removed'])} removed, {stats['unchanged']} unchanged documents "
+            f"(+{stats['chunks_added']}/-{stats['chunks_deleted']} chunks) "
+            f"in {time.time() - start_time:.2f} seconds"
+        )
+        return stats
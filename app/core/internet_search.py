@@ -1,47 +1,115 @@
 import aiohttp
 import asyncio
-from duckduckgo_search import DDGS
+import random
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlparse
+
+from bs4 import BeautifulSoup
 
 from app.config.search_config import SEARCH_PROVIDERS, SEARCH_PROVIDER_PRIORITY,SEARCH_CONFIG
 from app.models.schemas import QueryResponse, Source
 from typing import List, Dict
 from app.utils.logger import logger, log_execution_time
 from app.config.prompt import PROMPTS
+from app.core.cache import TTLCache
+from app.core.page_fetcher import PageFetcher
+from app.core.sentence_scoring import score_sentences, top_k
+from app.core.persistent_cache import open_backend
+
+class DuckDuckGoRateLimited(Exception):
+    pass
+
+
+def _result_url(href: str) -> str:
+    """Unwrap DuckDuckGo's ``/l/?uddg=<url>`` redirect links"""
+    parsed = urlparse(href)
+    if parsed.path.startswith('/l/'):
+        target = parse_qs(parsed.query).get('uddg')
+        if target:
+            return target[0]
+    return href
+
+
+def _dedup_key(url: str) -> str:
+    """URL normalised so the same page found by two providers is kept once"""
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return f"{host}{parsed.path.rstrip('/')}?{parsed.query}" if host else url.strip()
+
+
+def parse_duckduckgo_results(html: str, max_results: int) -> List[Dict]:
+    """Organic results from a DuckDuckGo HTML results page, ads skipped"""
+    soup = BeautifulSoup(html, 'html.parser')
+    results, seen = [], set()
+    for result in soup.select('div.result'):
+        if 'result--ad' in result.get('class', []):
+            continue
+        title = result.select_one('a.result__a')
+        if title is None or not title.get('href'):
+            continue
+        link = _result_url(title['href'])
+        if link in seen:
+            continue
+        seen.add(link)
+        snippet = result.select_one('.result__snippet')
+        results.append({
+            "title": title.get_text(" ", strip=True),
+            "link": link,
+            "body": snippet.get_text(" ", strip=True) if snippet else ""
+        })
+        if len(results) >= max_results:
+            break
+    return results
+
 
 class InternetSearch:
-    def __init__(self, search_providers):
+    def __init__(self, search_providers, executor=None):
         self.search_providers = search_providers
+        # HTML parsing runs here, off the event loop (None: the loop's default pool)
+        self.executor = executor
         self.max_retries = SEARCH_CONFIG["max_retries"]
         self.retry_delay = SEARCH_CONFIG["retry_delay"]
         self.timeout = SEARCH_CONFIG["timeout"]
-        self.cache = {}
+        self.fan_out = SEARCH_CONFIG["fan_out"]
+        # Recent latencies of successful searches, used to pick the hedge delay
+        self._latencies = {name: deque(maxlen=self.fan_out["latency_window"]) for name in search_providers}
+        self.hedges = 0
+        self.page_fetcher = PageFetcher(executor=executor)
+        self.cache = TTLCache(
+            "internet_search",
+            max_entries=SEARCH_CONFIG["cache_max_entries"],
+            max_bytes=SEARCH_CONFIG["cache_max_bytes"],
+            ttl=SEARCH_CONFIG["cache_ttl"],
+            backend=open_backend("internet_search", limits={
+                "max_entries": SEARCH_CONFIG["cache_max_entries"],
+                "max_bytes": SEARCH_CONFIG["cache_max_bytes"],
+                "ttl": SEARCH_CONFIG["cache_ttl"]
+            })
+        )
 
 
     @log_execution_time
     async def process_internet_query(self, query: str) -> QueryResponse:
         """Process a query using internet search with multiple providers"""
-        # Check cache first
         cache_key = query.lower().strip()
-        if cache_key in self.cache:
-            logger.info("Using cached results")
-            return self.cache[cache_key]
+        # Only answers built from search results are cached, never failures
+        return await self.cache.get_or_load(
+            cache_key,
+            lambda: self._search_and_answer(query),
+            cache_if=lambda response: response.confidence_score > 0
+        )
 
+    async def _search_and_answer(self, query: str) -> QueryResponse:
+        """Search the providers and build an answer from the results"""
         try:
             logger.info(f"Processing query: {query}")
             
-            # Try each provider in priority order
-            results = []
-            for provider_name in SEARCH_PROVIDER_PRIORITY:
-                provider_config = self.search_providers[provider_name]
-                if provider_config["enabled"]:
-                    logger.info(f"Attempting search with {provider_name}")
-                    if provider_name == "serpapi":
-                        results = await self._search_with_serpapi(query)
-                    elif provider_name == "duckduckgo":
-                        results = await self._search_with_duckduckgo(query)
-                    
-                    if results:
-                        break
+            results = await self._search(query)
+            if results and self.page_fetcher.enabled:
+                results = await self.page_fetcher.enrich(query, results)
 
             if not results:
                 logger.warning("No results found from any search provider")
@@ -135,14 +203,12 @@ class InternetSearch:
                 
                 answer = fallback_answer
 
-            # Cache the results
             response = QueryResponse(
                 answer=answer,
                 sources=sources,
                 confidence_score=0.8,
                 used_internet_search=True
             )
-            self.cache[cache_key] = response
 
             logger.info("Response generated successfully")
             return response
@@ -155,6 +221,107 @@ class InternetSearch:
                 confidence_score=0.0,
                 used_internet_search=True
             )
+    async def _search(self, query: str) -> List[Dict]:
+        """Results from the enabled providers, combined according to ``SEARCH_CONFIG["fan_out"]["mode"]``"""
+        providers = [name for name in SEARCH_PROVIDER_PRIORITY if self.search_providers[name]["enabled"]]
+        mode = self.fan_out["mode"]
+        if mode == "merge":
+            return await self._search_merged(query, providers)
+        if mode in ("race", "hedged"):
+            return await self._search_first(query, providers, hedge=mode == "hedged")
+        for provider_name in providers:
+            results = await self._run_provider(provider_name, query)
+            if results:
+                return results
+        return []
+
+    async def _run_provider(self, provider_name: str, query: str) -> List[Dict]:
+        logger.info(f"Attempting search with {provider_name}")
+        search = {
+            "serpapi": self._search_with_serpapi,
+            "duckduckgo": self._search_with_duckduckgo
+        }[provider_name]
+        started = time.monotonic()
+        results = await search(query)
+        if results:
+            self._latencies[provider_name].append(time.monotonic() - started)
+        return results
+
+    def _hedge_delay(self, provider_name: str) -> float:
+        """How long a provider may run before the next one is started alongside it"""
+        samples = sorted(self._latencies[provider_name])
+        if len(samples) < self.fan_out["min_samples"]:
+            return self.fan_out["hedge_delay"]
+        index = min(len(samples) - 1, int(len(samples) * self.fan_out["hedge_percentile"] / 100))
+        return samples[index]
+
+    async def _search_first(self, query: str, providers: List[str], hedge: bool) -> List[Dict]:
+        """The first non-empty result set, racing or hedging the providers"""
+        waiting = list(providers)
+        running: Dict[asyncio.Task, str] = {}
+        try:
+            while waiting or running:
+                if waiting:
+                    provider_name = waiting.pop(0)
+                    running[asyncio.create_task(self._run_provider(provider_name, query))] = provider_name
+                    if not hedge and waiting:
+                        continue
+                hedge_after = self._hedge_delay(provider_name) if hedge and waiting else None
+                done, _ = await asyncio.wait(running, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedges += 1
+                    logger.info(f"{provider_name} slower than {hedge_after:.2f}s, starting {waiting[0]}")
+                for task in done:
+                    finished = running.pop(task)
+                    try:
+                        results = task.result()
+                    except Exception as e:
+                        logger.error(f"Error in {finished} search: {str(e)}")
+                        continue
+                    if results:
+                        logger.info(f"Using results from {finished}")
+                        return results
+            return []
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    async def _search_merged(self, query: str, providers: List[str]) -> List[Dict]:
+        """Every provider at once, results merged in priority order without duplicate URLs"""
+        result_sets = await asyncio.gather(
+            *(self._run_provider(provider_name, query) for provider_name in providers),
+            return_exceptions=True
+        )
+        merged, seen = [], set()
+        for provider_name, results in zip(providers, result_sets):
+            if isinstance(results, Exception):
+                logger.error(f"Error in {provider_name} search: {str(results)}")
+                continue
+            for result in results:
+                key = _dedup_key(result["link"]) or result["title"]
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(result)
+        return merged
+
+    def provider_stats(self) -> Dict:
+        """Fan-out mode, hedges started and recent latency per provider"""
+        providers = {}
+        for provider_name, samples in self._latencies.items():
+            ordered = sorted(samples)
+            providers[provider_name] = {
+                'samples': len(ordered),
+                'p50': round(ordered[len(ordered) // 2], 3) if ordered else None,
+                'hedge_delay': round(self._hedge_delay(provider_name), 3)
+            }
+        return {
+            'mode': self.fan_out["mode"],
+            'hedges': self.hedges,
+            'providers': providers,
+            'page_fetch': self.page_fetcher.stats()
+        }
+
     async def _search_with_serpapi(self, query: str) -> List[Dict]:
             """Search using SerpAPI"""
             provider_config = self.search_providers["serpapi"]
@@ -201,103 +368,46 @@ class InternetSearch:
                 return []
 
     async def _search_with_duckduckgo(self, query: str) -> List[Dict]:
-        """Search using DuckDuckGo"""
+        """Search using DuckDuckGo's HTML endpoint without blocking the event loop"""
         provider_config = self.search_providers["duckduckgo"]
+        payload = {'q': query, 'b': '', 'kl': provider_config["region"]}
+        headers = {'User-Agent': provider_config["user_agent"], 'Referer': provider_config["base_url"]}
+        timeout = aiohttp.ClientTimeout(total=self.timeout, connect=min(self.timeout, 5))
         for attempt in range(self.max_retries):
             try:
-                with DDGS() as ddgs:
-                    search_results = list(ddgs.text(
-                        query,
-                        region=provider_config["region"],
-                        safesearch=provider_config["safesearch"],
-                        max_results=provider_config["max_results"]
-                    ))
-                    results = [
-                        {
-                            "title": result.get("title", ""),
-                            "link": result.get("link", ""),
-                            "body": result.get("body", "")
-                        }
-                        for result in search_results
-                    ]
-                    logger.info(f"DuckDuckGo search results for query '{query}':")
-                    for idx, result in enumerate(results, 1):
-                        logger.info(f"Result {idx}:")
-                        logger.info(f"  Title: {result['title']}")
-                        logger.info(f"  Link: {result['link']}")
-                        logger.info(f"  Body: {result['body'][:200]}...")  # Log first 200 chars of body
-                    return results
+                async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
+                    async with session.post(provider_config["base_url"], data=payload) as response:
+                        # DuckDuckGo answers 202 instead of results when it rate limits a client
+                        if response.status in (202, 403, 429):
+                            raise DuckDuckGoRateLimited(f"rate limit (HTTP {response.status})")
+                        response.raise_for_status()
+                        html = await response.text()
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, parse_duckduckgo_results, html, provider_config["max_results"]
+                )
+                logger.info(f"DuckDuckGo search results for query '{query}':")
+                for idx, result in enumerate(results, 1):
+                    logger.info(f"Result {idx}:")
+                    logger.info(f"  Title: {result['title']}")
+                    logger.info(f"  Link: {result['link']}")
+                    logger.info(f"  Body: {result['body'][:200]}...")  # Log first 200 chars of body
+                return results
             except Exception as e:
                 logger.error(f"Error in DuckDuckGo search: {str(e)}")
-                if "rate limit" in str(e).lower() or "too many requests" in str(e).lower():
-                    if attempt < self.max_retries - 1:
-                        wait_time = min(2 ** attempt + random.uniform(0, 1), 10)
-                        logger.warning(f"Rate limit hit, waiting {wait_time:.2f}s before retry...")
-                        await asyncio.sleep(wait_time)
-                        continue
-                elif attempt < self.max_retries - 1:
-                    continue
-                return []
+                # A timed out search already used its whole budget, so it is not retried
+                if isinstance(e, asyncio.TimeoutError) or attempt >= self.max_retries - 1:
+                    return []
+                if isinstance(e, DuckDuckGoRateLimited):
+                    wait_time = min(2 ** attempt + random.uniform(0, 1), 10)
+                    logger.warning(f"Rate limit hit, waiting {wait_time:.2f}s before retry...")
+                    await asyncio.sleep(wait_time)
         return []
-                    
+
     def _extract_answer_from_sources(self, query: str, sources: List[Source]) -> str:
         """Extract a direct answer from sources using dynamic content scoring"""
-        query_lower = query.lower()
-        query_words = set(query_lower.split())
-        
-        # Score each sentence based on relevance
-        scored_sentences = []
-        
-        for source in sources:
-            # Split into sentences while preserving original case
-            sentences = [s.strip() for s in source.content.split('.') if s.strip()]
-            
-            for sentence in sentences:
-                sentence_lower = sentence.lower()
-                score = 0
-                
-                # Exact query match (highest weight)
-                if query_lower in sentence_lower:
-                    score += 10
-                
-                # Word overlap with query
-                sentence_words = set(sentence_lower.split())
-                word_overlap = len(query_words.intersection(sentence_words))
-                score += word_overlap * 2
-                
-                # Content quality scoring
-                # Prefer sentences that are:
-                # - Not too short (likely incomplete)
-                # - Not too long (likely verbose)
-                # - Contain proper nouns (likely more specific)
-                # - Have good word density
-                sentence_length = len(sentence.split())
-                if 5 <= sentence_length <= 30:  # Ideal sentence length
-                    score += 2
-                elif sentence_length < 5:  # Too short
-                    score -= 1
-                elif sentence_length > 30:  # Too long
-                    score -= 1
-                
-                # Check for proper nouns (words starting with capital letters)
-                proper_nouns = sum(1 for word in sentence.split() if word[0].isupper())
-                if proper_nouns > 0:
-                    score += min(proper_nouns, 3)  # Cap at 3 points
-                
-                # Check for word density (unique words vs total words)
-                unique_words = len(set(sentence_lower.split()))
-                if sentence_length > 0:
-                    density = unique_words / sentence_length
-                    if 0.6 <= density <= 0.8:  # Good word density
-                        score += 1
-                
-                if score > 0:
-                    scored_sentences.append((sentence, score))
-        
-        # Sort by score and return the best match
-        if scored_sentences:
-            scored_sentences.sort(key=lambda x: x[1], reverse=True)
-            best_sentence = scored_sentences[0][0]
-            return best_sentence + '.'
-        
-        return None
\ No newline at end of file
+        # Split into sentences while preserving original case
+        sentences = [s.strip() for source in sources for s in source.content.split('.') if s.strip()]
+        best = top_k(score_sentences(query, sentences), 1)
+        if len(best):
+            return sentences[best[0]] + '.'
+        return None
@@ -0,0 +1,291 @@
+import heapq
+import math
+import mmap
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# Postings file header: document count, term count, total length, id bytes, term bytes
+HEADER_WORDS = 5
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _pack_strings(strings: List[str]) -> Tuple[bytes, array]:
+    """Concatenate strings as UTF-8 padded to whole words, with their start offsets and the end offset"""
+    offsets = array('I', [0])
+    data = bytearray()
+    for string in strings:
+        data += string.encode('utf-8')
+        offsets.append(len(data))
+    data += b'\0' * (-len(data) % 4)
+    return bytes(data), offsets
+
+
+class StoredPostings:
+    """Read-only postings written by ``InvertedIndex.write``, memory-mapped so every worker shares them"""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Native byte order: the file is built on the machine that serves it
+        self._words = memoryview(self._map).cast('I')
+        self.doc_count, self.term_count, self.total_length, ids_size, terms_size = self._words[:HEADER_WORDS]
+        self._lengths = HEADER_WORDS
+        self._id_offsets = self._lengths + self.doc_count
+        self._term_offsets = self._id_offsets + self.doc_count + 1
+        self._posting_offsets = self._term_offsets + self.term_count + 1
+        self._ids_start = (self._posting_offsets + self.term_count + 1) * 4
+        self._terms_start = self._ids_start + ids_size
+        self._postings_start = (self._terms_start + terms_size) // 4
+        # The only per-document state held in memory; postings and positions stay in the mapped file
+        self.doc_ids: List[str] = [self._read_id(ordinal) for ordinal in range(self.doc_count)]
+        self.ordinals: Dict[str, int] = {doc_id: ordinal for ordinal, doc_id in enumerate(self.doc_ids)}
+
+    def _read_id(self, ordinal: int) -> str:
+        start, end = self._words[self._id_offsets + ordinal:self._id_offsets + ordinal + 2]
+        return self._map[self._ids_start + start:self._ids_start + end].decode('utf-8')
+
+    def doc_length(self, ordinal: int) -> int:
+        return self._words[self._lengths + ordinal]
+
+    def _term(self, number: int) -> bytes:
+        start, end = self._words[self._term_offsets + number:self._term_offsets + number + 2]
+        return self._map[self._terms_start + start:self._terms_start + end]
+
+    def _find(self, term: bytes) -> int:
+        """Binary search the sorted term table; -1 when the term is not indexed"""
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            found = self._term(middle)
+            if found < term:
+                low = middle + 1
+            elif found > term:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def postings(self, token: str) -> List[Tuple[int, Sequence[int]]]:
+        """``(ordinal, positions)`` of every stored document containing the token"""
+        number = self._find(token.encode('utf-8'))
+        if number < 0:
+            return []
+        start, end = self._words[self._posting_offsets + number:self._posting_offsets + number + 2]
+        # One copy of the term's postings for this query; decoding them word by word from the map is slower
+        words = self._words[self._postings_start + start:self._postings_start + end].tolist()
+        postings, i = [], 0
+        while i < len(words):
+            ordinal, count = words[i], words[i + 1]
+            postings.append((ordinal, words[i + 2:i + 2 + count]))
+            i += 2 + count
+        return postings
+
+    def close(self):
+        self._words.release()
+        self._map.close()
+        self._file.close()
+
+
+class InvertedIndex:
+    """Inverted index mapping tokens to postings with positions, optionally on top of stored postings"""
+
+    def __init__(self, base: Optional[StoredPostings] = None):
+        self.base = base
+        # Documents added in memory; stored ones are read from ``base``
+        self.postings: Dict[str, Dict[str, List[int]]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._doc_order: Dict[str, int] = {}
+        # Ordinals of stored documents removed or replaced since the postings were written
+        self._removed: Set[int] = set()
+        self._next_order = base.doc_count if base else 0
+        self._total_length = base.total_length if base else 0
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[str, str]]) -> "InvertedIndex":
+        """Build an index from ``(doc_id, text)`` pairs"""
+        index = cls()
+        for doc_id, text in items:
+            index.add(doc_id, text)
+        return index
+
+    def __len__(self) -> int:
+        stored = self.base.doc_count - len(self._removed) if self.base else 0
+        return stored + len(self.doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.doc_lengths or self._stored(doc_id) is not None
+
+    def _stored(self, doc_id: str) -> Optional[int]:
+        """Ordinal of a document served from the stored postings"""
+        if self.base is None:
+            return None
+        ordinal = self.base.ordinals.get(doc_id)
+        return None if ordinal is None or ordinal in self._removed else ordinal
+
+    def term_count(self) -> int:
+        """Distinct terms; a term both stored and added since is counted twice"""
+        return len(self.postings) + (self.base.term_count if self.base else 0)
+
+    def add(self, doc_id: str, text: str):
+        """Index a document, replacing any previous version with the same id"""
+        if doc_id in self:
+            self.remove(doc_id)
+
+        tokens = tokenize(text)
+        for position, token in enumerate(tokens):
+            self.postings.setdefault(token, {}).setdefault(doc_id, []).append(position)
+
+        self.doc_lengths[doc_id] = len(tokens)
+        self._total_length += len(tokens)
+        self._doc_terms[doc_id] = set(tokens)
+        self._doc_order[doc_id] = self._next_order
+        self._next_order += 1
+
+    def update(self, doc_id: str, text: str):
+        """Re-index a document whose content changed"""
+        self.add(doc_id, text)
+
+    def remove(self, doc_id: str):
+        """Drop a document and its postings from the index"""
+        ordinal = self._stored(doc_id)
+        if ordinal is not None:
+            self._removed.add(ordinal)
+            self._total_length -= self.base.doc_length(ordinal)
+            return
+        for token in self._doc_terms.pop(doc_id, ()):
+            doc_postings = self.postings.get(token)
+            if doc_postings is None:
+                continue
+            doc_postings.pop(doc_id, None)
+            if not doc_postings:
+                del self.postings[token]
+        self._total_length -= self.doc_lengths.pop(doc_id, 0)
+        self._doc_order.pop(doc_id, None)
+
+    def _term_postings(self, token: str) -> Dict[str, Sequence[int]]:
+        """Positions of the token in every document containing it, stored or added since"""
+        postings = self.postings.get(token, {})
+        if self.base is None:
+            return postings
+        postings = dict(postings)
+        for ordinal, positions in self.base.postings(token):
+            if ordinal not in self._removed:
+                postings[self.base.doc_ids[ordinal]] = positions
+        return postings
+
+    def _doc_length(self, doc_id: str) -> int:
+        if doc_id in self.doc_lengths:
+            return self.doc_lengths[doc_id]
+        return self.base.doc_length(self.base.ordinals[doc_id])
+
+    def _order(self, doc_id: str) -> int:
+        if doc_id in self._doc_order:
+            return self._doc_order[doc_id]
+        return self.base.ordinals[doc_id]
+
+    def document_frequency(self, token: str) -> int:
+        return len(self._term_postings(token))
+
+    def _sorted(self, doc_ids: Iterable[str]) -> List[str]:
+        """Return doc ids in the order they were indexed"""
+        return sorted(doc_ids, key=self._order)
+
+    @staticmethod
+    def _candidates(term_postings: Dict[str, Dict[str, Sequence[int]]]) -> Set[str]:
+        """Documents that contain every one of the given tokens"""
+        postings = list(term_postings.values())
+        if not postings or not all(postings):
+            return set()
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for doc_postings in postings[1:]:
+            candidates.intersection_update(doc_postings)
+            if not candidates:
+                break
+        return candidates
+
+    def search_keywords(self, query: str) -> List[str]:
+        """Find documents containing all of the query's tokens"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        return self._sorted(self._candidates({token: self._term_postings(token) for token in set(tokens)}))
+
+    def search_phrase(self, phrase: str) -> List[str]:
+        """Find documents containing the query tokens as a contiguous phrase"""
+        tokens = tokenize(phrase)
+        if not tokens:
+            return []
+
+        term_postings = {token: self._term_postings(token) for token in set(tokens)}
+        matches = []
+        for doc_id in self._candidates(term_postings):
+            first_positions = term_postings[tokens[0]][doc_id]
+            following = [set(term_postings[token][doc_id]) for token in tokens[1:]]
+            if any(
+                all(start + offset in positions for offset, positions in enumerate(following, 1))
+                for start in first_positions
+            ):
+                matches.append(doc_id)
+        return self._sorted(matches)
+
+    def bm25_scores(self, query: str, k1: float = 1.5, b: float = 0.75,
+                    stopwords: Iterable[str] = ()) -> Dict[str, float]:
+        """Score every document containing at least one query token with Okapi BM25"""
+        doc_count = len(self)
+        if not doc_count:
+            return {}
+
+        avg_length = self._total_length / doc_count or 1.0
+        scores: Dict[str, float] = {}
+        for token in set(tokenize(query)).difference(stopwords):
+            doc_postings = self._term_postings(token)
+            if not doc_postings:
+                continue
+            df = len(doc_postings)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            for doc_id, positions in doc_postings.items():
+                tf = len(positions)
+                length_norm = k1 * (1 - b + b * self._doc_length(doc_id) / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + length_norm)
+        return scores
+
+    def rank_bm25(self, query: str, limit: int, k1: float = 1.5, b: float = 0.75,
+                  stopwords: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """Return the ``limit`` best ``(doc_id, score)`` pairs, ties broken by index order"""
+        scores = self.bm25_scores(query, k1, b, stopwords)
+        return heapq.nsmallest(
+            limit, scores.items(), key=lambda item: (-item[1], self._order(item[0]))
+        )
+
+    def write(self, path: str):
+        """Write the documents added in memory to a postings file for ``StoredPostings``"""
+        doc_ids = self._sorted(self.doc_lengths)
+        ordinals = {doc_id: ordinal for ordinal, doc_id in enumerate(doc_ids)}
+        terms = sorted(self.postings, key=lambda term: term.encode('utf-8'))
+        ids_data, id_offsets = _pack_strings(doc_ids)
+        terms_data, term_offsets = _pack_strings(terms)
+
+        postings, posting_offsets = array('I'), array('I', [0])
+        for term in terms:
+            doc_postings = self.postings[term]
+            for doc_id in sorted(doc_postings, key=ordinals.__getitem__):
+                postings.extend((ordinals[doc_id], len(doc_postings[doc_id])))
+                postings.extend(doc_postings[doc_id])
+            posting_offsets.append(len(postings))
+
+        header = array('I', [len(doc_ids), len(terms), sum(self.doc_lengths.values()), len(ids_data), len(terms_data)])
+        lengths = array('I', [self.doc_lengths[doc_id] for doc_id in doc_ids])
+        with open(path, 'wb') as f:
+            for section in (header, lengths, id_offsets, term_offsets, posting_offsets):
+                f.write(section.tobytes())
+            f.write(ids_data)
+            f.write(terms_data)
+            f.write(postings.tobytes())
@@ -0,0 +1,124 @@
+"""Cached view of which Ollama models can serve requests, refreshed in the background"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from app.config.model_config import OLLAMA_CONFIG
+from app.core.ollama_client import OllamaClient
+from app.utils.logger import logger
+
+
+def model_listed(model: str, names: List[str]) -> bool:
+    """Ollama lists models with their tag, e.g. ``phi:latest`` for ``phi``"""
+    return model in names or (":" not in model and f"{model}:latest" in names)
+
+
+class ModelHealthMonitor:
+    def __init__(self, ollama: OllamaClient, config: Dict = None):
+        config = config or OLLAMA_CONFIG["health_check"]
+        self.ollama = ollama
+        self.interval = config["interval"]
+        self.timeout = config["timeout"]
+        self.failure_cooldown = config["failure_cooldown"]
+        self.server_available: Optional[bool] = None
+        self.server_latency: Optional[float] = None
+        self.listed_models: List[str] = []
+        self.checked_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        # Per-model generation results: latency (moving average) and when it last failed
+        self.models: Dict[str, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _record_probe(self, names: Optional[List[str]], latency: float, error: Exception = None):
+        was_available = self.server_available
+        self.checked_at = time.time()
+        self.server_latency = latency
+        if error is None:
+            self.server_available = True
+            self.listed_models = names
+            self.last_error = None
+        else:
+            self.server_available = False
+            self.last_error = str(error)
+        if was_available != self.server_available:
+            state = "available" if self.server_available else f"unavailable ({self.last_error})"
+            logger.info(f"Ollama server is {state}; models: {', '.join(self.listed_models) or 'none'}")
+
+    def refresh_sync(self) -> bool:
+        """Probe the server once, blocking; used at startup before the event loop runs"""
+        start_time = time.time()
+        try:
+            names = self.ollama.list_models_sync(timeout=self.timeout)
+            self._record_probe(names, time.time() - start_time)
+        except Exception as e:
+            self._record_probe(None, time.time() - start_time, e)
+        return self.server_available
+
+    async def refresh(self) -> bool:
+        start_time = time.time()
+        try:
+            names = await self.ollama.list_models(timeout=self.timeout)
+            self._record_probe(names, time.time() - start_time)
+        except Exception as e:
+            self._record_probe(None, time.time() - start_time, e)
+        return self.server_available
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start probing in the background on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Started Ollama health monitor (every {self.interval} seconds)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def is_available(self, model: str) -> bool:
+        """Whether a model should be tried; models not checked yet are given the benefit of the doubt"""
+        if self.server_available is False:
+            return False
+        if self.server_available and not model_listed(model, self.listed_models):
+            return False
+        failed_at = self.models.get(model, {}).get('failed_at')
+        return failed_at is None or time.time() - failed_at >= self.failure_cooldown
+
+    def candidates(self, models: List[str]) -> List[str]:
+        """Models worth trying, in priority order"""
+        available = [model for model in models if self.is_available(model)]
+        skipped = [model for model in models if model not in available]
+        if skipped:
+            logger.info(f"Skipping models marked unavailable: {', '.join(skipped)}")
+        return available
+
+    def report_success(self, model: str, latency: float):
+        state = self.models.setdefault(model, {'latency': None, 'failed_at': None, 'failures': 0})
+        state['latency'] = latency if state['latency'] is None else 0.8 * state['latency'] + 0.2 * latency
+        state['failed_at'] = None
+
+    def report_failure(self, model: str, error: Exception):
+        """Skip a model for ``failure_cooldown`` seconds after it fails"""
+        state = self.models.setdefault(model, {'latency': None, 'failed_at': None, 'failures': 0})
+        state['failed_at'] = time.time()
+        state['failures'] += 1
+        logger.warning(f"Marking model {model} unavailable for {self.failure_cooldown} seconds: {str(error)}")
+
+    def snapshot(self) -> Dict:
+        return {
+            'server_available': self.server_available,
+            'server_latency': self.server_latency,
+            'checked_at': self.checked_at,
+            'last_error': self.last_error,
+            'listed_models': self.listed_models,
+            'models': {model: dict(state) for model, state in self.models.items()}
+        }
@@ -0,0 +1,200 @@
+"""Shared, long-lived HTTP client for all Ollama traffic"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config.model_config import OLLAMA_CONFIG
+from app.utils.logger import logger
+
+
+class OllamaError(Exception):
+    """Ollama answered with a non-200 status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Ollama returned status {status}: {message}")
+        self.status = status
+
+
+class OllamaClient:
+    def __init__(self, base_url: str = None, config: Dict = None):
+        config = config or OLLAMA_CONFIG
+        self.base_url = (base_url or config["base_url"]).rstrip("/")
+        self.pool_config = config["connection_pool"]
+        self.timeouts = config["timeouts"]
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+        self._stats = {'requests': 0, 'connections_created': 0, 'connections_reused': 0, 'errors': 0}
+
+        # Blocking calls share one keep-alive pool as well
+        self._sync_session = requests.Session()
+        self._sync_session.mount("http://", HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.pool_config["limit_per_host"]
+        ))
+        self._sync_session.mount("https://", HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.pool_config["limit_per_host"]
+        ))
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """Count requests and whether each one opened a new connection or reused a pooled one"""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self._stats['requests'] += 1
+
+        async def on_connection_create_end(session, context, params):
+            self._stats['connections_created'] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self._stats['connections_reused'] += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Create the pooled session on first use, inside the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._session_loop is not loop:
+            self._release_session()
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_config["limit"],
+                limit_per_host=self.pool_config["limit_per_host"],
+                keepalive_timeout=self.pool_config["keepalive_timeout"]
+            )
+            self._session = aiohttp.ClientSession(connector=connector, trace_configs=[self._trace_config()])
+            self._session_loop = loop
+            logger.info(
+                f"Opened Ollama connection pool to {self.base_url} "
+                f"(limit {self.pool_config['limit']}, per host {self.pool_config['limit_per_host']})"
+            )
+        return self._session
+
+    def _release_session(self):
+        """Close a session left open on another event loop before replacing it"""
+        session, loop = self._session, self._session_loop
+        self._session = None
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        else:
+            logger.warning("Ollama connection pool outlived its event loop; call close_session() before the loop ends")
+
+    async def _post(self, endpoint: str, payload: Dict, timeout: float) -> Dict:
+        client_timeout = aiohttp.ClientTimeout(total=timeout, connect=self.timeouts["connect"])
+        try:
+            async with self._get_session().post(f"{self.base_url}{endpoint}", json=payload,
+                                                timeout=client_timeout) as response:
+                if response.status != 200:
+                    raise OllamaError(response.status, await response.text())
+                return await response.json()
+        except Exception:
+            self._stats['errors'] += 1
+            raise
+
+    async def chat(self, model: str, messages: List[Dict], options: Dict = None, timeout: float = None) -> Dict:
+        """Complete a chat in one response"""
+        return await self._post("/api/chat", {
+            "model": model,
+            "messages": messages,
+            "stream": False,
+            "options": options or {}
+        }, timeout or OLLAMA_CONFIG["timeout"])
+
+    async def chat_stream(self, model: str, messages: List[Dict], options: Dict = None,
+                          timeout: float = None) -> AsyncIterator[Dict]:
+        """Yield the chat response messages as Ollama emits them; ``timeout`` bounds each piece"""
+        client_timeout = aiohttp.ClientTimeout(
+            total=None, connect=self.timeouts["connect"], sock_read=timeout or OLLAMA_CONFIG["timeout"]
+        )
+        try:
+            async with self._get_session().post(f"{self.base_url}/api/chat", json={
+                "model": model,
+                "messages": messages,
+                "stream": True,
+                "options": options or {}
+            }, timeout=client_timeout) as response:
+                if response.status != 200:
+                    raise OllamaError(response.status, await response.text())
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    yield data
+                    if data.get('done'):
+                        break
+        except Exception:
+            self._stats['errors'] += 1
+            raise
+
+    async def generate(self, model: str, prompt: str, options: Dict = None, timeout: float = None) -> Dict:
+        """Complete a prompt in one response"""
+        return await self._post("/api/generate", {
+            "model": model,
+            "prompt": prompt,
+            "stream": False,
+            "options": options or {}
+        }, timeout or OLLAMA_CONFIG["timeout"])
+
+    async def list_models(self, timeout: float = None) -> List[str]:
+        """Names of the models available on the server"""
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeouts["tags"], connect=self.timeouts["connect"])
+        try:
+            async with self._get_session().get(f"{self.base_url}/api/tags", timeout=client_timeout) as response:
+                if response.status != 200:
+                    raise OllamaError(response.status, await response.text())
+                data = await response.json()
+        except Exception:
+            self._stats['errors'] += 1
+            raise
+        return [model['name'] for model in data.get('models', [])]
+
+    def list_models_sync(self, timeout: float = None) -> List[str]:
+        """Blocking variant of ``list_models`` for startup code"""
+        response = self._sync_session.get(f"{self.base_url}/api/tags", timeout=timeout or self.timeouts["tags"])
+        if response.status_code != 200:
+            raise OllamaError(response.status_code, response.text)
+        return [model['name'] for model in response.json().get('models', [])]
+
+    def pull_model_sync(self, name: str, timeout: float = None):
+        """Download a model to the server, blocking until Ollama answers"""
+        response = self._sync_session.post(
+            f"{self.base_url}/api/pull",
+            json={"name": name},
+            timeout=timeout or self.timeouts["pull"]
+        )
+        if response.status_code != 200:
+            raise OllamaError(response.status_code, response.text)
+
+    def pool_stats(self) -> Dict:
+        """Request and connection counts for both pools; reuse shows keep-alive is working"""
+        stats = dict(self._stats)
+        stats['reuse_ratio'] = round(stats['connections_reused'] / stats['requests'], 3) if stats['requests'] else 0.0
+        stats['limit'] = self.pool_config["limit"]
+        stats['limit_per_host'] = self.pool_config["limit_per_host"]
+
+        sync_requests, sync_connections = 0, 0
+        for adapter in self._sync_session.adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                sync_requests += pool.num_requests
+                sync_connections += pool.num_connections
+        stats['sync'] = {'requests': sync_requests, 'connections_created': sync_connections}
+        return stats
+
+    async def close_session(self):
+        """Close the pooled aiohttp session of the running loop; the next call opens a new one"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def close(self):
+        await self.close_session()
+        self._sync_session.close()
+        logger.info(f"Closed Ollama connection pool (stats: {self.pool_stats()})")
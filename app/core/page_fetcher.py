@@ -0,0 +1,267 @@
+"""Fetch the pages behind search results and pick the passages relevant to a query"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from app.config.search_config import SEARCH_CONFIG
+from app.utils.logger import logger
+
+NOISE_TAGS = ['script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'svg', 'iframe']
+TEXT_TAGS = ['p', 'li', 'pre', 'td', 'h1', 'h2', 'h3', 'h4']
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+WORD = re.compile(r'\w+')
+
+
+def extract_main_text(html: str) -> str:
+    """Readable text of a page, preferring its <article> or <main> element"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(NOISE_TAGS):
+        tag.decompose()
+    root = soup.find('article') or soup.find('main') or soup.body or soup
+    blocks = [block.get_text(' ', strip=True) for block in root.find_all(TEXT_TAGS)]
+    if not blocks:
+        blocks = [root.get_text(' ', strip=True)]
+    text = '\n'.join(block for block in blocks if block)
+    return re.sub(r'[ \t]+', ' ', text)
+
+
+def rank_passages(query: str, text: str, sentences_per_passage: int = 3, top_k: int = 3) -> List[str]:
+    """Passages of consecutive sentences that share the most words with the query, in page order"""
+    terms = {word for word in WORD.findall(query.lower()) if len(word) > 2}
+    if not terms:
+        return []
+    passages = []
+    for block in text.split('\n'):
+        # Passages never span two paragraphs
+        sentences = [sentence.strip() for sentence in SENTENCE_END.split(block) if sentence.strip()]
+        for start in range(0, len(sentences), sentences_per_passage):
+            passages.append(' '.join(sentences[start:start + sentences_per_passage]))
+    scored = []
+    for position, passage in enumerate(passages):
+        words = WORD.findall(passage.lower())
+        matched = terms.intersection(words)
+        if matched:
+            # Distinct query terms dominate; repeated mentions break ties
+            score = len(matched) + sum(words.count(term) for term in matched) / (len(words) + 1)
+            scored.append((score, position, passage))
+    best = sorted(scored, key=lambda item: (-item[0], item[1]))[:top_k]
+    return [passage for _, _, passage in sorted(best, key=lambda item: item[1])]
+
+
+def _decode(body: bytes, charset: Optional[str]) -> str:
+    """Page bytes as text; an unknown declared charset falls back to UTF-8"""
+    try:
+        return body.decode(charset or 'utf-8', errors='replace')
+    except LookupError:
+        return body.decode('utf-8', errors='replace')
+
+
+class PageCache:
+    """Extracted page text on disk, one JSON file per URL, written atomically and evicted LRU/TTL"""
+
+    def __init__(self, directory: str, max_entries: int = None, max_bytes: int = None, ttl: float = None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Seconds since a page was last used before it is deleted; revalidation uses max_age instead
+        self.ttl = ttl
+        self.evictions = 0
+        self.expirations = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url: str) -> Optional[Dict]:
+        path = self._path(url)
+        try:
+            if self.ttl and os.stat(path).st_mtime + self.ttl <= time.time():
+                self._remove(path)
+                self.expirations += 1
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            # The modification time is the LRU clock, shared by every worker using the directory
+            os.utime(path)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def set(self, url: str, entry: Dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(url))
+        except OSError as e:
+            logger.warning(f"Could not cache page {url}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """``(last_used, size, path)`` of every cached page, least recently used first"""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                if not item.name.endswith('.json'):
+                    continue
+                try:
+                    stat = item.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+        return sorted(entries)
+
+    def _evict(self):
+        """Drop expired pages, then the least recently used until the cache is within its limits"""
+        if not (self.max_entries or self.max_bytes or self.ttl):
+            return
+        entries = self._entries()
+        if self.ttl:
+            cutoff = time.time() - self.ttl
+            expired = [entry for entry in entries if entry[0] <= cutoff]
+            for _, _, path in expired:
+                self._remove(path)
+            self.expirations += len(expired)
+            entries = entries[len(expired):]
+        total = sum(size for _, size, _ in entries)
+        while entries and (
+            (self.max_entries and len(entries) > self.max_entries)
+            or (self.max_bytes and total > self.max_bytes)
+        ):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total -= size
+            self.evictions += 1
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Another worker evicted it first
+            pass
+
+    def stats(self) -> Dict:
+        return {
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+class PageFetcher:
+    def __init__(self, config: Dict = None, executor=None):
+        config = config or SEARCH_CONFIG["page_fetch"]
+        self.config = config
+        # HTML parsing and cache file I/O run here, off the event loop (None: the loop's default pool)
+        self.executor = executor
+        self.enabled = config["enabled"]
+        self.cache = PageCache(
+            config["cache_dir"], config["cache_max_entries"], config["cache_max_bytes"], config["cache_ttl"]
+        ) if self.enabled else None
+        self.fetched = 0
+        self.revalidated = 0
+        self.cache_hits = 0
+        self.failures = 0
+
+    async def enrich(self, query: str, results: List[Dict]) -> List[Dict]:
+        """Append the passages of each top result page that best match the query to its snippet"""
+        top = results[:self.config["max_pages"]]
+        connector = aiohttp.TCPConnector(limit=self.config["concurrency"], limit_per_host=2)
+        timeout = aiohttp.ClientTimeout(total=self.config["timeout"])
+        headers = {'User-Agent': self.config["user_agent"]}
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            texts = await asyncio.gather(
+                *(self.fetch_text(session, result["link"]) for result in top), return_exceptions=True
+            )
+
+        enriched = []
+        for result, text in zip(top, texts):
+            if isinstance(text, Exception):
+                # One broken page keeps its plain snippet instead of failing the whole search
+                self.failures += 1
+                logger.warning(f"Could not use page {result['link']}: {str(text)}")
+                text = None
+            passages = await self._run(
+                rank_passages, query, text or '', self.config["sentences_per_passage"], self.config["passages_per_page"]
+            )
+            if passages:
+                result = dict(result, body=' '.join([result["body"]] + passages).strip())
+            enriched.append(result)
+        return enriched + results[len(top):]
+
+    async def fetch_text(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        """Main text of a page, from the disk cache when it is fresh or still valid"""
+        if not url.startswith(('http://', 'https://')):
+            return None
+        cached = await self._run(self.cache.get, url)
+        if cached and time.time() - cached['fetched_at'] < self.config["max_age"]:
+            self.cache_hits += 1
+            return cached['text']
+
+        headers = {}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304 and cached:
+                    self.revalidated += 1
+                    await self._run(self.cache.set, url, dict(cached, fetched_at=time.time()))
+                    return cached['text']
+                if response.status != 200 or 'html' not in response.headers.get('Content-Type', 'text/html'):
+                    logger.debug(f"Skipping page {url}: HTTP {response.status}")
+                    return None
+                chunks, size = [], 0
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= self.config["max_bytes"]:
+                        break
+                html = _decode(b''.join(chunks)[:self.config["max_bytes"]], response.charset)
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.failures += 1
+            logger.warning(f"Could not fetch page {url}: {str(e)}")
+            return cached['text'] if cached else None
+
+        text = await self._run(extract_main_text, html)
+        self.fetched += 1
+        await self._run(self.cache.set, url, {
+            'url': url,
+            'text': text,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time()
+        })
+        return text
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args))
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'fetched': self.fetched,
+            'revalidated': self.revalidated,
+            'cache_hits': self.cache_hits,
+            'failures': self.failures,
+            'cache': self.cache.stats() if self.cache is not None else None
+        }
@@ -0,0 +1,187 @@
+"""SQLite-backed cache entries shared by worker processes and kept across restarts"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.config.model_config import CACHE_CONFIG
+from app.utils.logger import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS cache_entries_lru ON cache_entries (namespace, accessed_at);
+"""
+
+
+class SQLiteCacheBackend:
+    def __init__(self, path: str, namespace: str, max_entries: int = None, max_bytes: int = None,
+                 ttl: float = None, busy_timeout: float = 5.0):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.busy_timeout = busy_timeout
+        # sqlite3 connections must stay on the thread that opened them
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: Hashable) -> Tuple[bool, Any, Optional[float]]:
+        """``(found, value, expires_at)``; expired entries count as missing"""
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, str(key))
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                return False, None, None
+            conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, str(key))
+            )
+            self.hits += 1
+            return True, pickle.loads(row[0]), row[1]
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Persistent cache read failed for {self.namespace}: {str(e)}")
+            return False, None, None
+
+    def set(self, key: Hashable, value: Any):
+        now = time.time()
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            if self.max_bytes and len(blob) > self.max_bytes:
+                return
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.namespace, str(key), blob, len(blob), now + self.ttl if self.ttl else None, now)
+                )
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Persistent cache write failed for {self.namespace}: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired entries, then the least recently used until the namespace is within its limits"""
+        conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (self.namespace, now)
+        )
+        count, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,)
+        ).fetchone()
+        if self.max_entries and count > self.max_entries:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE rowid IN (SELECT rowid FROM cache_entries WHERE namespace = ? "
+                "ORDER BY accessed_at LIMIT ?)",
+                (self.namespace, count - self.max_entries)
+            )
+            count, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,)
+            ).fetchone()
+        if self.max_bytes and total > self.max_bytes:
+            rows = conn.execute(
+                "SELECT rowid, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at",
+                (self.namespace,)
+            ).fetchall()
+            doomed = []
+            for rowid, size in rows:
+                if total <= self.max_bytes:
+                    break
+                doomed.append(rowid)
+                total -= size
+            conn.executemany("DELETE FROM cache_entries WHERE rowid = ?", [(rowid,) for rowid in doomed])
+
+    def delete(self, key: Hashable):
+        try:
+            self._connection().execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, str(key))
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Persistent cache delete failed for {self.namespace}: {str(e)}")
+
+    def clear(self):
+        try:
+            self._connection().execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Persistent cache clear failed for {self.namespace}: {str(e)}")
+
+    def stats(self) -> Dict:
+        try:
+            entries, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,)
+            ).fetchone()
+        except Exception:
+            entries, size = None, None
+        return {
+            'path': self.path,
+            'namespace': self.namespace,
+            'entries': entries,
+            'bytes': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors
+        }
+
+
+def open_backend(name: str, namespace: str = "", limits: Dict = None) -> Optional[SQLiteCacheBackend]:
+    """The persistent backend for a cache, or None when no cache path is configured"""
+    path = CACHE_CONFIG["persistent"]["path"]
+    if not path or name not in CACHE_CONFIG["persistent"]["caches"]:
+        return None
+    limits = limits or {}
+    try:
+        backend = SQLiteCacheBackend(
+            path,
+            f"{name}:{namespace}" if namespace else name,
+            max_entries=limits.get("max_entries"),
+            max_bytes=limits.get("max_bytes"),
+            ttl=limits.get("ttl")
+        )
+    except Exception as e:
+        logger.error(f"Could not open persistent cache at {path}, using memory only: {str(e)}")
+        return None
+    logger.info(f"Using persistent cache {backend.namespace} at {path}")
+    return backend
@@ -0,0 +1,30 @@
+import time
+from typing import Optional
+
+from app.utils.logger import logger
+
+
+class QueryContext:
+    """Per-request query state shared by routing, retrieval and re-ranking"""
+
+    def __init__(self, query: str, embedding_function=None):
+        self.query = query
+        self.cache_key = query.lower().strip()
+        self.embedding_function = embedding_function
+        self._embedding = None
+
+    @property
+    def embedding(self) -> Optional[list]:
+        """Embedding of the query text, computed once per request"""
+        if self._embedding is None and self.embedding_function is not None:
+            start_time = time.time()
+            self._embedding = self.embedding_function([self.query])[0]
+            logger.info(f"Query embedding took {time.time() - start_time:.3f} seconds")
+        return self._embedding
+
+    def query_args(self) -> dict:
+        """Arguments for `collection.query` that reuse the shared embedding"""
+        embedding = self.embedding
+        if embedding is None:
+            return {"query_texts": [self.query]}
+        return {"query_embeddings": [embedding]}
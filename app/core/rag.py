@@ -1,27 +1,220 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Set, Tuple, AsyncIterator
 import time, asyncio
-import requests
 from pathlib import Path
 
 
 from app.models.schemas import QueryResponse, Source
 from app.utils.logger import logger, log_execution_time
 from app.config.prompt import PROMPTS
+from app.core.query_context import QueryContext
+from app.core.inverted_index import InvertedIndex
+from app.core.context_assembler import ContextAssembler
+from app.core.chunking import chunk_document, document_id, sentence_index
+from app.core.ollama_client import OllamaClient
+from app.core.model_health import ModelHealthMonitor
+from app.core.admission import AdmissionController, AdmissionRejected
+from app.core.executors import InstrumentedExecutor
+from app.core.cache import TTLCache
+from app.core.corpus_store import CorpusStore
+from app.core.streaming import (
+    StreamInterrupted, response_events, sources_event, token_event, done_event, error_event
+)
 
 
 from app.config.search_config import SEARCH_PROVIDERS, SEARCH_PROVIDER_PRIORITY, SEARCH_CONFIG
 from app.config.model_config import (
     MODEL_PRIORITY, MODEL_PARAMS, OLLAMA_CONFIG,
-    VECTOR_DB_CONFIG, DUPLO_KEYWORDS
+    VECTOR_DB_CONFIG, DUPLO_KEYWORDS, RETRIEVAL_CONFIG, EXECUTOR_CONFIG, CACHE_CONFIG
 )
+
+
+class HybridRetriever:
+    """Rank chunks with BM25, exact-phrase and vector search fused by reciprocal rank fusion"""
+
+    def __init__(self, collection, chunks: List[Dict] = (), aligned_paths: Optional[Set[str]] = None,
+                 index: InvertedIndex = None):
+        self.collection = collection
+        # Documents whose indexed chunks match the loaded ones (same chunker and content); None means all
+        self.aligned_paths = aligned_paths
+        self.chunks: Dict[str, Dict] = {}
+        self.chunk_ids_by_path: Dict[str, List[str]] = {}
+        self.chunk_ids_by_position: Dict[tuple, str] = {}
+        # A prebuilt index (the corpus store's postings) already holds the chunks' text
+        self.index = index or InvertedIndex()
+        self.add_chunks(chunks)
+
+    def add_chunks(self, chunks: List[Dict]):
+        """Index chunks for keyword scoring"""
+        for chunk in chunks:
+            if chunk['id'] in self.chunks:
+                logger.debug(f"Skipping duplicate chunk id: {chunk['id']}")
+                continue
+            self.chunks[chunk['id']] = chunk
+            self.chunk_ids_by_path.setdefault(chunk['metadata']['path'], []).append(chunk['id'])
+            self.chunk_ids_by_position[(chunk['metadata']['path'], chunk['metadata']['chunk_index'])] = chunk['id']
+            if chunk['id'] not in self.index:
+                self.index.add(chunk['id'], chunk['content'])
+
+    def remove_document(self, path: str):
+        """Drop every chunk belonging to a document"""
+        for chunk_id in self.chunk_ids_by_path.pop(path, []):
+            chunk = self.chunks.pop(chunk_id, None)
+            if chunk:
+                self.chunk_ids_by_position.pop((path, chunk['metadata']['chunk_index']), None)
+            self.index.remove(chunk_id)
+
+    def get_chunk(self, path: str, chunk_index: int) -> Optional[Dict]:
+        """Look up a chunk by its document path and position"""
+        chunk_id = self.chunk_ids_by_position.get((path, chunk_index))
+        return self.chunks.get(chunk_id) if chunk_id else None
+
+    def _aligned(self, metadata: Dict) -> bool:
+        return self.aligned_paths is None or metadata.get('path') in self.aligned_paths
+
+    def chunk_sentences(self, chunk_id: str, chunk: Dict = None) -> List[Tuple[str, frozenset]]:
+        """Sentence index of a chunk, computed on the spot for chunks only known to the vector database"""
+        stored = self.chunks.get(chunk_id)
+        if chunk is None or (stored is not None and self._aligned(chunk.get('metadata', {}))):
+            chunk = stored
+        if chunk is None:
+            return []
+        if 'sentences' not in chunk:
+            return sentence_index(chunk['content'])
+        return chunk['sentences']
+
+    def _vector_search(self, query_ctx: QueryContext, limit: int) -> List[Dict]:
+        """Nearest chunks from the vector database that pass the similarity threshold"""
+        results = self.collection.query(
+            **query_ctx.query_args(),
+            n_results=limit,
+            include=['documents', 'metadatas', 'distances']
+        )
+        hits = []
+        for chunk_id, content, metadata, distance in zip(
+            results['ids'][0], results['documents'][0],
+            results['metadatas'][0], results['distances'][0]
+        ):
+            if distance < VECTOR_DB_CONFIG["similarity_threshold"]:
+                if self._aligned(metadata):
+                    # Resolve the hit to the loaded chunk at the same position, whatever id it was stored under
+                    chunk_id = self.chunk_ids_by_position.get(
+                        (metadata.get('path'), metadata.get('chunk_index')), chunk_id
+                    )
+                hits.append({'id': chunk_id, 'content': content, 'metadata': metadata, 'distance': distance})
+        return hits
+
+    def retrieve(self, query_ctx: QueryContext, top_k: int = None) -> List[Dict]:
+        """Return the top-k chunks for a query, each with its fused relevance score"""
+        start_time = time.time()
+        top_k = top_k or RETRIEVAL_CONFIG["top_k"]
+        limit = RETRIEVAL_CONFIG["candidates"]
+        rrf_k = RETRIEVAL_CONFIG["rrf_k"]
+
+        keyword_start = time.time()
+        phrase_ids = self.index.search_phrase(query_ctx.query)[:limit]
+        bm25_ranking = self.index.rank_bm25(query_ctx.query, limit, **RETRIEVAL_CONFIG["bm25"])
+        logger.info(f"Keyword ranking took {(time.time() - keyword_start) * 1000:.3f} ms")
+
+        vector_start = time.time()
+        vector_hits = self._vector_search(query_ctx, limit)
+        logger.info(f"Vector search took {(time.time() - vector_start) * 1000:.3f} ms")
+
+        candidates = {hit['id']: hit for hit in vector_hits}
+        bm25_scores = dict(bm25_ranking)
+        rankings = [
+            phrase_ids,
+            [chunk_id for chunk_id, _ in bm25_ranking],
+            [hit['id'] for hit in vector_hits]
+        ]
+
+        fused: Dict[str, float] = {}
+        for ranking in rankings:
+            for rank, chunk_id in enumerate(ranking, 1):
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+
+        results = []
+        for chunk_id in sorted(fused, key=fused.get, reverse=True)[:top_k]:
+            if chunk_id not in candidates or self._aligned(candidates[chunk_id]['metadata']):
+                chunk = self.chunks.get(chunk_id) or candidates[chunk_id]
+            else:
+                # A stale index may reuse ids for different text; keep what was stored with the hit
+                chunk = candidates[chunk_id]
+            results.append({
+                'id': chunk_id,
+                'content': chunk['content'],
+                'metadata': chunk['metadata'],
+                'score': fused[chunk_id],
+                'bm25_score': bm25_scores.get(chunk_id, 0.0),
+                'distance': candidates[chunk_id]['distance'] if chunk_id in candidates else None
+            })
+
+        logger.info(f"Hybrid retrieval returned {len(results)} chunks in {(time.time() - start_time) * 1000:.3f} ms")
+        return results
+
+
 class RAG:
-    def __init__(self, collection,documentation, executor):
+    def __init__(self, collection,documentation, retrieval_executor, ollama: OllamaClient = None,
+                 health: ModelHealthMonitor = None, admission: AdmissionController = None,
+                 generation_executor: InstrumentedExecutor = None, corpus: CorpusStore = None,
+                 aligned_paths: Optional[Set[str]] = None):
         self.collection = collection
-        self.executor = executor
+        self.aligned_paths = aligned_paths
+        # Retrieval and blocking generation work run in separate pools so one cannot starve the other
+        self.retrieval_executor = retrieval_executor
+        self.generation_executor = generation_executor or InstrumentedExecutor(
+            "generation", EXECUTOR_CONFIG["generation"]["max_workers"]
+        )
         self.documentation = documentation
+        # Chunks are read from the shared corpus store when the documentation was loaded into one
+        self.corpus = corpus
         self.model_priority = MODEL_PRIORITY
-        self.ollama_base_url = OLLAMA_CONFIG["base_url"]
-        self.cache = {}
+        self.ollama = ollama or OllamaClient()
+        self.health = health or ModelHealthMonitor(self.ollama)
+        self.admission = admission or AdmissionController()
+        self.cache = TTLCache("retrieval", **CACHE_CONFIG["retrieval"])
+        self._build_retriever()
+        self.context_assembler = ContextAssembler(self.retriever.get_chunk)
+
+    def _build_retriever(self):
+        """Build the hybrid retriever over the chunks of the loaded documentation"""
+        start_time = time.time()
+        self.docs_by_id = {document_id(doc['path']): doc for doc in self.documentation}
+        if self.corpus is not None:
+            chunks, index = self.corpus.chunks(), self.corpus.keyword_index()
+        else:
+            chunks, index = [chunk for doc in self.documentation for chunk in chunk_document(doc)], None
+        self.retriever = HybridRetriever(self.collection, chunks, self.aligned_paths, index)
+        if self.aligned_paths is not None and len(self.aligned_paths) < len(self.documentation):
+            logger.warning(
+                f"Vector database is out of date for {len(self.documentation) - len(self.aligned_paths)} documents; "
+                "their vector hits keep the text they were indexed with"
+            )
+        logger.info(
+            f"Indexed {len(self.retriever.index)} chunks ({self.retriever.index.term_count()} terms) "
+            f"in {time.time() - start_time:.3f} seconds"
+        )
+
+    def get_document(self, doc_id: str) -> Optional[Dict]:
+        return self.docs_by_id.get(doc_id)
+
+    def update_document(self, doc: Dict):
+        """Add or replace a document and re-index only that document"""
+        doc_id = document_id(doc['path'])
+        if doc_id in self.docs_by_id:
+            self.documentation = [d for d in self.documentation if d['path'] != doc['path']]
+        self.documentation.append(doc)
+        self.docs_by_id[doc_id] = doc
+        self.retriever.remove_document(doc['path'])
+        self.retriever.add_chunks(chunk_document(doc))
+        self.cache.clear()
+
+    def remove_document(self, path: str):
+        """Remove a document from the loaded documentation and its index"""
+        if self.docs_by_id.pop(document_id(path), None) is None:
+            return
+        self.documentation = [d for d in self.documentation if d['path'] != path]
+        self.retriever.remove_document(path)
+        self.cache.clear()
 
 
     def _get_model_params(self, model_name: str) -> dict:
@@ -31,32 +224,10 @@ class RAG:
         params["timeout"] = 30  # 30 seconds timeout for all models
         return params
 
-        """Store document embeddings in the vector database"""
-        try:
-            for doc in self.documentation:
-                # Create document chunks (simple splitting by paragraphs)
-                chunks = doc['content'].split('\n\n')
-                chunk_ids = [f"{doc['title']}_{i}" for i in range(len(chunks))]
-                
-                # Store chunks in vector database
-                self.collection.add(
-                    ids=chunk_ids,
-                    documents=chunks,
-                    metadatas=[{
-                        'title': doc['title'],
-                        'path': doc['path'],
-                        'chunk_index': i
-                    } for i in range(len(chunks))]
-                )
-                logger.info(f"Stored embeddings for document: {doc['title']}")
-                
-        except Exception as e:
-            logger.error(f"Error storing document embeddings: {str(e)}")
-            raise
-
-    def _find_relevant_docs(self, query: str, max_docs: int = 1) -> List[Dict]:
-        """Find the most relevant documentation for a query using vector search"""
+    def _find_relevant_chunks(self, query_ctx: QueryContext) -> List[Dict]:
+        """Find the most relevant documentation chunks for a query using hybrid retrieval"""
         start_time = time.time()
+        query = query_ctx.query
         
         if not self.documentation:
             logger.warning("No documentation available for search")
@@ -65,163 +236,217 @@ class RAG:
         try:
             logger.info(f"Searching documentation for query: {query}")
             
-            # Check cache first
-            cache_key = query.lower().strip()
-            if cache_key in self.cache:
-                logger.info("Using cached results")
-                logger.info(f"Cache lookup took {time.time() - start_time:.2f} seconds")
-                return self.cache[cache_key]
-            
-            # First try exact keyword matching for simple queries
-            keyword_start = time.time()
-            query_lower = query.lower()
-            for doc in self.documentation:
-                if query_lower in doc['content'].lower():
-                    logger.info(f"Found exact match in document: {doc['title']}")
-                    self.cache[cache_key] = [doc]
-                    logger.info(f"Keyword matching took {time.time() - keyword_start:.2f} seconds")
-                    return [doc]
-            logger.info(f"Keyword matching (no match) took {time.time() - keyword_start:.2f} seconds")
-            
+            cache_key = query_ctx.cache_key
 
-            vector_start = time.time()
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=1  # Only get the most relevant result
-            )
-            logger.info(f"Vector search took {time.time() - vector_start:.2f} seconds")
-            
+            # Rank chunks with hybrid keyword + vector retrieval; concurrent identical queries share one search
+            relevant_chunks = self.cache.get_or_compute(cache_key, lambda: self.retriever.retrieve(query_ctx))
+            for chunk in relevant_chunks:
+                logger.debug(f"Relevant chunk: {chunk['id']} (score: {chunk['score']:.4f})")
 
-            relevant_docs = []
-            
-            if results['ids'][0]:
-                doc_id, metadata, distance = (
-                    results['ids'][0][0],
-                    results['metadatas'][0][0],
-                    results['distances'][0][0]
-                )
-                
-                if distance < VECTOR_DB_CONFIG["similarity_threshold"]:  # Only include if similarity is good enough
-                    title = metadata['title']
-                    doc = next((d for d in self.documentation if d['title'] == title), None)
-                    if doc:
-                        relevant_docs.append(doc)
-                        logger.debug(f"Relevant doc: {title} (distance: {distance:.3f})")
-            
-            # Cache the results
-            self.cache[cache_key] = relevant_docs
             logger.info(f"Total document search took {time.time() - start_time:.2f} seconds")
-            logger.info(f"Found {len(relevant_docs)} relevant documents")
-            return relevant_docs
+            logger.info(f"Found {len(relevant_chunks)} relevant chunks")
+            return relevant_chunks
 
         except Exception as e:
             logger.error(f"Error finding relevant docs: {str(e)}")
             return []
         
-    def _generate_response(self, prompt: str, system_prompt: str = None) -> str:
-        """Generate a response using Ollama with fallback to other models"""
+    async def _generate_response(self, prompt: str, system_prompt: str = None) -> Optional[str]:
+        """Generate a response using Ollama with fallback to other models; None if every model fails"""
         start_time = time.time()
-        
-        # Try each model in sequence - just using phi
-        for model in self.model_priority:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        # Try each model in sequence, skipping models the health monitor knows are down
+        rejection = None
+        for model in self.health.candidates(self.model_priority):
+            logger.info(f"Attempting to use model: {model}")
+            # Get model parameters
+            params = self._get_model_params(model)
+            timeout = params.pop("timeout")
+
             try:
-                logger.info(f"Attempting to use model: {model}")
-                messages = []
-                if system_prompt:
-                    messages.append({"role": "system", "content": system_prompt})
-                messages.append({"role": "user", "content": prompt})
-
-                # Get model parameters
-                params = self._get_model_params(model)
-                timeout = params.pop("timeout")
-
-                # Quick health check with increased timeout
-                try:
-                    health_check = requests.get(f"{self.ollama_base_url}/api/tags", timeout=2)
-                    if health_check.status_code != 200:
-                        logger.warning(f"Health check failed for {model}, trying next model")
-                        continue
-                except requests.exceptions.RequestException as e:
-                    logger.warning(f"Health check failed for {model}: {str(e)}, trying next model")
-                    continue
-
-                try:
-                    response = requests.post(
-                        f"{self.ollama_base_url}/api/chat",
-                        json={
-                            "model": model,
-                            "messages": messages,
-                            "stream": False,
-                            "options": params
-                        },
-                        timeout=timeout
-                    )
-                    
-                    if response.status_code == 200:
-                        logger.info(f"Successfully generated response with {model} in {time.time() - start_time:.2f} seconds")
-                        return response.json()['message']['content']
-                    else:
-                        logger.warning(f"Model {model} returned status code {response.status_code}-{response.text}")
-                        continue
-                        
-                except requests.exceptions.Timeout:
-                    logger.warning(f"Timeout while using model {model} after {timeout} seconds")
-                    continue
-                except Exception as e:
-                    logger.warning(f"Error with model {model}: {str(e)}")
-                    continue
-                    
+                async with self.admission.slot(model):
+                    model_start = time.time()
+                    response = await self.ollama.chat(model, messages, options=params, timeout=timeout)
+                self.health.report_success(model, time.time() - model_start)
+                logger.info(f"Successfully generated response with {model} in {time.time() - start_time:.2f} seconds")
+                return response['message']['content']
+            except AdmissionRejected as e:
+                logger.warning(f"Model {model} is at capacity, trying next model")
+                rejection = e
+                continue
+            except asyncio.TimeoutError as e:
+                logger.warning(f"Timeout while using model {model} after {timeout} seconds")
+                self.health.report_failure(model, e)
+                continue
             except Exception as e:
-                logger.warning(f"Failed with model {model}: {str(e)}")
+                logger.warning(f"Error with model {model}: {str(e)}")
+                self.health.report_failure(model, e)
                 continue
 
-        # If all models fail, use direct response
-        logger.warning("All models failed, using direct response")
-        return self._generate_direct_response(prompt, system_prompt or "")
-    
+        if rejection is not None:
+            # Every model we could use is saturated; refuse quickly instead of queueing more work
+            raise rejection
 
-    def _generate_direct_response(self, query: str, context: str) -> str:
+        # If all models fail, the caller answers from the sentence index instead
+        logger.warning("All models failed")
+        return None
+
+    async def _direct_response(self, query: str, sentences: List[Tuple[str, frozenset]]) -> str:
+        """Run the direct response in the generation pool, off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.generation_executor, self._generate_direct_response, query, sentences)
+
+    def _generate_direct_response(self, query: str, sentences: List[Tuple[str, frozenset]]) -> str:
         """Generate a direct response without using Ollama"""
         try:
-            # Clean up the context
-            lines = [line.strip() for line in context.split('\n') if line.strip()]
-            
-            # Skip metadata lines (lines starting with ---)
-            content_lines = [line for line in lines if not line.startswith('---')]
-            
-            content = ' '.join(content_lines)
-            sentences = [s.strip() for s in content.split('.') if s.strip()]
-            
-            # Find the most relevant sentence based on word overlap
             query_words = set(query.lower().split())
             best_sentence = None
             max_overlap = 0
-            
-            for sentence in sentences:
-                if sentence.startswith('#') or '**' in sentence or '[' in sentence:
-                    continue
-                    
-                sentence_words = set(sentence.lower().split())
-                overlap = len(query_words.intersection(sentence_words))
+            for sentence, sentence_words in sentences:
+                overlap = len(sentence_words.intersection(query_words))
                 if overlap > max_overlap:
                     max_overlap = overlap
                     best_sentence = sentence
-            
+
             if best_sentence:
-                cleaned = best_sentence.replace('**', '').replace('\\', '')
-                return cleaned.strip() + "."
-            
+                return best_sentence
+
             # If no good match found, return a generic response
             return "I couldn't find a specific answer to your question in the documentation."
-            
+
         except Exception as e:
             logger.error(f"Error in direct response generation: {str(e)}")
-            return "Could not generate a response due to an error." 
-           
+            return "Could not generate a response due to an error."
+
+    def _build_context(self, relevant_chunks: List[Dict]) -> Tuple[List[Source], str, List[Tuple[str, frozenset]]]:
+        """Select chunks within the token budget and build the sources, prompt context and fallback sentences"""
+        # Select the best chunks and their neighbours within the token budget
+        passages = self.context_assembler.assemble(relevant_chunks)
+        top_score = passages[0]['score'] or 1.0
+        for passage in passages:
+            logger.info(f"Context passage: {passage['path']} (chunks: {', '.join(passage['chunk_ids'])}, "
+                        f"{len(passage['content'])} characters)")
+
+        # Create one source per passage with only the selected content
+        sources = [Source(
+            title=passage['title'],
+            content=passage['content'],
+            relevance_score=round(passage['score'] / top_score, 3)
+        ) for passage in passages]
+
+        # Prepare context from the selected passages
+        context = "\n\n".join(
+            f"Title: {passage['title']}\nContent: {passage['content']}" for passage in passages
+        )
+
+        # Precomputed sentences of the selected chunks, for the answer fallback
+        chunks_by_id = {chunk['id']: chunk for chunk in relevant_chunks}
+        sentences = [
+            sentence
+            for passage in passages
+            for chunk_id in passage['chunk_ids']
+            for sentence in self.retriever.chunk_sentences(chunk_id, chunks_by_id.get(chunk_id))
+        ]
+        return sources, context, sentences
+
+    async def _stream_response(self, prompt: str, system_prompt: str = None) -> AsyncIterator[str]:
+        """Stream response tokens from Ollama, trying the next model if one fails before answering"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        rejection = None
+        for model in self.health.candidates(self.model_priority):
+            params = self._get_model_params(model)
+            timeout = params.pop("timeout")
+            start_time = time.time()
+            emitted = False
+            try:
+                async with self.admission.slot(model):
+                    logger.info(f"Streaming response from model: {model}")
+                    async for data in self.ollama.chat_stream(model, messages, options=params, timeout=timeout):
+                        token = data.get('message', {}).get('content', '')
+                        if token:
+                            if not emitted:
+                                logger.info(f"First token from {model} after {time.time() - start_time:.2f} seconds")
+                            emitted = True
+                            yield token
+                self.health.report_success(model, time.time() - start_time)
+                logger.info(f"Streamed response with {model} in {time.time() - start_time:.2f} seconds")
+                return
+            except AdmissionRejected as e:
+                logger.warning(f"Model {model} is at capacity, trying next model")
+                rejection = e
+                continue
+            except Exception as e:
+                self.health.report_failure(model, e)
+                if emitted:
+                    # Part of the answer is already with the client; switching models would garble it
+                    logger.error(f"Stream from model {model} failed mid-response: {str(e)}")
+                    raise StreamInterrupted(f"The answer was interrupted: {str(e)}") from e
+                logger.warning(f"Error streaming from model {model}: {str(e)}")
+                continue
+
+        if rejection is not None:
+            raise rejection
+        logger.warning("All models failed to stream a response")
+
+    async def stream_documentation_query(self, query: str, query_ctx: QueryContext = None) -> AsyncIterator[Dict]:
+        """Answer a query from the documentation as a stream of events"""
+        if query_ctx is None:
+            query_ctx = QueryContext(query)
+        try:
+            loop = asyncio.get_event_loop()
+            relevant_chunks = await asyncio.wait_for(
+                loop.run_in_executor(self.retrieval_executor, self._find_relevant_chunks, query_ctx),
+                timeout=20
+            )
+            if not relevant_chunks:
+                logger.warning("No relevant documentation found")
+                for event in response_events(QueryResponse(
+                    answer="I couldn't find any relevant documentation for your query.",
+                    sources=[],
+                    confidence_score=0.0,
+                    used_internet_search=False
+                )):
+                    yield event
+                return
+
+            sources, context, sentences = self._build_context(relevant_chunks)
+            yield sources_event(sources)
+
+            prompt = PROMPTS["documentation"].format(context=context, query=query)
+            answered = False
+            async for token in self._stream_response(prompt):
+                answered = True
+                yield token_event(token)
+
+            if answered:
+                yield done_event(confidence_score=0.8, used_internet_search=False)
+            else:
+                yield token_event(await self._direct_response(query, sentences))
+                yield done_event(confidence_score=0.5, used_internet_search=False)
+        except AdmissionRejected as e:
+            yield error_event(str(e), e.status_code, e.retry_after)
+        except StreamInterrupted as e:
+            # No done event: the partial answer must not pass for a complete one
+            yield error_event(str(e), 502)
+        except Exception as e:
+            logger.error(f"Error streaming documentation query: {str(e)}", exc_info=True)
+            yield token_event("I encountered an error while processing your query. Please try again.")
+            yield done_event(confidence_score=0.0, used_internet_search=False)
+
     @log_execution_time
-    async def process_documentation_query(self, query: str) -> QueryResponse:
+    async def process_documentation_query(self, query: str, query_ctx: QueryContext = None) -> QueryResponse:
         """Process a query using the documentation"""
         total_start = time.time()
+        if query_ctx is None:
+            query_ctx = QueryContext(query)
         try:
             # Find relevant documentation with timeout
             logger.info(f"Processing documentation query: {query}")
@@ -229,13 +454,13 @@ class RAG:
             # Run vector search in a separate thread with timeout
             loop = asyncio.get_event_loop()
             doc_search_start = time.time()
-            relevant_docs = await asyncio.wait_for(
-                loop.run_in_executor(self.executor, self._find_relevant_docs, query),
+            relevant_chunks = await asyncio.wait_for(
+                loop.run_in_executor(self.retrieval_executor, self._find_relevant_chunks, query_ctx),
                 timeout=20  # Increased timeout for document search
             )
             logger.info(f"Async document search took {time.time() - doc_search_start:.2f} seconds")
             
-            if not relevant_docs:
+            if not relevant_chunks:
                 logger.warning("No relevant documentation found")
                 return QueryResponse(
                     answer="I couldn't find any relevant documentation for your query.",
@@ -244,23 +469,7 @@ class RAG:
                     used_internet_search=False
                 )
 
-            # Log retrieved document details
-            doc = relevant_docs[0]  # Only use the most relevant doc
-            logger.info(f"Retrieved document details:")
-            logger.info(f"Title: {doc['title']}")
-            logger.info(f"Path: {doc['path']}")
-            logger.info(f"Content length: {len(doc['content'])} characters")
-            logger.info(f"Content preview: {doc['content'][:200]}...")  # First 200 chars for preview
-
-            # Create source with full content
-            sources = [Source(
-                title=doc['title'],
-                content=doc['content'],  # Use full content
-                relevance_score=1.0
-            )]
-
-            # Prepare context with full content
-            context = f"Title: {doc['title']}\nContent: {doc['content']}"  # Use full content
+            sources, context, sentences = self._build_context(relevant_chunks)
 
             # Generate response using Ollama with timeout
             prompt = PROMPTS["documentation"].format(context=context, query=query)
@@ -276,14 +485,18 @@ class RAG:
             response_start = time.time()
             try:
                 answer = await asyncio.wait_for(
-                    loop.run_in_executor(self.executor, self._generate_response, prompt),
+                    self._generate_response(prompt),
                     timeout=20  # Increased timeout for response generation
                 )
                 logger.info(f"Async response generation took {time.time() - response_start:.2f} seconds")
-                
+            except asyncio.TimeoutError:
+                logger.error("Documentation query processing timed out")
+                answer = None
+
+            if answer is not None:
                 # Log the generated answer
                 logger.info(f"Generated answer: {answer}")
-                
+
                 logger.info(f"Total query processing took {time.time() - total_start:.2f} seconds")
                 logger.info("Response generated successfully")
                 return QueryResponse(
@@ -292,25 +505,27 @@ class RAG:
                     confidence_score=0.8,
                     used_internet_search=False
                 )
-            except asyncio.TimeoutError:
-                logger.error("Documentation query processing timed out")
-                # Try direct response as fallback
-                try:
-                    direct_answer = self._generate_direct_response(query, context)
-                    return QueryResponse(
-                        answer=direct_answer,
-                        sources=sources,  # Use the same sources
-                        confidence_score=0.5,
-                        used_internet_search=False
-                    )
-                except Exception as e:
-                    logger.error(f"Direct response generation failed: {str(e)}")
-                    return QueryResponse(
-                        answer="I'm having trouble processing your query. Please try again with a more specific question.",
-                        sources=sources,  # Still include sources even for error case
-                        confidence_score=0.0,
-                        used_internet_search=False
-                    )
+
+            # No model answered in time; use direct response as fallback
+            try:
+                direct_answer = await self._direct_response(query, sentences)
+                return QueryResponse(
+                    answer=direct_answer,
+                    sources=sources,  # Use the same sources
+                    confidence_score=0.5,
+                    used_internet_search=False
+                )
+            except Exception as e:
+                logger.error(f"Direct response generation failed: {str(e)}")
+                return QueryResponse(
+                    answer="I'm having trouble processing your query. Please try again with a more specific question.",
+                    sources=sources,  # Still include sources even for error case
+                    confidence_score=0.0,
+                    used_internet_search=False
+                )
+        except AdmissionRejected:
+            # The API turns this into 429/503 with Retry-After
+            raise
         except Exception as e:
             logger.error(f"Error processing documentation query: {str(e)}", exc_info=True)
             return QueryResponse(
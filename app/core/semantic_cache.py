@@ -0,0 +1,107 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+from app.config.model_config import CACHE_CONFIG
+from app.utils.logger import logger
+
+
+class SemanticCache:
+    """Answers keyed by query embedding, so paraphrased questions reuse a cached answer"""
+
+    def __init__(self, config: Dict = None):
+        config = config or CACHE_CONFIG["semantic"]
+        self.enabled = config["enabled"]
+        self.max_entries = config["max_entries"]
+        self.ttl = config["ttl"]
+        self.max_distance = config["max_distance"]
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (unit vector, value, expires_at)
+        self._keys: List[Hashable] = []
+        self._matrix: Optional[np.ndarray] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _unit(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def _purge_expired(self):
+        if not self.ttl:
+            return
+        now = time.monotonic()
+        expired = [key for key, (_, _, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _index(self):
+        """Stack the cached vectors into one matrix, rebuilt only after the entries change"""
+        if self._matrix is None:
+            self._keys = list(self._entries)
+            self._matrix = np.stack([self._entries[key][0] for key in self._keys]) if self._keys else None
+
+    def lookup(self, embedding) -> Optional[Any]:
+        """The cached answer for the closest earlier query, if it is close enough"""
+        if not self.enabled:
+            return None
+        self._purge_expired()
+        vector = self._unit(embedding)
+        if vector is None or not self._entries:
+            self.misses += 1
+            return None
+
+        self._index()
+        similarities = self._matrix @ vector
+        best = int(np.argmax(similarities))
+        distance = 1.0 - float(similarities[best])
+        if distance > self.max_distance:
+            self.misses += 1
+            logger.debug(f"Semantic cache miss (closest distance {distance:.3f})")
+            return None
+
+        key = self._keys[best]
+        self._entries.move_to_end(key)
+        self.hits += 1
+        logger.info(f"Semantic cache hit: matched '{key}' at distance {distance:.3f}")
+        return self._entries[key][1]
+
+    def add(self, key: Hashable, embedding, value: Any):
+        if not self.enabled:
+            return
+        vector = self._unit(embedding)
+        if vector is None:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._entries.pop(key, None)
+        self._entries[key] = (vector, value, expires_at)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._matrix = None
+
+    def clear(self):
+        self._entries.clear()
+        self._matrix = None
+        self._keys = []
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'max_distance': self.max_distance,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions
+        }
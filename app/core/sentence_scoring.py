@@ -0,0 +1,103 @@
+"""Batch version of the sentence heuristic used to pick a direct answer from search results"""
+
+from typing import List
+
+import numpy as np
+
+# Separator for the joined lowercase text; it never occurs inside a sentence
+# split from text, so a query match cannot span two sentences
+_JOIN = '\0'
+
+
+# str.isspace() for every code point up to U+3000, the last whitespace character
+_SPACE_LIMIT = 0x3001
+_IS_SPACE = np.array([chr(code).isspace() for code in range(_SPACE_LIMIT)])
+
+
+def _code_points(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+
+
+def _token_starts(codes: np.ndarray) -> np.ndarray:
+    """Positions where a ``str.split()`` token begins"""
+    space = (codes < _SPACE_LIMIT) & _IS_SPACE[np.minimum(codes, _SPACE_LIMIT - 1)]
+    starts = ~space
+    starts[1:] &= space[:-1]
+    return np.flatnonzero(starts)
+
+
+def _query_matches(query_lower: str, lowered: List[str]) -> np.ndarray:
+    """Which sentences contain the query as a substring, found by scanning the joined text"""
+    if not query_lower or _JOIN in query_lower:
+        return np.fromiter((query_lower in sentence for sentence in lowered), dtype=bool, count=len(lowered))
+    lengths = np.fromiter((len(sentence) + 1 for sentence in lowered), dtype=np.int64, count=len(lowered))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    text = _JOIN.join(lowered)
+    matches = np.zeros(len(lowered), dtype=bool)
+    position = text.find(query_lower)
+    while position != -1:
+        sentence = int(np.searchsorted(starts, position, side='right')) - 1
+        matches[sentence] = True
+        # Skip to the next sentence; one match per sentence is enough
+        if sentence + 1 >= len(lowered):
+            break
+        position = text.find(query_lower, int(starts[sentence + 1]))
+    return matches
+
+
+def score_sentences(query: str, sentences: List[str]) -> np.ndarray:
+    """Heuristic score of every sentence for ``query`` (see ``_extract_answer_from_sources``)"""
+    count = len(sentences)
+    if count == 0:
+        return np.zeros(0, dtype=np.int64)
+    query_lower = query.lower()
+    query_words = set(query_lower.split())
+
+    # Token boundaries and first characters come from the code points of the text,
+    # so the original-case sentences are never split into word strings
+    codes = _code_points(' '.join(sentences))
+    starts = _token_starts(codes)
+    sentence_starts = np.concatenate(([0], np.cumsum([len(sentence) + 1 for sentence in sentences])[:-1]))
+    owner = np.searchsorted(sentence_starts, starts, side='right') - 1
+    lengths = np.bincount(owner, minlength=count)
+
+    # Term ids of the lowercase tokens (lowercasing never adds or removes whitespace,
+    # so these line up with the tokens above); the flag marks query words
+    lowered = [sentence.lower() for sentence in sentences]
+    lower_tokens = ' '.join(lowered).split()
+    distinct = dict.fromkeys(lower_tokens)
+    vocabulary = dict(zip(distinct, range(len(distinct))))
+    term_ids = np.fromiter(map(vocabulary.__getitem__, lower_tokens), dtype=np.int64, count=len(lower_tokens))
+    is_query_term = np.zeros(len(vocabulary), dtype=bool)
+    is_query_term[[vocabulary[word] for word in query_words if word in vocabulary]] = True
+
+    # Distinct (sentence, term) pairs give unique word counts and query overlap per sentence
+    pairs = np.unique(owner * len(vocabulary) + term_ids)
+    pair_sentence, pair_term = np.divmod(pairs, len(vocabulary))
+    unique_words = np.bincount(pair_sentence, minlength=count)
+    overlap = np.bincount(pair_sentence, weights=is_query_term[pair_term], minlength=count).astype(np.int64)
+
+    # isupper() runs once per distinct first character
+    first_codes, first_ids = np.unique(codes[starts], return_inverse=True)
+    upper = np.fromiter((chr(code).isupper() for code in first_codes), dtype=bool, count=len(first_codes))
+    proper_nouns = np.bincount(owner, weights=upper[first_ids], minlength=count).astype(np.int64)
+
+    scores = np.where(_query_matches(query_lower, lowered), 10, 0)
+    scores += overlap * 2
+    scores += np.where((lengths >= 5) & (lengths <= 30), 2, -1)
+    scores += np.minimum(proper_nouns, 3)
+    density = unique_words / lengths
+    scores += ((density >= 0.6) & (density <= 0.8)).astype(np.int64)
+    return scores
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest positive scores, best first, earlier sentences first on ties"""
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > k:
+        # argpartition finds the k-th best score; every index at or above it is kept so
+        # the stable tie-break below sees all tied sentences, not an arbitrary subset
+        threshold = scores[candidates[np.argpartition(-scores[candidates], k - 1)[k - 1]]]
+        candidates = candidates[scores[candidates] >= threshold]
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:k]]
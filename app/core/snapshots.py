@@ -0,0 +1,96 @@
+"""Versioned vector database snapshots under <root>/snapshots, published through <root>/CURRENT"""
+
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+
+from app.utils.logger import logger
+
+SNAPSHOTS_DIR = "snapshots"
+CURRENT_FILE = "CURRENT"
+SNAPSHOT_INFO_FILE = "snapshot.json"
+
+
+def snapshot_path(root: str, version: str) -> str:
+    return os.path.join(root, SNAPSHOTS_DIR, version)
+
+
+def current_version(root: str) -> Optional[str]:
+    """Name of the published snapshot, if any"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return version if version and os.path.isdir(snapshot_path(root, version)) else None
+
+
+def current_snapshot_path(root: str) -> Optional[str]:
+    version = current_version(root)
+    return snapshot_path(root, version) if version else None
+
+
+def list_versions(root: str) -> List[str]:
+    snapshots_dir = os.path.join(root, SNAPSHOTS_DIR)
+    if not os.path.isdir(snapshots_dir):
+        return []
+    return sorted(
+        entry.name for entry in os.scandir(snapshots_dir) if entry.is_dir()
+    )
+
+
+def new_version() -> str:
+    return time.strftime("%Y%m%d-%H%M%S")
+
+
+def prepare_snapshot(root: str, version: str, seed_from_current: bool = True) -> str:
+    """Create the directory for a new snapshot, optionally seeded with the current one"""
+    target = snapshot_path(root, version)
+    if os.path.exists(target):
+        raise FileExistsError(f"Snapshot {version} already exists at {target}")
+
+    source = current_snapshot_path(root) if seed_from_current else None
+    if source:
+        logger.info(f"Seeding snapshot {version} from {source}")
+        shutil.copytree(source, target)
+        info_file = os.path.join(target, SNAPSHOT_INFO_FILE)
+        if os.path.exists(info_file):
+            os.remove(info_file)
+    else:
+        os.makedirs(target)
+    return target
+
+
+def write_snapshot_info(root: str, version: str, info: Dict):
+    with open(os.path.join(snapshot_path(root, version), SNAPSHOT_INFO_FILE), 'w', encoding='utf-8') as f:
+        json.dump(dict(info, version=version), f, indent=2, sort_keys=True)
+
+
+def read_snapshot_info(path: str) -> Dict:
+    try:
+        with open(os.path.join(path, SNAPSHOT_INFO_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def publish_snapshot(root: str, version: str):
+    """Point CURRENT at a finished snapshot atomically"""
+    tmp_path = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+    logger.info(f"Published vector database snapshot {version}")
+
+
+def prune_snapshots(root: str, keep: int) -> List[str]:
+    """Delete the oldest snapshots, never the published one; returns the removed versions"""
+    current = current_version(root)
+    removable = [version for version in list_versions(root) if version != current]
+    removed = removable[:max(0, len(removable) - max(keep - 1, 0))]
+    for version in removed:
+        shutil.rmtree(snapshot_path(root, version), ignore_errors=True)
+        logger.info(f"Removed old vector database snapshot {version}")
+    return removed
@@ -0,0 +1,40 @@
+"""Events emitted by streaming queries: sources, tokens, then done (or error)"""
+
+from typing import Dict, List
+
+from app.models.schemas import QueryResponse, Source
+
+
+class StreamInterrupted(Exception):
+    """The model failed after part of the answer was already sent"""
+
+
+def sources_event(sources: List[Source]) -> Dict:
+    return {'event': 'sources', 'data': {'sources': [source.dict() for source in sources]}}
+
+
+def token_event(token: str) -> Dict:
+    return {'event': 'token', 'data': {'token': token}}
+
+
+def done_event(confidence_score: float, used_internet_search: bool) -> Dict:
+    return {
+        'event': 'done',
+        'data': {'confidence_score': confidence_score, 'used_internet_search': used_internet_search}
+    }
+
+
+def error_event(message: str, status_code: int, retry_after: int = None) -> Dict:
+    return {
+        'event': 'error',
+        'data': {'error': message, 'status_code': status_code, 'retry_after': retry_after}
+    }
+
+
+def response_events(response: QueryResponse) -> List[Dict]:
+    """Events for a response that was produced in one piece"""
+    return [
+        sources_event(response.sources),
+        token_event(response.answer),
+        done_event(response.confidence_score, response.used_internet_search)
+    ]
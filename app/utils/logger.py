@@ -1,3 +1,4 @@
+import json
 import logging
 import sys
 import time
@@ -30,6 +31,7 @@ class RequestIdMiddleware(BaseHTTPMiddleware):
             request_id = request.headers.get("X-Trace-ID")
         if not request_id:
             request_id = str(uuid.uuid4())[:8]
+        request.state.request_id = request_id
         
         # Process the request
         response = await call_next(request)
@@ -65,6 +67,38 @@ def log_execution_time(func):
             logger.info(f"Completed {func.__name__}")
             return result
         except Exception as e:
+            # Callers turn errors such as admission rejections into responses themselves
             logger.error(f"Failed {func.__name__}: {str(e)}")
-            return None
-    return wrapper 
\ No newline at end of file
+            raise
+    return wrapper 
+
+
+def log_response(request_id: str, response, processing_time: float):
+    """Log API response with details"""
+    try:
+
+        log_entry = {
+            "request_id": request_id,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "processing_time": f"{processing_time:.2f}s",
+            "response": {
+                "answer": response.answer,
+                "confidence_score": response.confidence_score,
+                "used_internet_search": response.used_internet_search,
+                "sources_count": len(response.sources)
+            }
+        }
+        
+
+        logger.info(f"API Response: {json.dumps(log_entry, indent=2)}")
+
+        if response.sources:
+            logger.info("Response Sources:")
+            for idx, source in enumerate(response.sources, 1):
+                logger.info(f"Source {idx}:")
+                logger.info(f"  Title: {source.title}")
+                logger.info(f"  URL: {source.url}")
+                logger.info(f"  Relevance Score: {source.relevance_score}")
+                logger.info(f"  Content Preview: {source.content[:200]}...")
+    except Exception as e:
+        logger.error(f"Error logging response: {str(e)}")
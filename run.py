@@ -1,10 +1,11 @@
-from app.api.main import app
+import uvicorn
 
 if __name__ == "__main__":
-    app.run(
+    # Single long-lived event loop serving the ASGI app; the Flask app in
+    # app/api/main.py is kept for compatibility
+    uvicorn.run(
+        "app.api.asgi:app",
         host="0.0.0.0",
         port=8000,
-        debug=True,  # Enable debug mode for development
-        threaded=True
-        # processes=MAX_WORKERS  # Use multiple processes
-    ) 
+        reload=False
+    )
@@ -0,0 +1,84 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import chromadb
+from chromadb.config import Settings
+from chromadb.utils import embedding_functions
+
+# Allow running as `python scripts/ingest_docs.py` from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config.model_config import VECTOR_DB_CONFIG
+from app.core import snapshots
+from app.core.ingestion import DocumentIndexer, load_documentation
+
+
+def ingest_docs(docs_path, root, version=None, full=False, keep=3):
+    """Build a new vector database snapshot offline and publish it"""
+    start_time = time.time()
+    version = version or snapshots.new_version()
+
+    documentation = load_documentation(docs_path)
+    if not documentation:
+        print(f"No documentation found in {docs_path}, nothing to ingest")
+        return None
+
+    os.makedirs(root, exist_ok=True)
+    target = snapshots.prepare_snapshot(root, version, seed_from_current=not full)
+    print(f"Building snapshot {version} at {target}")
+
+    client = chromadb.PersistentClient(path=target, settings=Settings(allow_reset=True))
+    embedding_function = embedding_functions.DefaultEmbeddingFunction()
+    collection = client.get_or_create_collection(
+        name=VECTOR_DB_CONFIG["collection_name"],
+        metadata={"hnsw:space": "cosine"},
+        embedding_function=embedding_function
+    )
+    indexer = DocumentIndexer(
+        collection,
+        os.path.join(target, VECTOR_DB_CONFIG["manifest_file"]),
+        embedding_function=embedding_function
+    )
+    stats = indexer.sync(documentation)
+
+    snapshots.write_snapshot_info(root, version, {
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'docs_path': docs_path,
+        'documents': len(documentation),
+        'chunks': collection.count(),
+        'added': len(stats['added']),
+        'changed': len(stats['changed']),
+        'removed': len(stats['removed']),
+        'chunks_per_second': round(stats['chunks_per_second'], 1)
+    })
+    snapshots.publish_snapshot(root, version)
+    removed = snapshots.prune_snapshots(root, keep)
+
+    print(f"Documents: {len(documentation)} ({len(stats['added'])} added, {len(stats['changed'])} changed, "
+          f"{len(stats['removed'])} removed, {stats['unchanged']} unchanged)")
+    print(f"Chunks embedded: {stats['chunks_added']} ({stats['chunks_per_second']:.1f} chunks/s), "
+          f"total in snapshot: {collection.count()}")
+    if removed:
+        print(f"Pruned old snapshots: {', '.join(removed)}")
+    print(f"Published snapshot {version} in {time.time() - start_time:.2f} seconds")
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a versioned vector database snapshot from the documentation")
+    parser.add_argument("--docs", default="docs/", help="Documentation directory (default: docs/)")
+    parser.add_argument("--root", default=VECTOR_DB_CONFIG["path"], help="Vector database root directory")
+    parser.add_argument("--version", help="Snapshot name (default: current timestamp)")
+    parser.add_argument("--full", action="store_true", help="Re-embed everything instead of seeding from the current snapshot")
+    parser.add_argument("--keep", type=int, default=3, help="Number of snapshots to keep, including the new one")
+    args = parser.parse_args()
+
+    if ingest_docs(args.docs, args.root, args.version, args.full, args.keep) is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
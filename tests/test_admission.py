@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from app.core.admission import AdmissionController, AdmissionRejected
+
+CONFIG = {
+    "enabled": True,
+    "max_concurrent": 2,
+    "queue_size": 1,
+    "queue_timeout": 0.2,
+    "reject_on_full": True
+}
+MODEL_PARAMS = {"phi": {"concurrent_requests": 1}, "mistral": {"concurrent_requests": 3}}
+
+
+async def hold(controller, model, release):
+    async with controller.slot(model):
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_per_model_limit_is_capped_by_max_concurrent():
+    controller = AdmissionController(CONFIG, MODEL_PARAMS)
+
+    assert controller._limit("phi") == 1
+    assert controller._limit("mistral") == 2
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_immediately_with_429():
+    controller = AdmissionController(CONFIG, MODEL_PARAMS)
+    release = asyncio.Event()
+    running = asyncio.create_task(hold(controller, "phi", release))
+    await asyncio.sleep(0)
+    queued = asyncio.create_task(hold(controller, "phi", release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as error:
+        async with controller.slot("phi"):
+            pass
+    assert error.value.status_code == 429
+    assert error.value.retry_after >= 1
+
+    release.set()
+    await asyncio.gather(running, queued)
+    stats = controller.stats()["models"]["phi"]
+    assert stats["admitted"] == 2
+    assert stats["rejected_full"] == 1
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_is_rejected_with_503():
+    controller = AdmissionController(CONFIG, MODEL_PARAMS)
+    release = asyncio.Event()
+    running = asyncio.create_task(hold(controller, "phi", release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as error:
+        async with controller.slot("phi"):
+            pass
+    assert error.value.status_code == 503
+    assert controller.waiting == 0
+
+    release.set()
+    await running
+
+
+@pytest.mark.asyncio
+async def test_queued_request_runs_when_a_slot_frees():
+    controller = AdmissionController(CONFIG, MODEL_PARAMS)
+    release = asyncio.Event()
+    running = asyncio.create_task(hold(controller, "phi", release))
+    await asyncio.sleep(0)
+    asyncio.get_running_loop().call_later(0.05, release.set)
+
+    async with controller.slot("phi"):
+        assert controller.stats()["models"]["phi"]["in_flight"] == 1
+    await running
+
+
+@pytest.mark.asyncio
+async def test_disabled_controller_admits_everything():
+    controller = AdmissionController(dict(CONFIG, enabled=False), MODEL_PARAMS)
+    release = asyncio.Event()
+    tasks = [asyncio.create_task(hold(controller, "phi", release)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*tasks)
@@ -0,0 +1,149 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import asgi
+from app.core.admission import AdmissionRejected
+from app.core.ai_assistant import AIAssistant
+from app.core.cache import TTLCache
+from app.core.rag import RAG
+from app.core.semantic_cache import SemanticCache
+from app.models.schemas import QueryResponse, Source
+
+
+class StubAssistant:
+    async def process_query(self, query):
+        if query == "busy":
+            raise AdmissionRejected("The server is currently busy.", 429, 4)
+        return QueryResponse(
+            answer=f"answer to {query}",
+            sources=[Source(title="doc", content="text", relevance_score=1.0)],
+            confidence_score=0.8,
+            used_internet_search=False
+        )
+
+    async def stream_query(self, query):
+        yield {'event': 'sources', 'data': {'sources': [{'title': 'doc', 'content': 'text', 'relevance_score': 1.0}]}}
+        for token in ["answer ", "to ", query]:
+            yield {'event': 'token', 'data': {'token': token}}
+        yield {'event': 'done', 'data': {'confidence_score': 0.8, 'used_internet_search': False}}
+
+    def metrics(self):
+        return {'ollama_pool': {'requests': 2, 'connections_created': 1, 'connections_reused': 1}}
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+def parse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(asgi, "AIAssistant", StubAssistant)
+    with TestClient(asgi.app) as client:
+        yield client
+
+
+def test_query_returns_assistant_response_and_request_id(client):
+    response = client.post("/query", json={"query": "What is a tenant?"}, headers={"X-Request-ID": "abc"})
+
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "abc"
+    body = response.json()
+    assert body["answer"] == "answer to What is a tenant?"
+    assert body["sources"][0]["title"] == "doc"
+
+
+def test_health(client):
+    response = client.get("/health")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "healthy"}
+
+
+def test_query_stream_sends_sources_then_tokens_then_done(client):
+    response = client.post("/query/stream", json={"query": "What is a tenant?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    assert [name for name, _ in events] == ["sources", "token", "token", "token", "done"]
+    assert events[0][1]["sources"][0]["title"] == "doc"
+    assert "".join(data["token"] for name, data in events if name == "token") == "answer to What is a tenant?"
+    assert events[-1][1]["confidence_score"] == 0.8
+
+
+def test_metrics_reports_ollama_pool(client):
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.json()["ollama_pool"]["connections_reused"] == 1
+
+
+def test_rejected_query_returns_429_with_retry_after(client):
+    response = client.post("/query", json={"query": "busy"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "4"
+    assert response.json()["retry_after"] == 4
+
+
+class EmptyCollection:
+    def query(self, n_results, include, **kwargs):
+        return {'ids': [[]], 'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
+
+
+class AllModelsHealthy:
+    def candidates(self, models):
+        return list(models)
+
+    def report_success(self, model, latency):
+        pass
+
+    def report_failure(self, model, error):
+        pass
+
+
+class SaturatedAdmission:
+    def slot(self, model):
+        raise AdmissionRejected(f"Model {model} is at capacity.", 429, 4)
+
+
+class SaturatedAssistant(AIAssistant):
+    """The real query path over a stub collection, with every model slot taken"""
+
+    def __init__(self):
+        self.cache = TTLCache("responses", ttl=60)
+        self.semantic_cache = SemanticCache()
+        self.embedding_function = None
+        docs = [{'title': 'tenant', 'path': 'tenant.md', 'content': "# Tenant\n\nA tenant is an isolated environment."}]
+        self.rag = RAG(EmptyCollection(), docs, None, ollama=object(), health=AllModelsHealthy(),
+                       admission=SaturatedAdmission())
+
+    async def _is_duplo_related(self, query_ctx):
+        return True
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+def test_saturated_models_reject_the_real_query_path_with_429(monkeypatch):
+    monkeypatch.setattr(asgi, "AIAssistant", SaturatedAssistant)
+    with TestClient(asgi.app) as client:
+        response = client.post("/query", json={"query": "What is a tenant?"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "4"
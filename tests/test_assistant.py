@@ -1,7 +1,13 @@
 import pytest
 import logging
 
+from app.config.model_config import VECTOR_DB_CONFIG
 from app.core.ai_assistant import AIAssistant
+from app.core.admission import AdmissionController
+from app.core.cache import TTLCache
+from app.core.duplo_related import DuploRelated
+from app.core.rag import RAG
+from app.core.semantic_cache import SemanticCache
 from app.models.schemas import QueryResponse
 
 # Configure logging
@@ -9,8 +15,10 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 @pytest.fixture
-def assistant():
+def assistant(monkeypatch):
     """Create an AI Assistant instance for testing"""
+    # Index docs/ directly instead of requiring a published snapshot
+    monkeypatch.setitem(VECTOR_DB_CONFIG, "read_only", False)
     return AIAssistant()
 
 @pytest.mark.asyncio
@@ -35,4 +43,151 @@ async def test_process_query(assistant):
         
         # Verify response content
         assert len(response.answer) > 0
-        assert 0 <= response.confidence_score <= 1 
\ No newline at end of file
+        assert 0 <= response.confidence_score <= 1 
+
+
+def answer(confidence_score):
+    return QueryResponse(answer=f"answer {confidence_score}", sources=[], confidence_score=confidence_score,
+                         used_internet_search=False)
+
+
+@pytest.mark.asyncio
+async def test_fallback_answers_are_not_cached():
+    stub = AIAssistant.__new__(AIAssistant)
+    stub.cache = TTLCache("responses", ttl=60)
+    stub.embedding_function = None
+    answers = [answer(0.5), answer(0.8), answer(0.5)]
+
+    async def next_answer(query_ctx):
+        return answers.pop(0)
+    stub._answer = next_answer
+
+    # The offline fallback is retried, the model answer that follows is kept
+    assert (await stub.process_query("What is a tenant?")).confidence_score == 0.5
+    assert (await stub.process_query("What is a tenant?")).confidence_score == 0.8
+    assert (await stub.process_query("What is a tenant?")).confidence_score == 0.8
+    assert len(answers) == 1
+
+
+class EmptyCollection:
+    def query(self, n_results, include, **kwargs):
+        return {'ids': [[]], 'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
+
+
+class HealthyModels:
+    def candidates(self, models):
+        return list(models)
+
+    def report_success(self, model, latency):
+        pass
+
+    def report_failure(self, model, error):
+        pass
+
+
+class FailingStream:
+    """Ollama stand-in whose stream breaks after ``tokens`` tokens"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    async def chat_stream(self, model, messages, options=None, timeout=None):
+        for i in range(self.tokens):
+            yield {'message': {'content': f"part{i} "}}
+        raise ConnectionError("connection reset")
+
+
+def streaming_assistant(ollama):
+    stub = AIAssistant.__new__(AIAssistant)
+    stub.cache = TTLCache("responses", ttl=60)
+    stub.semantic_cache = SemanticCache({"enabled": True, "max_entries": 10, "ttl": None, "max_distance": 0.05})
+    stub.embedding_function = lambda texts: [[1.0, 0.0] for _ in texts]
+    docs = [{'title': 'tenant', 'path': 'tenant.md', 'content': "# Tenant\n\nA tenant is an isolated environment."}]
+    stub.rag = RAG(EmptyCollection(), docs, None, ollama=ollama, health=HealthyModels(),
+                   admission=AdmissionController())
+
+    async def semantic_lookup(query_ctx):
+        return None
+
+    async def duplo_related(query_ctx):
+        return True
+    stub._semantic_lookup = semantic_lookup
+    stub._is_duplo_related = duplo_related
+    return stub
+
+
+@pytest.mark.asyncio
+async def test_interrupted_stream_ends_with_error_and_is_not_remembered():
+    stub = streaming_assistant(FailingStream(tokens=2))
+
+    events = [event async for event in stub.stream_query("What is a tenant?")]
+
+    assert [event['event'] for event in events] == ['sources', 'token', 'token', 'error']
+    assert len(stub.semantic_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_streamed_fallback_answer_is_not_remembered():
+    stub = streaming_assistant(FailingStream(tokens=0))
+
+    events = [event async for event in stub.stream_query("What is a tenant?")]
+
+    assert events[-1] == {'event': 'done', 'data': {'confidence_score': 0.5, 'used_internet_search': False}}
+    assert len(stub.semantic_cache) == 0
+
+
+class CountingEmbedding:
+    """Embedding function stand-in that counts how often it runs"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[1.0, 0.0] for _ in texts]
+
+
+class RecordingCollection:
+    """Chroma stand-in that records the arguments of every query and returns one close hit"""
+
+    def __init__(self):
+        self.queries = []
+
+    def query(self, n_results, include=None, **kwargs):
+        self.queries.append(dict(kwargs, n_results=n_results))
+        return {
+            'ids': [['tenant.md#0']],
+            'documents': [["A tenant is an isolated environment."]],
+            'metadatas': [[{'title': 'tenant', 'path': 'tenant.md', 'chunk_index': 0}]],
+            'distances': [[0.1]]
+        }
+
+
+class AnsweringModel:
+    async def chat(self, model, messages, options=None, timeout=None):
+        return {'message': {'content': "A tenant is an isolated environment."}}
+
+
+@pytest.mark.asyncio
+async def test_a_query_is_embedded_once_across_routing_and_retrieval():
+    embedding = CountingEmbedding()
+    collection = RecordingCollection()
+    stub = AIAssistant.__new__(AIAssistant)
+    stub.cache = TTLCache("responses", ttl=60)
+    stub.semantic_cache = SemanticCache({"enabled": True, "max_entries": 10, "ttl": None, "max_distance": 0.05})
+    stub.embedding_function = embedding
+    stub.retrieval_executor = None
+    stub.duplo_related = DuploRelated(collection)
+    docs = [{'title': 'tenant', 'path': 'tenant.md', 'content': "# Tenant\n\nA tenant is an isolated environment."}]
+    stub.rag = RAG(collection, docs, None, ollama=AnsweringModel(), health=HealthyModels(),
+                   admission=AdmissionController())
+
+    response = await stub.process_query("What is a tenant?")
+
+    assert response.answer == "A tenant is an isolated environment."
+    # Semantic lookup, routing and hybrid retrieval all reuse one embedding
+    assert embedding.calls == [["What is a tenant?"]]
+    assert len(collection.queries) == 2
+    for query in collection.queries:
+        assert query['query_embeddings'] == [[1.0, 0.0]]
+        assert 'query_texts' not in query
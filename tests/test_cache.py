@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.cache import TTLCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache("test", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_limit_evicts_oldest_entries():
+    cache = TTLCache("test", max_bytes=100, sizeof=len)
+    cache.set("a", "x" * 60)
+    cache.set("b", "y" * 60)
+
+    assert "a" not in cache
+    assert cache.stats()["bytes"] == 60
+
+    cache.set("huge", "z" * 200)
+    assert "huge" not in cache
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache("test", ttl=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 1, 1)
+
+
+def test_concurrent_threads_compute_once():
+    cache = TTLCache("test")
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return "chunks"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("q", compute)))
+               for _ in range(4)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["chunks"] * 4
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_async_misses_share_one_load():
+    cache = TTLCache("test")
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    results = await asyncio.gather(*[cache.get_or_load("q", load) for _ in range(5)])
+
+    assert results == ["answer"] * 5
+    assert len(calls) == 1
+    assert await cache.get_or_load("q", load) == "answer"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_values_and_errors_are_not_cached():
+    cache = TTLCache("test")
+
+    async def failing():
+        raise RuntimeError("busy")
+
+    async def empty():
+        return ""
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("q", failing)
+    assert await cache.get_or_load("q", empty, cache_if=bool) == ""
+    assert "q" not in cache
+
+
+@pytest.mark.asyncio
+async def test_clear_during_load_discards_stale_value():
+    cache = TTLCache("test")
+
+    async def load():
+        await asyncio.sleep(0.01)
+        return "stale"
+
+    task = asyncio.create_task(cache.get_or_load("q", load))
+    await asyncio.sleep(0)
+    cache.clear()
+
+    assert await task == "stale"
+    assert "q" not in cache
@@ -0,0 +1,135 @@
+import copy
+
+from app.config.model_config import CHUNKING_CONFIG
+from app.core.chunking import MarkdownChunker, chunk_document, sentence_index, word_count
+
+
+def make_chunker(**semantic):
+    config = copy.deepcopy(CHUNKING_CONFIG)
+    config["semantic"].update(semantic)
+    return MarkdownChunker(config)
+
+
+DOC = """# Tenant
+
+Intro sentence about tenants.
+
+## Settings
+
+| Name | Value |
+|------|-------|
+| a    | 1     |
+
+```bash
+echo one
+
+echo two
+```
+
+* first item
+* second item
+
+## Usage
+
+<figure><img src="x.png" alt=""></figure>
+Use it &amp; enjoy.
+"""
+
+
+def test_headers_become_paths_and_structures_stay_together():
+    chunker = make_chunker(min_chunk_size=0, max_chunk_size=200)
+
+    chunks = chunker.split(DOC)
+
+    paths = [path for path, _ in chunks]
+    assert paths == ["Tenant", "Tenant > Settings", "Tenant > Usage"]
+    settings = chunks[1][1]
+    assert "| a    | 1     |" in settings
+    assert "echo one\n\necho two\n```" in settings
+    assert "* first item\n* second item" in settings
+    assert chunks[2][1] == "## Tenant > Usage\n\nUse it & enjoy."
+
+
+def test_every_chunk_starts_with_its_section_heading():
+    chunker = make_chunker(min_chunk_size=0, max_chunk_size=200)
+
+    chunks = chunker.split(DOC)
+
+    assert [content.split("\n")[0] for _, content in chunks] == [
+        "# Tenant", "## Tenant > Settings", "## Tenant > Usage"
+    ]
+    assert chunker.split("No heading here.") == [("", "No heading here.")]
+
+
+def test_small_sections_are_not_merged_into_the_previous_section():
+    chunker = make_chunker(min_chunk_size=10, max_chunk_size=200)
+    text = (
+        "# Tenants\n\n## Create\n\n" + " ".join(["Create a tenant from the tenants page."] * 3) +
+        "\n\n## Delete\n\nDelete it from the menu.\n"
+    )
+
+    chunks = chunker.split(text)
+
+    assert [path for path, _ in chunks] == ["Tenants > Create", "Tenants > Delete"]
+    assert chunks[1][1] == "## Tenants > Delete\n\nDelete it from the menu."
+    assert "Delete" not in chunks[0][1]
+
+
+def test_small_fragments_within_a_section_are_merged():
+    chunker = make_chunker(min_chunk_size=10, max_chunk_size=200)
+
+    chunks = chunker.split(DOC)
+
+    assert chunks[0][0] == "Tenant"
+    assert "Intro sentence about tenants." in chunks[0][1]
+    settings = chunks[1][1]
+    assert "| a    | 1     |" in settings and "* first item" in settings
+
+
+def test_long_paragraphs_are_split_with_overlap():
+    chunker = make_chunker(min_chunk_size=0, max_chunk_size=12, overlap=3)
+    text = " ".join(f"Sentence number {i} has six words." for i in range(6))
+
+    chunks = [content for _, content in chunker.split(text)]
+
+    assert len(chunks) > 1
+    assert all(word_count(content) <= 12 + 3 for content in chunks)
+    first_tail = " ".join(chunks[0].split()[-3:])
+    assert chunks[1].startswith(first_tail)
+
+
+def test_chunk_document_emits_metadata():
+    doc = {'title': 'tenant', 'path': 'tenant/README.md', 'content': DOC}
+
+    chunks = chunk_document(doc, make_chunker(min_chunk_size=0))
+
+    assert [chunk['id'] for chunk in chunks] == [
+        'tenant/README.md#0', 'tenant/README.md#1', 'tenant/README.md#2'
+    ]
+    assert chunks[1]['metadata'] == {
+        'doc_id': 'tenant/README.md',
+        'title': 'tenant',
+        'path': 'tenant/README.md',
+        'chunk_index': 1,
+        'header_path': 'Tenant > Settings',
+    }
+
+
+def test_chunks_carry_a_sentence_index():
+    content = "--- source ---\nA tenant isolates workloads. See [docs](x). **Note**: bold.\nPlans hold tenants. # Setup"
+
+    chunk = chunk_document({'title': 't', 'path': 't.md', 'content': content}, make_chunker(min_chunk_size=0))[0]
+
+    assert sentence_index(content) == [
+        ("A tenant isolates workloads.", frozenset({"a", "tenant", "isolates", "workloads"})),
+        ("Plans hold tenants.", frozenset({"plans", "hold", "tenants"})),
+    ]
+    assert chunk['sentences'] == sentence_index(chunk['content'])
+
+
+def test_chunk_ids_are_unique_across_folders():
+    docs = [{'title': 'README', 'path': f"{folder}/README.md", 'content': "Some text."} for folder in ('a', 'b')]
+
+    ids = [chunk['id'] for doc in docs for chunk in chunk_document(doc, make_chunker(min_chunk_size=0))]
+
+    assert ids == ['a/README.md#0', 'b/README.md#0']
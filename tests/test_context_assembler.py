@@ -0,0 +1,61 @@
+from app.core.context_assembler import ContextAssembler, estimate_tokens
+
+
+def make_config(max_tokens, max_chunks=3, context_window=2, include_siblings=True):
+    return {
+        "context": {
+            "enabled": True,
+            "max_tokens": max_tokens,
+            "context_window": context_window,
+            "include_siblings": include_siblings,
+        },
+        "query_aware": {"max_chunks": max_chunks},
+    }
+
+
+def make_chunk(path, index, content, score=0.0):
+    return {
+        'id': f"{path}#{index}",
+        'content': content,
+        'metadata': {'title': path, 'path': path, 'chunk_index': index},
+        'score': score,
+    }
+
+
+CHUNKS = {
+    ('a.md', i): make_chunk('a.md', i, f"paragraph {i} " * 5) for i in range(5)
+}
+
+
+def get_chunk(path, index):
+    return CHUNKS.get((path, index))
+
+
+def test_siblings_are_added_in_reading_order_within_budget():
+    assembler = ContextAssembler(get_chunk, make_config(max_tokens=100))
+    ranked = [dict(CHUNKS[('a.md', 2)], score=0.5)]
+
+    passages = assembler.assemble(ranked)
+
+    assert len(passages) == 1
+    assert passages[0]['chunk_ids'] == ['a.md#1', 'a.md#2', 'a.md#3']
+    assert passages[0]['content'].startswith("paragraph 1")
+
+
+def test_budget_limits_selected_chunks():
+    chunk_tokens = estimate_tokens(CHUNKS[('a.md', 0)]['content'])
+    assembler = ContextAssembler(get_chunk, make_config(max_tokens=chunk_tokens, include_siblings=False))
+    ranked = [dict(CHUNKS[('a.md', 4)], score=0.5), dict(CHUNKS[('a.md', 0)], score=0.4)]
+
+    passages = assembler.assemble(ranked)
+
+    assert passages[0]['chunk_ids'] == ['a.md#4']
+
+
+def test_oversized_best_chunk_is_trimmed_not_dropped():
+    big = make_chunk('b.md', 0, "x" * 4000, score=1.0)
+    assembler = ContextAssembler(get_chunk, make_config(max_tokens=50))
+
+    passages = assembler.assemble([big])
+
+    assert len(passages[0]['content']) == 200
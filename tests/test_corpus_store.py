@@ -0,0 +1,109 @@
+import os
+
+from app.core.chunking import chunk_document
+from app.core.corpus_store import CorpusStore
+from app.core.query_context import QueryContext
+from app.core.rag import HybridRetriever
+
+DOCS = [
+    {'id': 'tenant/README.md', 'title': 'README', 'path': 'tenant/README.md',
+     'content': "# Tenant\n\nA tenant is an isolated environment. Tenants hold services.\n\n## Ünicode\n\nCafé naïve text."},
+    {'id': 'plan/README.md', 'title': 'README', 'path': 'plan/README.md',
+     'content': "# Plan\n\nA plan groups infrastructure for tenants."},
+]
+
+
+class EmptyCollection:
+    def query(self, n_results, include, **kwargs):
+        return {'ids': [[]], 'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
+
+
+def test_documents_and_chunks_read_back_from_the_mapped_blob(tmp_path):
+    store = CorpusStore.open_or_build(str(tmp_path), DOCS, "f" * 64)
+    try:
+        assert [dict(doc) for doc in store.documents()] == DOCS
+
+        expected = [chunk for doc in DOCS for chunk in chunk_document(doc)]
+        stored = store.chunks()
+        assert [chunk['id'] for chunk in stored] == [chunk['id'] for chunk in expected]
+        for chunk, original in zip(stored, expected):
+            assert chunk['content'] == original['content']
+            assert chunk['metadata'] == original['metadata']
+            assert chunk['sentences'] == original['sentences']
+    finally:
+        store.close()
+
+
+def test_existing_version_is_reused_and_older_ones_pruned(tmp_path):
+    first = CorpusStore.open_or_build(str(tmp_path), DOCS, "a" * 64)
+    blob = os.path.join(first.directory, "corpus.bin")
+    built_at = os.stat(blob).st_mtime_ns
+    again = CorpusStore.open_or_build(str(tmp_path), DOCS, "a" * 64)
+    assert os.stat(blob).st_mtime_ns == built_at
+
+    newer = CorpusStore.open_or_build(str(tmp_path), DOCS[:1], "b" * 64)
+    assert os.listdir(tmp_path) == ["b" * 16 + "-v2"]
+    # A worker still mapping the pruned version keeps reading it
+    assert first.documents()[1]['content'] == DOCS[1]['content']
+    assert newer.stats()['documents'] == 1
+    for store in (first, again, newer):
+        store.close()
+
+
+def test_retriever_serves_stored_chunks(tmp_path):
+    store = CorpusStore.open_or_build(str(tmp_path), DOCS, "c" * 64)
+    try:
+        retriever = HybridRetriever(EmptyCollection(), store.chunks())
+
+        results = retriever.retrieve(QueryContext("isolated environment"), top_k=1)
+
+        assert results[0]['id'] == 'tenant/README.md#0'
+        assert "isolated environment" in results[0]['content']
+        assert retriever.get_chunk('plan/README.md', 0)['content'] == "# Plan\n\nA plan groups infrastructure for tenants."
+    finally:
+        store.close()
+
+
+def test_retriever_uses_the_stored_keyword_index(tmp_path):
+    store = CorpusStore.open_or_build(str(tmp_path), DOCS, "e" * 64)
+    try:
+        retriever = HybridRetriever(EmptyCollection(), store.chunks(), index=store.keyword_index())
+        in_memory = HybridRetriever(EmptyCollection(), store.chunks())
+        assert not retriever.index.postings
+
+        for query in ("isolated environment", "tenants", "café"):
+            assert retriever.retrieve(QueryContext(query)) == in_memory.retrieve(QueryContext(query))
+
+        retriever.remove_document('plan/README.md')
+        retriever.add_chunks(chunk_document({'title': 'README', 'path': 'plan/README.md',
+                                             'content': "# Plan\n\nPlans are billed monthly."}))
+        assert retriever.retrieve(QueryContext("billed monthly"))[0]['id'] == 'plan/README.md#0'
+        assert retriever.retrieve(QueryContext("groups infrastructure")) == []
+    finally:
+        store.close()
+
+
+def test_empty_corpus(tmp_path):
+    store = CorpusStore.open_or_build(str(tmp_path), [], "d" * 64)
+
+    assert store.documents() == [] and store.chunks() == []
+    store.close()
+
+
+def test_version_is_found_by_scan_signature(tmp_path):
+    assert CorpusStore.open_matching(str(tmp_path), "sig-1") is None
+    built = CorpusStore.open_or_build(str(tmp_path), DOCS, "c" * 64, signature="sig-1")
+    built.close()
+
+    store = CorpusStore.open_matching(str(tmp_path), "sig-1")
+    try:
+        assert store.fingerprint == "c" * 64
+        assert CorpusStore.open_matching(str(tmp_path), "sig-2") is None
+    finally:
+        store.close()
+
+    # Same content with new modification times reuses the version under the new signature
+    CorpusStore.open_or_build(str(tmp_path), DOCS, "c" * 64, signature="sig-2").close()
+    reopened = CorpusStore.open_matching(str(tmp_path), "sig-2")
+    assert reopened is not None
+    reopened.close()
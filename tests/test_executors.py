@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.executors import InstrumentedExecutor
+
+
+def test_records_queue_depth_and_wait_time():
+    executor = InstrumentedExecutor("test", max_workers=1)
+    release = threading.Event()
+    try:
+        blocking = executor.submit(release.wait)
+        queued = executor.submit(lambda: 42)
+        stats = executor.stats()
+        assert stats['running'] + stats['queued'] == 2
+
+        threading.Timer(0.05, release.set).start()
+        assert queued.result(timeout=1) == 42
+        blocking.result(timeout=1)
+
+        stats = executor.stats()
+        assert stats['completed'] == 2
+        assert stats['queued'] == 0
+        assert stats['max_wait'] >= 0.04
+    finally:
+        executor.shutdown()
+
+
+def test_counts_failures():
+    executor = InstrumentedExecutor("test", max_workers=1)
+    try:
+        with pytest.raises(ValueError):
+            executor.submit(int, "not a number").result(timeout=1)
+        assert executor.stats()['failed'] == 1
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_slow_generation_does_not_delay_retrieval():
+    retrieval = InstrumentedExecutor("retrieval", max_workers=1)
+    generation = InstrumentedExecutor("generation", max_workers=1)
+    release = threading.Event()
+    loop = asyncio.get_running_loop()
+    try:
+        slow = [loop.run_in_executor(generation, release.wait) for _ in range(2)]
+        result = await asyncio.wait_for(loop.run_in_executor(retrieval, lambda: "chunks"), timeout=1)
+
+        assert result == "chunks"
+        assert retrieval.stats()['max_wait'] < 0.5
+        assert generation.stats()['queued'] == 1
+        release.set()
+        await asyncio.gather(*slow)
+    finally:
+        release.set()
+        retrieval.shutdown()
+        generation.shutdown()
@@ -0,0 +1,131 @@
+import os
+
+from app.core.ingestion import DocumentIndexer, load_documentation, scan_documentation, scan_signature
+
+
+class MemoryCollection:
+    """In-memory stand-in for the parts of a Chroma collection the indexer uses"""
+
+    def __init__(self):
+        self.items = {}
+        self.embedded = 0
+        self.add_calls = 0
+
+    def count(self):
+        return len(self.items)
+
+    def get(self, include=None):
+        return {'ids': list(self.items)}
+
+    def add(self, ids, documents, metadatas, embeddings=None):
+        self.add_calls += 1
+        self.embedded += len(ids)
+        for chunk_id, document in zip(ids, documents):
+            self.items[chunk_id] = document
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.items.pop(chunk_id, None)
+
+
+def make_doc(path, content):
+    return {'title': path.split('.')[0], 'path': path, 'content': content}
+
+
+def test_sync_only_embeds_the_diff(tmp_path):
+    collection = MemoryCollection()
+    manifest = str(tmp_path / "manifest.json")
+    docs = [make_doc('a.md', 'Alpha document text.'), make_doc('b.md', 'Beta document text.')]
+
+    first = DocumentIndexer(collection, manifest).sync(docs)
+    assert sorted(first['added']) == ['a.md', 'b.md']
+    embedded_after_first = collection.embedded
+
+    # A fresh indexer reads the manifest back, as after a restart
+    second = DocumentIndexer(collection, manifest).sync(docs)
+    assert second['unchanged'] == 2
+    assert collection.embedded == embedded_after_first
+
+    changed = [make_doc('a.md', 'Alpha document, revised.'), make_doc('c.md', 'Gamma text.')]
+    third = DocumentIndexer(collection, manifest).sync(changed)
+    assert third['changed'] == ['a.md']
+    assert third['added'] == ['c.md']
+    assert third['removed'] == ['b.md']
+    assert sorted(collection.items.values()) == ['Alpha document, revised.', 'Gamma text.']
+
+
+def test_untracked_collection_is_rebuilt(tmp_path):
+    collection = MemoryCollection()
+    collection.add(ids=['legacy_0'], documents=['stale'], metadatas=[{}])
+
+    DocumentIndexer(collection, str(tmp_path / "manifest.json")).sync([make_doc('a.md', 'Fresh text.')])
+
+    assert list(collection.items.values()) == ['Fresh text.']
+
+
+def test_chunks_are_batched_across_documents(tmp_path):
+    collection = MemoryCollection()
+    encoded = []
+
+    def embedding_function(texts):
+        encoded.append(len(texts))
+        return [[float(len(text))] for text in texts]
+
+    docs = [make_doc(f"doc{i}.md", f"Document number {i}.") for i in range(5)]
+    indexer = DocumentIndexer(collection, str(tmp_path / "manifest.json"),
+                              embedding_function=embedding_function, batch_size=2, embedding_workers=2)
+
+    stats = indexer.sync(docs)
+
+    assert stats['chunks_added'] == 5
+    assert sorted(encoded) == [1, 2, 2]
+    assert collection.add_calls == 3
+    assert stats['chunks_per_second'] > 0
+
+
+def write_docs(root):
+    (root / "tenant").mkdir()
+    (root / "tenant" / "nested").mkdir()
+    (root / "README.md").write_text("# Overview\n\nTop level.", encoding="utf-8")
+    (root / "tenant" / "guide.txt").write_text("Tenant guide.", encoding="utf-8")
+    (root / "tenant" / "nested" / "deep.md").write_text("Nested doc.", encoding="utf-8")
+    (root / "tenant" / "diagram.png").write_bytes(b"\x89PNG")
+    (root / "notes.md.bak").write_text("backup", encoding="utf-8")
+
+
+def test_scan_keeps_only_documentation_files(tmp_path):
+    write_docs(tmp_path)
+
+    paths = [os.path.relpath(path, tmp_path) for path in scan_documentation(str(tmp_path))]
+
+    assert paths == sorted(['README.md', os.path.join('tenant', 'guide.txt'),
+                            os.path.join('tenant', 'nested', 'deep.md')])
+
+
+def test_parallel_load_matches_lazy_content(tmp_path):
+    write_docs(tmp_path)
+
+    eager = load_documentation(str(tmp_path), workers=3)
+    lazy = load_documentation(str(tmp_path), lazy=True)
+
+    assert not any(doc.loaded for doc in lazy)
+    assert [doc['path'] for doc in lazy] == [doc['path'] for doc in eager]
+    assert not any(doc.loaded for doc in lazy)
+    assert [dict(doc) for doc in lazy] == eager
+    assert all(doc.loaded for doc in lazy)
+    assert eager[0] == {'id': 'README.md', 'title': 'README', 'path': 'README.md',
+                        'content': "# Overview\n\nTop level."}
+
+
+def test_scan_signature_tracks_file_changes(tmp_path):
+    write_docs(tmp_path)
+    before = scan_signature(load_documentation(str(tmp_path), lazy=True))
+    assert scan_signature(load_documentation(str(tmp_path), lazy=True)) == before
+
+    (tmp_path / "tenant" / "guide.txt").write_text("Tenant guide, revised.", encoding="utf-8")
+
+    assert scan_signature(load_documentation(str(tmp_path), lazy=True)) != before
+
+
+def test_missing_directory_loads_nothing(tmp_path):
+    assert load_documentation(str(tmp_path / "missing")) == []
@@ -0,0 +1,251 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from aiohttp import web
+
+from app.config.search_config import SEARCH_PROVIDERS
+from app.core import internet_search
+from app.core.internet_search import InternetSearch, parse_duckduckgo_results
+
+RESULTS_PAGE = """
+<html><body>
+<div class="result results_links result--ad">
+  <h2 class="result__title"><a class="result__a" href="https://duckduckgo.com/y.js?ad_domain=x">Ad</a></h2>
+  <a class="result__snippet">Sponsored</a>
+</div>
+<div class="result results_links">
+  <h2 class="result__title">
+    <a class="result__a" href="//duckduckgo.com/l/?uddg=https%3A%2F%2Fdocs.duplocloud.com%2Ftenants&amp;rut=1">Tenants</a>
+  </h2>
+  <a class="result__snippet" href="#">A <b>tenant</b> isolates workloads.</a>
+</div>
+<div class="result results_links">
+  <h2 class="result__title"><a class="result__a" href="https://example.com/services">Services</a></h2>
+  <a class="result__snippet" href="#">Services run containers.</a>
+</div>
+</body></html>
+"""
+
+
+async def start_fake_duckduckgo(handler):
+    app = web.Application()
+    app.router.add_post('/html/', handler)
+    runner = web.AppRunner(app, handler_cancellation=True)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/html/"
+
+
+def make_search(base_url, timeout=2, max_retries=3):
+    providers = {name: dict(config) for name, config in SEARCH_PROVIDERS.items()}
+    providers["duckduckgo"]["base_url"] = base_url
+    search = InternetSearch(providers)
+    search.timeout = timeout
+    search.max_retries = max_retries
+    return search
+
+
+def test_parse_skips_ads_and_unwraps_redirect_links():
+    results = parse_duckduckgo_results(RESULTS_PAGE, max_results=3)
+
+    assert results == [
+        {"title": "Tenants", "link": "https://docs.duplocloud.com/tenants", "body": "A tenant isolates workloads."},
+        {"title": "Services", "link": "https://example.com/services", "body": "Services run containers."},
+    ]
+    assert len(parse_duckduckgo_results(RESULTS_PAGE, max_results=1)) == 1
+
+
+@pytest.mark.asyncio
+async def test_search_posts_query_to_the_html_endpoint():
+    queries = []
+
+    async def handler(request):
+        queries.append((await request.post())['q'])
+        return web.Response(text=RESULTS_PAGE, content_type='text/html')
+
+    runner, base_url = await start_fake_duckduckgo(handler)
+    try:
+        results = await make_search(base_url)._search_with_duckduckgo("what is a tenant")
+    finally:
+        await runner.cleanup()
+
+    assert queries == ["what is a tenant"]
+    assert [result["title"] for result in results] == ["Tenants", "Services"]
+
+
+@pytest.mark.asyncio
+async def test_results_page_is_parsed_off_the_event_loop(monkeypatch):
+    parse_threads = []
+
+    def recording_parse(html, max_results):
+        parse_threads.append(threading.get_ident())
+        return parse_duckduckgo_results(html, max_results)
+
+    async def handler(request):
+        return web.Response(text=RESULTS_PAGE, content_type='text/html')
+
+    monkeypatch.setattr(internet_search, "parse_duckduckgo_results", recording_parse)
+    runner, base_url = await start_fake_duckduckgo(handler)
+    try:
+        results = await make_search(base_url)._search_with_duckduckgo("tenant")
+    finally:
+        await runner.cleanup()
+
+    assert len(results) == 2
+    assert parse_threads and threading.get_ident() not in parse_threads
+
+
+@pytest.mark.asyncio
+async def test_slow_search_times_out_without_blocking_the_loop():
+    async def handler(request):
+        await asyncio.sleep(5)
+        return web.Response(text=RESULTS_PAGE, content_type='text/html')
+
+    runner, base_url = await start_fake_duckduckgo(handler)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticking = asyncio.create_task(ticker())
+    try:
+        started = time.monotonic()
+        results = await make_search(base_url, timeout=0.3)._search_with_duckduckgo("tenant")
+        elapsed = time.monotonic() - started
+    finally:
+        ticking.cancel()
+        await runner.cleanup()
+
+    assert results == []
+    assert elapsed < 1.0
+    assert ticks >= 10
+
+
+@pytest.mark.asyncio
+async def test_cancelling_a_search_aborts_the_request():
+    received = asyncio.Event()
+    disconnected = asyncio.Event()
+
+    async def handler(request):
+        received.set()
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            disconnected.set()
+            raise
+        return web.Response(text=RESULTS_PAGE, content_type='text/html')
+
+    runner, base_url = await start_fake_duckduckgo(handler)
+    try:
+        task = asyncio.create_task(make_search(base_url)._search_with_duckduckgo("tenant"))
+        await received.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.wait_for(disconnected.wait(), 1)
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_search_gives_up_after_last_attempt():
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        return web.Response(status=202, text="")
+
+    runner, base_url = await start_fake_duckduckgo(handler)
+    try:
+        results = await make_search(base_url, max_retries=1)._search_with_duckduckgo("tenant")
+    finally:
+        await runner.cleanup()
+
+    assert results == []
+    assert len(calls) == 1
+
+
+def fake_provider(results, delay=0.0, calls=None, name=None):
+    async def search(query):
+        if calls is not None:
+            calls.append(name)
+        await asyncio.sleep(delay)
+        return results
+    return search
+
+
+def fan_out_search(mode, serpapi, duckduckgo, **fan_out):
+    search = InternetSearch({name: dict(config) for name, config in SEARCH_PROVIDERS.items()})
+    search.fan_out = dict(search.fan_out, mode=mode, **fan_out)
+    search._search_with_serpapi = serpapi
+    search._search_with_duckduckgo = duckduckgo
+    return search
+
+
+SERP = [{"title": "Tenants", "link": "https://www.docs.duplocloud.com/tenants/", "body": "serp"}]
+DDG = [{"title": "Tenants", "link": "https://docs.duplocloud.com/tenants", "body": "ddg"},
+       {"title": "Services", "link": "https://example.com/services", "body": "ddg"}]
+
+
+@pytest.mark.asyncio
+async def test_race_returns_the_first_results_and_cancels_the_rest():
+    search = fan_out_search("race", fake_provider(SERP, delay=5), fake_provider(DDG, delay=0.01))
+
+    started = time.monotonic()
+    assert await search._search("tenant") == DDG
+    assert time.monotonic() - started < 1.0
+
+
+@pytest.mark.asyncio
+async def test_hedged_starts_the_next_provider_only_when_the_first_is_slow():
+    calls = []
+    fast = fan_out_search("hedged", fake_provider(SERP, 0.01, calls, "serpapi"),
+                          fake_provider(DDG, 0.01, calls, "duckduckgo"), hedge_delay=0.2)
+    assert await fast._search("tenant") == SERP
+    assert calls == ["serpapi"]
+
+    calls.clear()
+    slow = fan_out_search("hedged", fake_provider(SERP, 5, calls, "serpapi"),
+                          fake_provider(DDG, 0.01, calls, "duckduckgo"), hedge_delay=0.05)
+    started = time.monotonic()
+    assert await slow._search("tenant") == DDG
+    assert time.monotonic() - started < 1.0
+    assert calls == ["serpapi", "duckduckgo"]
+    assert slow.hedges == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_moves_on_immediately_when_a_provider_fails():
+    search = fan_out_search("hedged", fake_provider([]), fake_provider(DDG, 0.01), hedge_delay=5)
+
+    started = time.monotonic()
+    assert await search._search("tenant") == DDG
+    assert time.monotonic() - started < 1.0
+    assert search.hedges == 0
+
+
+@pytest.mark.asyncio
+async def test_merge_combines_providers_without_duplicate_urls():
+    search = fan_out_search("merge", fake_provider(SERP), fake_provider(DDG))
+
+    results = await search._search("tenant")
+
+    assert [result["body"] for result in results] == ["serp", "ddg"]
+    assert results[1]["title"] == "Services"
+
+
+def test_hedge_delay_follows_the_latency_percentile():
+    search = fan_out_search("hedged", fake_provider([]), fake_provider([]),
+                            hedge_delay=1.5, min_samples=10, hedge_percentile=90)
+    search._latencies["serpapi"].extend([0.1] * 5)
+    assert search._hedge_delay("serpapi") == 1.5
+
+    search._latencies["serpapi"].extend([0.1] * 4 + [0.4, 2.0])
+    assert search._hedge_delay("serpapi") == 0.4
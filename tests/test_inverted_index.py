@@ -0,0 +1,93 @@
+from app.core.inverted_index import InvertedIndex, StoredPostings, tokenize
+
+
+def test_tokenize_lowercases_and_strips_punctuation():
+    assert tokenize("What is a Tenant?") == ["what", "is", "a", "tenant"]
+
+
+def test_phrase_search_requires_contiguous_tokens():
+    index = InvertedIndex.from_items([
+        ("a.md", "A tenant is a logical construct."),
+        ("b.md", "Each tenant has a plan and is isolated."),
+    ])
+
+    assert index.search_phrase("tenant is") == ["a.md"]
+    assert index.search_phrase("Tenant") == ["a.md", "b.md"]
+    assert index.search_phrase("plan tenant") == []
+
+
+def test_keyword_search_matches_all_terms_in_any_order():
+    index = InvertedIndex.from_items([
+        ("a.md", "infrastructure and plan"),
+        ("b.md", "plan only"),
+    ])
+
+    assert index.search_keywords("plan infrastructure") == ["a.md"]
+    assert index.search_keywords("missing") == []
+
+
+def test_update_and_remove_are_incremental():
+    index = InvertedIndex.from_items([("a.md", "old content"), ("b.md", "shared content")])
+
+    index.update("a.md", "new text")
+    assert index.search_phrase("old") == []
+    assert index.search_phrase("new text") == ["a.md"]
+    assert index.search_keywords("content") == ["b.md"]
+
+    index.remove("b.md")
+    assert "b.md" not in index
+    assert "content" not in index.postings
+    assert len(index) == 1
+
+
+def test_bm25_prefers_rarer_and_denser_matches():
+    index = InvertedIndex.from_items([
+        ("a.md", "tenant tenant isolation"),
+        ("b.md", "tenant plan infrastructure and many other words here"),
+        ("c.md", "plan only"),
+    ])
+
+    ranked = index.rank_bm25("tenant isolation", limit=2)
+
+    assert [doc_id for doc_id, _ in ranked] == ["a.md", "b.md"]
+    assert ranked[0][1] > ranked[1][1] > 0
+    assert "c.md" not in index.bm25_scores("tenant isolation")
+
+
+def test_stored_postings_answer_like_the_in_memory_index(tmp_path):
+    items = [
+        ("a.md", "tenant tenant isolation"),
+        ("b.md", "Each tenant has a plan and is isolated."),
+        ("c.md", "Ünicode café plan only"),
+    ]
+    path = str(tmp_path / "postings.bin")
+    memory = InvertedIndex.from_items(items)
+    memory.write(path)
+    stored = StoredPostings(path)
+    index = InvertedIndex(stored)
+
+    assert len(index) == 3 and "b.md" in index and not index.postings
+    for query in ("tenant isolation", "plan", "café", "is isolated", "missing"):
+        assert index.rank_bm25(query, limit=3) == memory.rank_bm25(query, limit=3)
+        assert index.search_phrase(query) == memory.search_phrase(query)
+        assert index.search_keywords(query) == memory.search_keywords(query)
+    stored.close()
+
+
+def test_documents_changed_at_runtime_override_stored_postings(tmp_path):
+    path = str(tmp_path / "postings.bin")
+    InvertedIndex.from_items([("a.md", "old content"), ("b.md", "shared content")]).write(path)
+    stored = StoredPostings(path)
+    index = InvertedIndex(stored)
+
+    index.update("a.md", "new text")
+    assert index.search_phrase("old") == []
+    assert index.search_phrase("new text") == ["a.md"]
+    assert index.document_frequency("content") == 1
+
+    index.remove("b.md")
+    assert "b.md" not in index
+    assert index.search_keywords("content") == []
+    assert len(index) == 1
+    assert index.bm25_scores("text") == InvertedIndex.from_items([("a.md", "new text")]).bm25_scores("text")
+    stored.close()
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.core.model_health import ModelHealthMonitor, model_listed
+
+CONFIG = {"interval": 0.01, "timeout": 1, "failure_cooldown": 60}
+
+
+class StubOllama:
+    def __init__(self, models=None, error=None):
+        self.models = models or []
+        self.error = error
+        self.calls = 0
+
+    def list_models_sync(self, timeout=None):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.models
+
+    async def list_models(self, timeout=None):
+        return self.list_models_sync(timeout)
+
+
+def test_model_listed_accepts_latest_tag():
+    assert model_listed("phi", ["phi:latest"])
+    assert model_listed("phi:2.7b", ["phi:2.7b"])
+    assert not model_listed("mistral", ["phi:latest"])
+
+
+def test_unchecked_models_are_tried():
+    monitor = ModelHealthMonitor(StubOllama(), CONFIG)
+
+    assert monitor.candidates(["phi", "mistral"]) == ["phi", "mistral"]
+
+
+def test_probe_result_filters_candidates_without_further_calls():
+    ollama = StubOllama(["phi:latest"])
+    monitor = ModelHealthMonitor(ollama, CONFIG)
+    monitor.refresh_sync()
+
+    for _ in range(3):
+        assert monitor.candidates(["phi", "mistral"]) == ["phi"]
+    assert ollama.calls == 1
+
+
+def test_server_down_skips_every_model():
+    monitor = ModelHealthMonitor(StubOllama(error=ConnectionError("refused")), CONFIG)
+
+    assert not monitor.refresh_sync()
+    assert monitor.candidates(["phi"]) == []
+    assert "refused" in monitor.last_error
+
+
+def test_failed_model_is_skipped_until_it_succeeds_again():
+    monitor = ModelHealthMonitor(StubOllama(["phi:latest", "mistral:latest"]), CONFIG)
+    monitor.refresh_sync()
+
+    monitor.report_failure("phi", TimeoutError())
+    assert monitor.candidates(["phi", "mistral"]) == ["mistral"]
+
+    monitor.report_success("phi", 0.5)
+    assert monitor.candidates(["phi", "mistral"]) == ["phi", "mistral"]
+    assert monitor.snapshot()["models"]["phi"]["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_background_probe_picks_up_recovered_server():
+    ollama = StubOllama(error=ConnectionError("refused"))
+    monitor = ModelHealthMonitor(ollama, CONFIG)
+    monitor.refresh_sync()
+    assert monitor.candidates(["phi"]) == []
+
+    ollama.error, ollama.models = None, ["phi:latest"]
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        assert monitor.candidates(["phi"]) == ["phi"]
+    finally:
+        await monitor.stop()
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from aiohttp import web
+
+from app.core.ollama_client import OllamaClient, OllamaError
+
+
+async def start_fake_ollama():
+    """Local stand-in for the Ollama HTTP API"""
+    async def tags(request):
+        return web.json_response({'models': [{'name': 'phi'}]})
+
+    async def chat(request):
+        body = await request.json()
+        if body['model'] != 'phi':
+            return web.Response(status=404, text="model not found")
+        if not body['stream']:
+            return web.json_response({'message': {'content': 'hello'}, 'done': True})
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for token in ['hel', 'lo']:
+            await response.write((json.dumps({'message': {'content': token}, 'done': False}) + "\n").encode())
+        await response.write((json.dumps({'message': {'content': ''}, 'done': True}) + "\n").encode())
+        return response
+
+    app = web.Application()
+    app.router.add_get('/api/tags', tags)
+    app.router.add_post('/api/chat', chat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+@pytest.mark.asyncio
+async def test_requests_reuse_pooled_connections():
+    runner, base_url = await start_fake_ollama()
+    client = OllamaClient(base_url)
+    try:
+        assert await client.list_models() == ['phi']
+        for _ in range(3):
+            response = await client.chat('phi', [{'role': 'user', 'content': 'hi'}])
+            assert response['message']['content'] == 'hello'
+
+        stats = client.pool_stats()
+        assert stats['requests'] == 4
+        assert stats['connections_created'] == 1
+        assert stats['connections_reused'] == 3
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_yields_messages_until_done():
+    runner, base_url = await start_fake_ollama()
+    client = OllamaClient(base_url)
+    try:
+        messages = [data async for data in client.chat_stream('phi', [{'role': 'user', 'content': 'hi'}])]
+        assert [m['message']['content'] for m in messages] == ['hel', 'lo', '']
+        assert messages[-1]['done']
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_error_status_raises_and_is_counted():
+    runner, base_url = await start_fake_ollama()
+    client = OllamaClient(base_url)
+    try:
+        with pytest.raises(OllamaError) as error:
+            await client.chat('missing', [{'role': 'user', 'content': 'hi'}])
+        assert error.value.status == 404
+        assert client.pool_stats()['errors'] == 1
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def test_sessions_are_closed_when_requests_run_in_their_own_loops():
+    server_loop = asyncio.new_event_loop()
+    server = threading.Thread(target=server_loop.run_forever, daemon=True)
+    server.start()
+    runner, base_url = asyncio.run_coroutine_threadsafe(start_fake_ollama(), server_loop).result()
+    client = OllamaClient(base_url)
+    sessions = []
+
+    async def chat():
+        await client.chat('phi', [{'role': 'user', 'content': 'hi'}])
+        sessions.append(client._session)
+
+    async def flask_request():
+        try:
+            await chat()
+        finally:
+            await client.close_session()
+
+    try:
+        # As in the Flask app: one asyncio.run() per request
+        asyncio.run(flask_request())
+        asyncio.run(flask_request())
+        # A session still open on another running loop is closed there before being replaced
+        asyncio.run_coroutine_threadsafe(chat(), server_loop).result()
+        asyncio.run(flask_request())
+        deadline = time.time() + 2
+        while not sessions[2].closed and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), server_loop).result()
+        server_loop.call_soon_threadsafe(server_loop.stop)
+        server.join()
+        server_loop.close()
+
+    assert len({id(session) for session in sessions}) == 4
+    assert all(session.closed for session in sessions)
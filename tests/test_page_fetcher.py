@@ -0,0 +1,170 @@
+import os
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from app.config.search_config import SEARCH_CONFIG
+from app.core import page_fetcher
+from app.core.page_fetcher import PageCache, PageFetcher, extract_main_text, rank_passages
+
+TENANT_PAGE = """
+<html><head><style>body { color: red; }</style><script>var tenant = 1;</script></head>
+<body>
+<nav><a href="/">Home</a> <a href="/tenants">Tenants menu</a></nav>
+<article>
+  <h1>Tenants</h1>
+  <p>DuploCloud is a platform. It automates infrastructure.</p>
+  <p>A tenant is an isolated environment for workloads. Each tenant has its own security groups.</p>
+  <p>Billing is monthly. Support is available.</p>
+</article>
+<footer>Copyright tenant footer</footer>
+</body></html>
+"""
+
+
+async def start_fixture_server(requests):
+    async def tenants(request):
+        requests.append(dict(request.headers))
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text=TENANT_PAGE, content_type='text/html', headers={'ETag': '"v1"'})
+
+    async def missing(request):
+        return web.Response(status=404)
+
+    async def bogus_charset(request):
+        return web.Response(body=TENANT_PAGE.encode('utf-8'), headers={'Content-Type': 'text/html; charset=x-bogus'})
+
+    app = web.Application()
+    app.router.add_get('/tenants', tenants)
+    app.router.add_get('/missing', missing)
+    app.router.add_get('/bogus', bogus_charset)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def make_fetcher(tmp_path, **overrides):
+    return PageFetcher(dict(SEARCH_CONFIG["page_fetch"], enabled=True, cache_dir=str(tmp_path), **overrides))
+
+
+def test_extract_main_text_drops_scripts_and_navigation():
+    text = extract_main_text(TENANT_PAGE)
+
+    assert "A tenant is an isolated environment for workloads." in text
+    assert "var tenant" not in text
+    assert "Tenants menu" not in text
+    assert "footer" not in text
+
+
+def test_rank_passages_prefers_sentences_sharing_query_words():
+    text = extract_main_text(TENANT_PAGE)
+
+    passages = rank_passages("what is a tenant environment", text, sentences_per_passage=2, top_k=1)
+
+    assert passages == ["A tenant is an isolated environment for workloads. Each tenant has its own security groups."]
+    assert rank_passages("a an", text) == []
+
+
+@pytest.mark.asyncio
+async def test_enrich_appends_ranked_passages_to_snippets(tmp_path):
+    requests = []
+    runner, base_url = await start_fixture_server(requests)
+    results = [
+        {"title": "Tenants", "link": f"{base_url}/tenants", "body": "Tenants in DuploCloud."},
+        {"title": "Missing", "link": f"{base_url}/missing", "body": "Gone."},
+    ]
+    try:
+        enriched = await make_fetcher(tmp_path, sentences_per_passage=2).enrich("what is a tenant", results)
+    finally:
+        await runner.cleanup()
+
+    assert enriched[0]["body"].startswith("Tenants in DuploCloud. A tenant is an isolated environment")
+    assert enriched[1]["body"] == "Gone."
+    assert results[0]["body"] == "Tenants in DuploCloud."
+
+
+@pytest.mark.asyncio
+async def test_cached_pages_are_reused_then_revalidated_with_etag(tmp_path):
+    requests = []
+    runner, base_url = await start_fixture_server(requests)
+    url = f"{base_url}/tenants"
+    try:
+        async with aiohttp.ClientSession() as session:
+            fetcher = make_fetcher(tmp_path)
+            first = await fetcher.fetch_text(session, url)
+            assert await fetcher.fetch_text(session, url) == first
+            assert len(requests) == 1
+
+            # A new process sharing the cache directory, after the page went stale
+            stale = make_fetcher(tmp_path, max_age=0)
+            assert await stale.fetch_text(session, url) == first
+    finally:
+        await runner.cleanup()
+
+    assert len(requests) == 2
+    assert requests[1]['If-None-Match'] == '"v1"'
+    assert (fetcher.fetched, fetcher.cache_hits, stale.revalidated) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_a_broken_page_keeps_its_snippet_without_failing_the_others(tmp_path, monkeypatch):
+    runner, base_url = await start_fixture_server([])
+    results = [
+        {"title": "Bogus", "link": f"{base_url}/bogus", "body": "Unknown charset."},
+        {"title": "Tenants", "link": f"{base_url}/tenants", "body": "Tenants in DuploCloud."},
+    ]
+    try:
+        # An unknown charset is read as UTF-8
+        enriched = await make_fetcher(tmp_path / "a").enrich("what is a tenant", results)
+        assert "A tenant is an isolated environment" in enriched[0]["body"]
+
+        def broken(html):
+            raise ValueError("unparsable page")
+
+        monkeypatch.setattr(page_fetcher, "extract_main_text", broken)
+        fetcher = make_fetcher(tmp_path / "b")
+        enriched = await fetcher.enrich("what is a tenant", results)
+    finally:
+        await runner.cleanup()
+
+    assert [result["body"] for result in enriched] == ["Unknown charset.", "Tenants in DuploCloud."]
+    assert fetcher.failures == 2
+
+
+def test_page_cache_evicts_least_recently_used_pages(tmp_path):
+    cache = PageCache(str(tmp_path), max_entries=2)
+    cache.set("https://a", {'text': "a"})
+    cache.set("https://b", {'text': "b"})
+    # Pretend both pages were stored a while ago, then use the first one
+    for url in ("https://a", "https://b"):
+        past = time.time() - 60
+        os.utime(cache._path(url), (past, past))
+    assert cache.get("https://a") == {'text': "a"}
+
+    cache.set("https://c", {'text': "c"})
+
+    assert cache.get("https://b") is None
+    assert cache.get("https://a") == {'text': "a"} and cache.get("https://c") == {'text': "c"}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_page_cache_limits_bytes_and_drops_pages_unused_for_the_ttl(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=300, ttl=3600)
+    cache.set("https://old", {'text': "old"})
+    past = time.time() - 7200
+    os.utime(cache._path("https://old"), (past, past))
+
+    assert cache.get("https://old") is None
+    assert not os.path.exists(cache._path("https://old"))
+
+    for i in range(5):
+        cache.set(f"https://page/{i}", {'text': "x" * 100})
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= 300
+    assert cache.get("https://page/4") is not None
+    assert cache.stats()['expirations'] == 1
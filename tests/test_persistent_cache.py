@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from app.core.cache import TTLCache
+from app.core.persistent_cache import SQLiteCacheBackend
+
+
+def test_backends_on_one_file_share_entries(tmp_path):
+    path = str(tmp_path / "cache.db")
+    worker_a = SQLiteCacheBackend(path, "responses")
+    worker_b = SQLiteCacheBackend(path, "responses")
+    other = SQLiteCacheBackend(path, "internet_search")
+
+    worker_a.set("q", {"response": "answer"})
+
+    assert worker_b.get("q")[:2] == (True, {"response": "answer"})
+    assert other.get("q")[0] is False
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"), "responses", ttl=0.05)
+    backend.set("q", "answer")
+    assert backend.get("q")[1] == "answer"
+
+    time.sleep(0.06)
+    assert backend.get("q")[0] is False
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"), "responses", max_entries=2)
+    backend.set("a", 1)
+    time.sleep(0.01)
+    backend.set("b", 2)
+    time.sleep(0.01)
+    backend.get("a")
+    backend.set("c", 3)
+
+    assert backend.get("b")[0] is False
+    assert backend.get("a")[0] and backend.get("c")[0]
+
+    sized = SQLiteCacheBackend(str(tmp_path / "cache.db"), "search", max_bytes=200)
+    sized.set("x", "x" * 120)
+    time.sleep(0.01)
+    sized.set("y", "y" * 120)
+    assert sized.get("x")[0] is False
+    assert sized.stats()["entries"] == 1
+
+
+def test_cache_serves_entries_stored_before_a_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    before = TTLCache("responses", ttl=60, backend=SQLiteCacheBackend(path, "responses", ttl=60))
+    before.set("hot query", "answer")
+
+    after = TTLCache("responses", ttl=60, backend=SQLiteCacheBackend(path, "responses", ttl=60))
+    assert after.get("hot query") == "answer"
+    assert len(after) == 1
+    assert after.stats()["backend_hits"] == 1
+
+
+def test_clear_removes_only_its_namespace(tmp_path):
+    path = str(tmp_path / "cache.db")
+    responses = TTLCache("responses", backend=SQLiteCacheBackend(path, "responses"))
+    search = TTLCache("internet_search", backend=SQLiteCacheBackend(path, "internet_search"))
+    responses.set("q", "answer")
+    search.set("q", "results")
+
+    responses.clear()
+
+    assert SQLiteCacheBackend(path, "responses").get("q")[0] is False
+    assert SQLiteCacheBackend(path, "internet_search").get("q")[1] == "results"
+
+
+class RecordingBackend:
+    """Backend that records which thread used it and whether the cache lock was free meanwhile"""
+
+    def __init__(self, cache_lock=None):
+        self.cache_lock = cache_lock
+        self.calls = []
+        self.values = {}
+
+    def _record(self, name):
+        free = []
+
+        def try_lock():
+            free.append(self.cache_lock.acquire(blocking=False))
+            if free[0]:
+                self.cache_lock.release()
+        probe = threading.Thread(target=try_lock)
+        probe.start()
+        probe.join()
+        self.calls.append((name, threading.get_ident(), free[0]))
+
+    def get(self, key):
+        self._record('get')
+        return (key in self.values, self.values.get(key), None)
+
+    def set(self, key, value):
+        self._record('set')
+        self.values[key] = value
+
+
+@pytest.mark.asyncio
+async def test_async_loads_use_the_backend_off_the_event_loop_and_outside_the_lock():
+    cache = TTLCache("responses", ttl=60)
+    cache.backend = backend = RecordingBackend(cache._lock)
+
+    async def load():
+        return "answer"
+
+    assert await cache.get_or_load("q", load) == "answer"
+    assert await cache.get_or_load("q", load) == "answer"
+
+    # One miss read and one write; the second call is served from memory
+    assert [name for name, _, _ in backend.calls] == ['get', 'set']
+    assert all(thread != threading.get_ident() for _, thread, _ in backend.calls)
+    assert all(lock_free for _, _, lock_free in backend.calls)
@@ -0,0 +1,132 @@
+from app.core.query_context import QueryContext
+from app.core.chunking import sentence_index
+from app.core.rag import RAG, HybridRetriever
+
+
+class StubCollection:
+    """Minimal stand-in for a Chroma collection returning fixed vector hits"""
+
+    def __init__(self, hits):
+        self.hits = hits
+
+    def query(self, n_results, include, **kwargs):
+        hits = self.hits[:n_results]
+        return {
+            'ids': [[hit['id'] for hit in hits]],
+            'documents': [[hit['content'] for hit in hits]],
+            'metadatas': [[hit['metadata'] for hit in hits]],
+            'distances': [[hit['distance'] for hit in hits]],
+        }
+
+
+def make_chunks():
+    docs = {
+        'tenant': ['A tenant is an isolated environment.', 'Tenants belong to a plan.'],
+        'plan': ['A plan groups infrastructure.', 'Plans hold many tenants.'],
+    }
+    return [
+        {
+            'id': f"{title}_{i}",
+            'content': content,
+            'metadata': {'title': title, 'path': f"{title}.md", 'chunk_index': i},
+        }
+        for title, paragraphs in docs.items()
+        for i, content in enumerate(paragraphs)
+    ]
+
+
+def test_retrieve_fuses_keyword_and_vector_rankings():
+    chunks = make_chunks()
+    by_id = {chunk['id']: chunk for chunk in chunks}
+    collection = StubCollection([
+        dict(by_id['plan_1'], distance=0.1),
+        dict(by_id['tenant_0'], distance=0.2),
+        dict(by_id['plan_0'], distance=0.9),
+    ])
+    retriever = HybridRetriever(collection, chunks)
+
+    results = retriever.retrieve(QueryContext("tenant is"), top_k=2)
+
+    # tenant_0 wins the phrase, BM25 and vector rankings together
+    assert [result['id'] for result in results] == ['tenant_0', 'plan_1']
+    assert results[0]['score'] > results[1]['score']
+    assert results[0]['bm25_score'] > 0
+    assert results[1]['distance'] == 0.1
+
+
+def test_hits_from_a_differently_chunked_index_keep_their_stored_text():
+    chunks = make_chunks()
+    stale_hit = {'id': 'tenant_1', 'content': 'Old paragraph about isolated tenants.',
+                 'metadata': {'title': 'tenant', 'path': 'tenant.md', 'chunk_index': 0}, 'distance': 0.1}
+
+    aligned = HybridRetriever(StubCollection([stale_hit]), chunks)
+    assert aligned._vector_search(QueryContext("isolated"), 5)[0]['id'] == 'tenant_0'
+
+    retriever = HybridRetriever(StubCollection([stale_hit]), chunks, aligned_paths=set())
+    results = {result['id']: result for result in retriever.retrieve(QueryContext("isolated"), top_k=3)}
+
+    assert results['tenant_1']['content'] == 'Old paragraph about isolated tenants.'
+    assert results['tenant_1']['distance'] == 0.1
+    assert [s for s, _ in retriever.chunk_sentences('tenant_1', results['tenant_1'])] == [
+        'Old paragraph about isolated tenants.'
+    ]
+
+
+def test_only_hits_from_documents_edited_since_indexing_keep_their_stored_text():
+    chunks = make_chunks()
+    by_id = {chunk['id']: chunk for chunk in chunks}
+    drifted_hit = dict(by_id['plan_0'], content='Snapshot text about billing plans.', distance=0.1)
+    unchanged_hit = {'id': 'stored-tenant', 'content': 'Same tenant text under an older id.',
+                     'metadata': dict(by_id['tenant_0']['metadata']), 'distance': 0.2}
+    retriever = HybridRetriever(StubCollection([drifted_hit, unchanged_hit]), chunks, aligned_paths={'tenant.md'})
+
+    hits = {hit['id']: hit for hit in retriever._vector_search(QueryContext("plans"), 5)}
+    results = {result['id']: result for result in retriever.retrieve(QueryContext("plans"), top_k=4)}
+
+    # plan.md changed after the index was built: its hit is not swapped for the local chunk at that position
+    assert hits['plan_0']['content'] == 'Snapshot text about billing plans.'
+    assert results['plan_0']['content'] == 'Snapshot text about billing plans.'
+    assert [s for s, _ in retriever.chunk_sentences('plan_0', results['plan_0'])] == [
+        'Snapshot text about billing plans.'
+    ]
+    # tenant.md is unchanged, so its hit still resolves to the loaded chunk
+    assert 'stored-tenant' not in hits
+    assert results['tenant_0']['content'] == by_id['tenant_0']['content']
+
+
+def test_remove_document_drops_its_chunks():
+    retriever = HybridRetriever(StubCollection([]), make_chunks())
+
+    retriever.remove_document('tenant.md')
+
+    assert set(retriever.chunks) == {'plan_0', 'plan_1'}
+    assert retriever.retrieve(QueryContext("isolated environment")) == []
+
+
+def test_chunk_sentences_are_indexed_or_built_on_demand():
+    chunks = [dict(chunk, sentences=[("Indexed.", frozenset({"indexed"}))]) for chunk in make_chunks()]
+    retriever = HybridRetriever(StubCollection([]), chunks)
+    vector_only = {'id': 'x_0', 'content': 'Only in the vector store. Second', 'metadata': {}}
+
+    assert retriever.chunk_sentences('tenant_0') == [("Indexed.", frozenset({"indexed"}))]
+    assert [s for s, _ in retriever.chunk_sentences('x_0', vector_only)] == ["Only in the vector store.", "Second."]
+    assert retriever.chunk_sentences('missing') == []
+
+
+def test_direct_response_picks_the_first_best_overlapping_sentence():
+    rag = RAG.__new__(RAG)
+    sentences = sentence_index("Plans hold tenants. A tenant is an isolated environment. A tenant is isolated")
+
+    assert rag._generate_direct_response("what is a tenant", sentences) == "A tenant is an isolated environment."
+    assert rag._generate_direct_response("kubernetes", sentences).startswith("I couldn't find")
+
+
+def test_vector_hits_resolve_to_the_loaded_chunk_at_their_position():
+    chunks = make_chunks()
+    legacy_hit = dict(chunks[1], id='legacy-id', distance=0.1)
+    retriever = HybridRetriever(StubCollection([legacy_hit]), chunks)
+
+    results = retriever.retrieve(QueryContext("plan"), top_k=1)
+
+    assert results[0]['id'] == 'tenant_1'
+    assert results[0]['distance'] == 0.1
@@ -0,0 +1,53 @@
+import time
+
+from app.core.semantic_cache import SemanticCache
+
+CONFIG = {"enabled": True, "max_entries": 2, "ttl": None, "max_distance": 0.05}
+
+
+def test_close_paraphrase_returns_cached_answer():
+    cache = SemanticCache(CONFIG)
+    cache.add("what is a tenant", [1.0, 0.0, 0.1], "tenant answer")
+
+    assert cache.lookup([0.98, 0.0, 0.12]) == "tenant answer"
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_returns_the_closest_entry():
+    cache = SemanticCache(dict(CONFIG, max_distance=0.5))
+    cache.add("tenant", [1.0, 0.0], "tenant answer")
+    cache.add("service", [0.0, 1.0], "service answer")
+
+    assert cache.lookup([0.2, 0.9]) == "service answer"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticCache(CONFIG)
+    cache.add("a", [1.0, 0.0, 0.0], "a")
+    cache.add("b", [0.0, 1.0, 0.0], "b")
+    cache.lookup([1.0, 0.0, 0.0])
+    cache.add("c", [0.0, 0.0, 1.0], "c")
+
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0, 0.0]) == "a"
+    assert cache.evictions == 1
+
+
+def test_entries_expire_and_clear_drops_everything():
+    cache = SemanticCache(dict(CONFIG, ttl=0.05))
+    cache.add("a", [1.0, 0.0], "a")
+    time.sleep(0.06)
+    assert cache.lookup([1.0, 0.0]) is None
+
+    cache.add("b", [0.0, 1.0], "b")
+    cache.clear()
+    assert cache.lookup([0.0, 1.0]) is None
+    assert len(cache) == 0
+
+
+def test_disabled_cache_never_matches():
+    cache = SemanticCache(dict(CONFIG, enabled=False))
+    cache.add("a", [1.0, 0.0], "a")
+
+    assert cache.lookup([1.0, 0.0]) is None
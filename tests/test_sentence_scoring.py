@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+
+from app.core.internet_search import InternetSearch
+from app.core.sentence_scoring import score_sentences, top_k
+from app.config.search_config import SEARCH_PROVIDERS
+from app.models.schemas import Source
+
+
+def reference_score(query, sentence):
+    """The per-sentence heuristic the batch scorer replaces"""
+    query_lower = query.lower()
+    sentence_lower = sentence.lower()
+    score = 10 if query_lower in sentence_lower else 0
+    score += len(set(query_lower.split()).intersection(set(sentence_lower.split()))) * 2
+    sentence_length = len(sentence.split())
+    score += 2 if 5 <= sentence_length <= 30 else -1
+    proper_nouns = sum(1 for word in sentence.split() if word[0].isupper())
+    score += min(proper_nouns, 3)
+    density = len(set(sentence_lower.split())) / sentence_length
+    if 0.6 <= density <= 0.8:
+        score += 1
+    return score
+
+
+WORDS = ["tenant", "Tenant", "DuploCloud", "service", "the", "a", "is", "AWS", "host",
+         "isolated", "environment", "what", "security", "group", "Kubernetes", "of"]
+
+
+def random_sentences(rng, count):
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 40))) for _ in range(count)]
+
+
+def test_scores_match_the_per_sentence_heuristic():
+    rng = random.Random(7)
+    sentences = random_sentences(rng, 500) + ["what is a tenant", "What is a tenant in AWS", "x"]
+    for query in ["what is a tenant", "Tenant", "kubernetes security group", "", "nothing here"]:
+        expected = [reference_score(query, sentence) for sentence in sentences]
+        assert score_sentences(query, sentences).tolist() == expected
+
+
+def test_top_k_matches_a_stable_sort_of_positive_scores():
+    rng = random.Random(11)
+    for _ in range(50):
+        scores = np.array([rng.randint(-1, 6) for _ in range(rng.randint(0, 40))], dtype=np.int64)
+        k = rng.randint(1, 5)
+        expected = sorted((i for i in range(len(scores)) if scores[i] > 0), key=lambda i: -scores[i])[:k]
+        assert top_k(scores, k).tolist() == expected
+
+
+def test_extract_answer_picks_the_first_best_sentence():
+    search = InternetSearch(SEARCH_PROVIDERS)
+    sources = [
+        Source(title="a", url="u", content="Short one. A tenant in DuploCloud is an isolated environment for services",
+               relevance_score=1.0),
+        Source(title="b", url="v", content="A tenant in DuploCloud is an isolated environment for services. x",
+               relevance_score=1.0),
+    ]
+
+    assert search._extract_answer_from_sources("tenant", sources) == \
+        "A tenant in DuploCloud is an isolated environment for services."
+    assert search._extract_answer_from_sources("tenant", []) is None
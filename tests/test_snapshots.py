@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+
+from app.config.model_config import VECTOR_DB_CONFIG
+from app.core import snapshots
+from app.core.ai_assistant import AIAssistant
+from app.core.ingestion import IngestionManifest, chunking_fingerprint, content_hash
+
+
+def test_publish_points_current_at_finished_snapshot(tmp_path):
+    root = str(tmp_path)
+    assert snapshots.current_snapshot_path(root) is None
+
+    path = snapshots.prepare_snapshot(root, "v1")
+    snapshots.publish_snapshot(root, "v1")
+
+    assert snapshots.current_version(root) == "v1"
+    assert snapshots.current_snapshot_path(root) == path
+
+
+def test_new_snapshot_is_seeded_from_current(tmp_path):
+    root = str(tmp_path)
+    snapshots.prepare_snapshot(root, "v1")
+    with open(os.path.join(snapshots.snapshot_path(root, "v1"), "manifest.json"), "w") as f:
+        f.write("{}")
+    snapshots.write_snapshot_info(root, "v1", {"documents": 1})
+    snapshots.publish_snapshot(root, "v1")
+
+    seeded = snapshots.prepare_snapshot(root, "v2")
+
+    assert os.path.exists(os.path.join(seeded, "manifest.json"))
+    assert snapshots.read_snapshot_info(seeded) == {}
+
+
+def test_prune_keeps_current_and_newest(tmp_path):
+    root = str(tmp_path)
+    for version in ("v1", "v2", "v3", "v4"):
+        snapshots.prepare_snapshot(root, version, seed_from_current=False)
+    snapshots.publish_snapshot(root, "v2")
+
+    removed = snapshots.prune_snapshots(root, keep=2)
+
+    assert removed == ["v1", "v3"]
+    assert snapshots.list_versions(root) == ["v2", "v4"]
+
+
+def read_only_assistant(monkeypatch, root):
+    monkeypatch.setitem(VECTOR_DB_CONFIG, "read_only", True)
+    assistant = AIAssistant.__new__(AIAssistant)
+    assistant.vector_db_path = root
+    return assistant
+
+
+def test_read_only_snapshot_with_other_chunking_is_refused(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    path = snapshots.prepare_snapshot(root, "v1")
+    with open(os.path.join(path, VECTOR_DB_CONFIG["manifest_file"]), "w") as f:
+        json.dump({"fingerprint": "built-with-an-older-chunker", "documents": {}}, f)
+    snapshots.publish_snapshot(root, "v1")
+
+    with pytest.raises(RuntimeError, match="ingest_docs.py"):
+        read_only_assistant(monkeypatch, root)._initialize_vector_db()
+
+    assert AIAssistant._index_matches_chunking(path) is False
+    with open(os.path.join(path, VECTOR_DB_CONFIG["manifest_file"]), "w") as f:
+        json.dump({"fingerprint": chunking_fingerprint(), "documents": {}}, f)
+    assert AIAssistant._index_matches_chunking(path) is True
+
+
+def test_legacy_database_without_manifest_is_refused(tmp_path, monkeypatch):
+    open(tmp_path / "chroma.sqlite3", "w").close()
+
+    with pytest.raises(RuntimeError, match="ingest_docs.py"):
+        read_only_assistant(monkeypatch, str(tmp_path))._initialize_vector_db()
+
+
+def test_snapshot_hits_are_remapped_only_for_documents_unchanged_since_it_was_built(tmp_path, monkeypatch):
+    path = os.path.join(str(tmp_path), VECTOR_DB_CONFIG["manifest_file"])
+    with open(path, "w") as f:
+        json.dump({"fingerprint": chunking_fingerprint(), "documents": {
+            "same.md": {"hash": content_hash("Unchanged text."), "chunk_ids": ["same_0"]},
+            "edited.md": {"hash": content_hash("Text before the edit."), "chunk_ids": ["edited_0"]},
+        }}, f)
+    assistant = read_only_assistant(monkeypatch, str(tmp_path))
+    assistant.documentation = [
+        {"path": "same.md", "content": "Unchanged text."},
+        {"path": "edited.md", "content": "Text after the edit."},
+        {"path": "new.md", "content": "Not in the snapshot."},
+    ]
+
+    assert assistant._aligned_paths(IngestionManifest(path)) == {"same.md"}
+
+    with open(path, "w") as f:
+        json.dump({"fingerprint": "built-with-an-older-chunker", "documents": {}}, f)
+    assert assistant._aligned_paths(IngestionManifest(path)) == set()